@@ -24,10 +24,19 @@ Provides access to Binary Decision Diagrams (BDDs).
 
 from __future__ import print_function
 
+from collections import OrderedDict
+
 from .formula import LogicDAG
 from .core import transform
 from .errors import InstallError
 from .dd_formula import DD, build_dd, DDManager
+from .evaluator import SemiringProbability, SemiringLogProbability
+from .circuit import MAX_BLOCK_VALUES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # noinspection PyBroadException
 # noinspection PyUnresolvedReferences
@@ -66,6 +75,27 @@ class BDD(DD):
         """Checks whether the BDD library is available."""
         return bdd is not None
 
+    def evaluate_batch(
+        self, weights, index=None, semiring=None, evidence=None, **kwargs
+    ):
+        """Evaluate a set of nodes for each row of a weight matrix.
+
+        For the (log) probability semirings, each node is evaluated for all rows in one sweep \
+        over its flattened BDD.
+        See :meth:`Evaluatable.evaluate_batch` for the arguments.
+        """
+        if semiring is None:
+            semiring = SemiringLogProbability()
+        if not isinstance(semiring, SemiringProbability) or semiring.is_nsp():
+            return DD.evaluate_batch(self, weights, index, semiring, evidence, **kwargs)
+        if index is None:
+            index = [node for name, node, label in self.labeled()]
+        rows = self._get_batch_rows(weights)
+        if not rows:
+            return self._get_batch_result([], len(index))
+        evaluator = self.get_evaluator(semiring, evidence, rows[0], **kwargs)
+        return self._get_batch_result(evaluator.evaluate_batch(index, rows), len(index))
+
 
 class BDDManager(DDManager):
     """
@@ -86,6 +116,7 @@ class BDDManager(DDManager):
         self.varcount = 1
         self.ZERO = bdd.expr2bdd(bdd_expr.expr("0"))
         self.ONE = bdd.expr2bdd(bdd_expr.expr("1"))
+        self._flat = OrderedDict()
 
     def add_variable(self, label=0):
         if label == 0 or label > self.varcount:
@@ -141,20 +172,32 @@ class BDDManager(DDManager):
         with open(filename, "w") as f:
             print(node.to_dot(), file=f)
 
+    # Number of flattened BDDs kept for repeated weighted model counts.
+    flat_cache_size = 128
+
+    def get_flat(self, node):
+        """Get the flattened representation of the given BDD.
+
+        The representation is cached, such that repeated weighted model counts of the same node \
+        (e.g. with different weights) do not need to traverse the BDD again.
+
+        :param node: internal node
+        :return: flattened BDD
+        :rtype: FlatBDD
+        """
+        flat = self._flat.pop(node, None)
+        if flat is None:
+            flat = FlatBDD(node)
+            if len(self._flat) >= self.flat_cache_size:
+                self._flat.popitem(last=False)
+        self._flat[node] = flat
+        return flat
+
     def wmc(self, node, weights, semiring):
-        pall = semiring.zero()
-        for path in node.satisfy_all():
-            pw = semiring.one()
-            for var, val in path.items():
-                var = int(var.name[1:])
-                pos, neg = weights[var]
-                if val:
-                    p = pos
-                else:
-                    p = neg
-                pw = semiring.times(p, pw)
-            pall = semiring.plus(pw, pall)
-        return pall
+        return self.get_flat(node).wmc(weights, semiring)
+
+    def wmc_batch(self, node, weights, semiring):
+        return self.get_flat(node).wmc_batch(weights, semiring)
 
     def wmc_literal(self, node, weights, semiring, literal):
         raise NotImplementedError("not supported")
@@ -166,6 +209,186 @@ class BDDManager(DDManager):
         pass
 
 
+class FlatBDD(object):
+    """Flattened representation of a BDD for weighted model counting.
+
+    The decision nodes are stored in arrays (variable, low child, high child), grouped by their \
+    height, such that the weighted model count can be computed in one bottom-up sweep.
+    Slot 0 is False, slot 1 is True, and slot ``i + 2`` is the i-th decision node.
+    Like the path enumeration it replaces, variables that are skipped on a path do not \
+    contribute to its weight.
+
+    :param node: BDD to flatten
+    """
+
+    def __init__(self, node):
+        index = {id(bdd.BDDNODEZERO): 0, id(bdd.BDDNODEONE): 1}
+        var = []
+        lo = []
+        hi = []
+        height = [0, 0]
+
+        stack = [node.node]
+        while stack:
+            current = stack[-1]
+            if id(current) in index:
+                stack.pop()
+                continue
+            pending = [
+                child for child in (current.lo, current.hi) if id(child) not in index
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            low = index[id(current.lo)]
+            high = index[id(current.hi)]
+            index[id(current)] = len(height)
+            var.append(int(bdd._VARS[current.root].name[1:]))
+            lo.append(low)
+            hi.append(high)
+            height.append(max(height[low], height[high]) + 1)
+
+        self.root = index[id(node.node)]
+        self.var = var
+        self.lo = lo
+        self.hi = hi
+        self.variables = sorted(set(var))
+        self._height = height
+        self._levels = None
+        self._values = None
+
+    def __len__(self):
+        return len(self.var)
+
+    def _get_levels(self):
+        """Get the arrays of slots, variable positions and children for each height."""
+        if self._levels is None:
+            height = np.array(self._height[2:], dtype=np.int64)
+            position = dict((v, i) for i, v in enumerate(self.variables))
+            var = np.array([position[v] for v in self.var], dtype=np.int64)
+            lo = np.array(self.lo, dtype=np.int64)
+            hi = np.array(self.hi, dtype=np.int64)
+            order = np.argsort(height, kind="stable")
+            bounds = np.searchsorted(height[order], np.arange(1, height.max() + 2))
+            levels = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                nodes = order[start:end]
+                levels.append((nodes + 2, var[nodes], lo[nodes], hi[nodes]))
+            self._levels = levels
+            self._values = np.empty(len(self) + 2, dtype=float)
+        return self._levels
+
+    def wmc(self, weights, semiring):
+        """Compute the weighted model count of the BDD.
+
+        Uses NumPy for the (log) probability semirings.
+
+        :param weights: weights of the variables: {variable: (positive weight, negative weight)}
+        :param semiring: semiring
+        :return: weighted model count
+        """
+        if self.root < 2:
+            return semiring.one() if self.root == 1 else semiring.zero()
+        if np is not None and type(semiring) in (
+            SemiringProbability,
+            SemiringLogProbability,
+        ):
+            try:
+                pos = np.array(
+                    [float(weights[v][0]) for v in self.variables], dtype=float
+                )
+                neg = np.array(
+                    [float(weights[v][1]) for v in self.variables], dtype=float
+                )
+            except (TypeError, ValueError):
+                pass
+            else:
+                return self._wmc_numpy(pos, neg, semiring)
+        return self._wmc_python(weights, semiring)
+
+    def wmc_batch(self, weights, semiring):
+        """Compute the weighted model count of the BDD for a batch of weight assignments.
+
+        For the (log) probability semirings, the assignments are stored as columns, such that \
+        they are all computed in the same sweep.
+
+        :param weights: list of weights of the variables (see :meth:`wmc`)
+        :param semiring: semiring
+        :return: list of weighted model counts
+        """
+        if self.root < 2 or not weights:
+            return [self.wmc(w, semiring) for w in weights]
+        if np is not None and type(semiring) in (
+            SemiringProbability,
+            SemiringLogProbability,
+        ):
+            try:
+                pos = np.array(
+                    [[float(w[v][0]) for w in weights] for v in self.variables],
+                    dtype=float,
+                )
+                neg = np.array(
+                    [[float(w[v][1]) for w in weights] for v in self.variables],
+                    dtype=float,
+                )
+            except (TypeError, ValueError):
+                pass
+            else:
+                block = max(1, MAX_BLOCK_VALUES // (len(self) + 2))
+                result = []
+                for start in range(0, len(weights), block):
+                    result.extend(
+                        self._wmc_numpy(
+                            pos[:, start : start + block],
+                            neg[:, start : start + block],
+                            semiring,
+                        ).tolist()
+                    )
+                return result
+        return [self._wmc_python(w, semiring) for w in weights]
+
+    def _wmc_numpy(self, pos, neg, semiring):
+        """Compute the weighted model count for the given weights of the variables.
+
+        :param pos: positive weights (one row per variable, optionally with one column per \
+         weight assignment)
+        :param neg: negative weights
+        :param semiring: (log) probability semiring
+        :return: weighted model count (an array with one entry per column for 2D weights)
+        """
+        levels = self._get_levels()
+        if pos.ndim == 1:
+            values = self._values
+        else:
+            values = np.empty((len(self) + 2, pos.shape[1]), dtype=float)
+        values[0] = semiring.zero()
+        values[1] = semiring.one()
+        if isinstance(semiring, SemiringLogProbability):
+            times, plus = np.add, np.logaddexp
+        else:
+            times, plus = np.multiply, np.add
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for slots, var, lo, hi in levels:
+                values[slots] = plus(
+                    times(neg[var], values[lo]), times(pos[var], values[hi])
+                )
+        if pos.ndim == 1:
+            return float(values[self.root])
+        return values[self.root]
+
+    def _wmc_python(self, weights, semiring):
+        values = [semiring.zero(), semiring.one()]
+        for v, low, high in zip(self.var, self.lo, self.hi):
+            pos, neg = weights[v]
+            values.append(
+                semiring.plus(
+                    semiring.times(neg, values[low]), semiring.times(pos, values[high])
+                )
+            )
+        return values[self.root]
+
+
 @transform(LogicDAG, BDD)
 def build_bdd(source, destination, **kwdargs):
     """Build an SDD from another formula.
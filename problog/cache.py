@@ -0,0 +1,267 @@
+"""
+problog.cache - Compilation cache
+---------------------------------
+
+Persistent on-disk cache of compiled knowledge (SDD, d-DNNF).
+
+Compiled formulae are stored under a key that is computed from the structure of the ground
+program (:class:`LogicDAG`) they were compiled from.
+The probabilities of the atoms are not part of the key: when a cached formula is reused, the
+weights of the current ground program are copied into it.
+
+..
+    Part of the ProbLog distribution.
+
+    Copyright 2015 KU Leuven, DTAI Research Group
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+from __future__ import print_function
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from .util import Timer
+
+CACHE_FORMAT_VERSION = 1
+
+
+def formula_hash(formula, target=None):
+    """Compute a hash of the structure of the given ground program.
+
+    The hash covers the node structure, the annotated disjunction groups, the labeled nodes and \
+    the constraints, but not the probabilities of the atoms.
+
+    :param formula: ground program
+    :type formula: LogicDAG
+    :param target: name of the target representation (included in the hash)
+    :type target: str
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    h = hashlib.sha1()
+    h.update(("v%s|%s\n" % (CACHE_FORMAT_VERSION, target)).encode())
+    for i, n, t in formula:
+        if t == "atom":
+            line = "a %r\n" % (n.group,)
+        else:
+            line = "%s %s\n" % (t[0], " ".join(map(str, n.children)))
+        h.update(line.encode())
+    for name, key, label in sorted(
+        formula.get_names_with_label(), key=lambda x: (str(x[2]), str(x[0]))
+    ):
+        h.update(("n %s %s %s\n" % (label, name, key)).encode())
+    for c in formula.constraints():
+        for clause in c.as_clauses():
+            h.update(("c %s\n" % " ".join(map(str, clause))).encode())
+    return h.hexdigest()
+
+
+class CompilationCache(object):
+    """Content-addressed on-disk cache for compiled formulae.
+
+    Entries are evicted in least-recently-used order when the total size of the cache exceeds \
+    ``max_size``.
+
+    :param directory: directory in which to store the cache entries (created if needed)
+    :type directory: str
+    :param max_size: maximal total size of the cache in bytes (0 means unbounded)
+    :type max_size: int
+    """
+
+    extension = ".pcc"
+
+    def __init__(self, directory, max_size=0):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    @classmethod
+    def supports(cls, formula):
+        """Checks whether the given compiled formula can be stored in the cache.
+
+        :param formula: compiled formula
+        :return: True if the formula is an SDD or a d-DNNF
+        """
+        from .sdd_formula import SDD
+        from .ddnnf_formula import DDNNF
+        from .forward import ForwardInference
+
+        if isinstance(formula, ForwardInference):
+            return False
+        return type(formula) in (SDD, DDNNF)
+
+    @classmethod
+    def supports_class(cls, target):
+        """Checks whether creating an object of the given class can use the cache.
+
+        :param target: class of the requested object
+        :return: True if the class (or its default implementation) is cacheable
+        """
+        from .sdd_formula import SDD
+        from .ddnnf_formula import DDNNF
+        from .evaluator import EvaluatableDSP
+
+        return target in (SDD, DDNNF, EvaluatableDSP)
+
+    def get(self, key):
+        """Retrieve the entry stored under the given key.
+
+        :param key: key of the entry
+        :return: stored entry or None if the key is not in the cache
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, "rb") as f:
+                entry = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        try:
+            # Mark as recently used.
+            os.utime(filename, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Store the given entry under the given key.
+
+        :param key: key of the entry
+        :param entry: object to store (should be picklable)
+        """
+        fd, tmpname = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, self._filename(key))
+        except Exception:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _entries(self):
+        result = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.extension):
+                filename = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                result.append((st.st_mtime, st.st_size, filename))
+        return result
+
+    def size(self):
+        """Total size of the cache in bytes."""
+        return sum(s for _, s, _ in self._entries())
+
+    def _evict(self):
+        if not self.max_size:
+            return
+        entries = sorted(self._entries())
+        total = sum(s for _, s, _ in entries)
+        while entries and total > self.max_size:
+            _, size, filename = entries.pop(0)
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for _, _, filename in self._entries():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def compile(self, dag, target, **kwdargs):
+        """Compile the given ground program into the target class, reusing a cached result \
+        when available.
+
+        :param dag: ground program without cycles
+        :type dag: LogicDAG
+        :param target: target class
+        :param kwdargs: additional arguments passed to the transformation
+        :return: compiled formula
+        """
+        logger = logging.getLogger("problog")
+        key = formula_hash(dag, target.__name__)
+        entry = self.get(key)
+        if entry is not None:
+            logger.debug("Compilation cache hit: %s", key)
+            formula, atom_map = entry
+            _update_formula(formula, dag, atom_map)
+            return formula
+
+        logger.debug("Compilation cache miss: %s", key)
+        formula = target.create_from(dag, **kwdargs)
+        if self.supports(formula):
+            with Timer("Storing compiled formula in cache"):
+                database = formula._database
+                formula._database = None
+                try:
+                    self.put(key, (formula, _atom_map(formula, dag)))
+                finally:
+                    formula._database = database
+        return formula
+
+
+def _atom_map(formula, dag):
+    """Map atoms of the source ground program onto atoms of the compiled formula."""
+    from .dd_formula import DD
+
+    if isinstance(formula, DD):
+        # build_dd copies the nodes one by one
+        return {i: i for i in formula.atom2var}
+    else:
+        # Atoms of a d-DNNF are identified by their index in the source formula
+        return {
+            n.identifier: i
+            for i, n, t in formula
+            if t == "atom" and isinstance(n.identifier, int)
+        }
+
+
+def _update_formula(formula, dag, atom_map):
+    """Copy the weights and names of the given ground program into a cached formula."""
+    weights = dag.get_weights()
+    target_weights = formula.get_weights()
+    for i, j in atom_map.items():
+        w = weights.get(i)
+        if j in target_weights and w is not None:
+            target_weights[j] = w
+            formula._nodes[j - 1] = formula._nodes[j - 1]._replace(probability=w)
+
+    # Use the name terms of the current program (they carry the location information).
+    fresh = {name: name for name, _, _ in dag.get_names_with_label()}
+    for label in list(formula._names):
+        formula._names[label] = {
+            fresh.get(name, name): key for name, key in formula._names[label].items()
+        }
+    formula._database = dag.database
@@ -0,0 +1,408 @@
+"""
+problog.circuit - Flattened circuits
+------------------------------------
+
+Array-based representation of NNF circuits for vectorized evaluation.
+
+A :class:`FlatCircuit` stores the children of all nodes of a formula in CSR form (offsets and \
+indices) and groups the compound nodes per level, such that all nodes of a level can be \
+evaluated with a single NumPy ``reduceat`` operation.
+Evaluation is vectorized over a trailing dimension, which allows evaluating many weight \
+assignments (or many queries) in one pass.
+
+..
+    Part of the ProbLog distribution.
+
+    Copyright 2015 KU Leuven, DTAI Research Group
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+from __future__ import print_function
+
+from .errors import InstallError
+from .evaluator import FormulaEvaluator, SemiringProbability, SemiringLogProbability
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NODE_ATOM = 0
+NODE_CONJ = 1
+NODE_DISJ = 2
+
+# Maximal number of values (nodes x columns) computed in one evaluation pass.
+MAX_BLOCK_VALUES = 1 << 24
+
+
+def is_vectorizable(semiring):
+    """Checks whether the given semiring can be evaluated on a flattened circuit.
+
+    :param semiring: semiring
+    :return: True if NumPy is available and the semiring is a (log) probability semiring
+    """
+    return np is not None and type(semiring) in (
+        SemiringProbability,
+        SemiringLogProbability,
+    )
+
+
+class FlatCircuit(object):
+    """Flattened representation of an NNF formula (negation only on atoms).
+
+    Values are stored in slots:
+
+        * slot 0: True
+        * slot 1: False
+        * slot ``i + 1``: positive value of node ``i``
+        * slot ``size + i + 1``: negative value of atom ``i``
+
+    :param formula: formula in negation normal form
+    :type formula: LogicNNF | DDNNF
+    :raise InstallError: when NumPy is not available
+    :raise ValueError: when a compound node is negated
+    """
+
+    def __init__(self, formula):
+        if np is None:
+            raise InstallError("Vectorized evaluation requires the NumPy package.")
+
+        size = len(formula)
+        self.size = size
+
+        node_type = np.zeros(size + 1, dtype=np.int8)
+        child_ptr = np.zeros(size + 2, dtype=np.int64)
+        child_idx = []
+        atoms = []
+        for i, n, t in formula:
+            if t == "atom":
+                node_type[i] = NODE_ATOM
+                atoms.append(i)
+            else:
+                node_type[i] = NODE_CONJ if t == "conj" else NODE_DISJ
+                for c in n.children:
+                    child_idx.append(self.slot(c, formula))
+            child_ptr[i + 1] = len(child_idx)
+
+        self.node_type = node_type
+        self.child_ptr = child_ptr
+        self.child_idx = np.array(child_idx, dtype=np.int64)
+        self.atoms = np.array(atoms, dtype=np.int64)
+
+        self.levels = self._compute_levels()
+        self._reachable = None
+
+    def slot(self, key, formula=None):
+        """Get the value slot of the given key.
+
+        :param key: key of a node (TRUE, FALSE, positive or negated atom)
+        :param formula: formula used to verify that negated nodes are atoms
+        :return: slot
+        """
+        if key == 0:
+            return 0
+        elif key is None:
+            return 1
+        elif key > 0:
+            return key + 1
+        else:
+            if formula is not None and type(formula.get_node(-key)).__name__ != "atom":
+                raise ValueError("Formula is not in negation normal form.")
+            return self.size - key + 1
+
+    def children(self, index):
+        """Get the child slots of the given node.
+
+        :param index: index of the node
+        :return: array of slots
+        """
+        return self.child_idx[self.child_ptr[index] : self.child_ptr[index + 1]]
+
+    def _compute_heights(self):
+        """Compute the height of each node (atoms have height 0).
+
+        :return: array with the height of each node (index 0 is unused)
+        """
+        size = self.size
+        node_type = self.node_type
+        child_ptr = self.child_ptr.tolist()
+        child_idx = self.child_idx.tolist()
+        # Height per slot: True, False and negated atoms have height 0.
+        height = [0] * (2 * size + 2)
+        counts = np.diff(self.child_ptr[1:])
+        parents = np.repeat(np.arange(1, size + 1), counts)
+        if np.all(self.child_idx - 1 < parents):
+            # Children have a lower index than their parents (this is the common case).
+            order = np.nonzero(node_type[1:] != NODE_ATOM)[0] + 1
+        else:
+            order = self._topological_order()
+        for i in order.tolist():
+            h = 0
+            for s in child_idx[child_ptr[i] : child_ptr[i + 1]]:
+                if height[s] > h:
+                    h = height[s]
+            height[i + 1] = h + 1
+        return np.array(height[1 : size + 2], dtype=np.int64)
+
+    def _topological_order(self):
+        """Order the compound nodes such that children come before their parents.
+
+        :return: array of node indices
+        """
+        size = self.size
+        compound = (self.node_type != NODE_ATOM).tolist()
+        child_ptr = self.child_ptr.tolist()
+        child_idx = self.child_idx.tolist()
+        visited = [False] * (size + 1)
+        order = []
+        for root in range(1, size + 1):
+            if visited[root] or not compound[root]:
+                continue
+            visited[root] = True
+            stack = [(root, child_ptr[root])]
+            while stack:
+                i, p = stack[-1]
+                if p == child_ptr[i + 1]:
+                    stack.pop()
+                    order.append(i)
+                    continue
+                stack[-1] = (i, p + 1)
+                c = child_idx[p] - 1
+                if 1 <= c <= size and compound[c] and not visited[c]:
+                    visited[c] = True
+                    stack.append((c, child_ptr[c]))
+        return np.array(order, dtype=np.int64)
+
+    def _compute_levels(self):
+        """Group compound nodes by their height in the circuit.
+
+        The compound nodes are sorted once by height and type; the children of each group are \
+        consecutive slices of a single gathered child array.
+
+        :return: list of (conj_slots, conj_children, conj_offsets, disj_slots, disj_children, \
+         disj_offsets) for each level starting from the lowest.
+        """
+        size = self.size
+        if not size:
+            return []
+        node_type = self.node_type
+        height = self._compute_heights()
+
+        nodes = np.nonzero(node_type[1:] != NODE_ATOM)[0] + 1
+        if not len(nodes):
+            return []
+        key = height[nodes] * 3 + node_type[nodes]
+        order = np.argsort(key, kind="stable")
+        nodes, key = nodes[order], key[order]
+
+        # Gather the children of the sorted nodes (CSR).
+        start = self.child_ptr[nodes]
+        counts = self.child_ptr[nodes + 1] - start
+        ptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        children = self.child_idx[
+            np.repeat(start - ptr[:-1], counts) + np.arange(ptr[-1], dtype=np.int64)
+        ]
+
+        max_height = int(height[nodes[-1]])
+        bounds = np.searchsorted(
+            key, np.arange(3, 3 * max_height + 6, dtype=np.int64), side="left"
+        ).tolist()
+        slots = nodes + 1
+        levels = []
+        for level in range(1, max_height + 1):
+            entry = []
+            for ntype in (NODE_CONJ, NODE_DISJ):
+                a = bounds[level * 3 + ntype - 3]
+                b = bounds[level * 3 + ntype - 2]
+                entry += [
+                    slots[a:b],
+                    children[ptr[a] : ptr[b]],
+                    ptr[a:b] - ptr[a],
+                ]
+            levels.append(tuple(entry))
+        return levels
+
+    def initial_values(self, weights, semiring, columns=1):
+        """Create the value array with the given atom weights.
+
+        :param weights: dictionary of atom index to (positive, negative) internal weights
+        :param semiring: (log) probability semiring
+        :param columns: number of columns (independent evaluations)
+        :return: array of shape (2 * size + 2, columns)
+        """
+        values = np.empty((2 * self.size + 2, columns), dtype=float)
+        values[0] = semiring.one()
+        values[1] = semiring.zero()
+        for i in self.atoms:
+            w = weights.get(int(i))
+            if w is None:
+                values[i + 1] = semiring.one()
+                values[self.size + i + 1] = semiring.one()
+            else:
+                values[i + 1] = w[0]
+                values[self.size + i + 1] = w[1]
+        return values
+
+    def batch_values(self, weights, semiring, columns=1):
+        """Create the value array for a batch of weight assignments.
+
+        :param weights: list of N dictionaries of atom index to (positive, negative) internal \
+         weights
+        :param semiring: (log) probability semiring
+        :param columns: number of (consecutive) columns per weight assignment
+        :return: array of shape (2 * size + 2, N * columns)
+        """
+        one = semiring.one()
+        neutral = (one, one)
+        atoms = self.atoms.tolist()
+        pos = np.empty((len(atoms), len(weights)), dtype=float)
+        neg = np.empty((len(atoms), len(weights)), dtype=float)
+        for r, row in enumerate(weights):
+            row = [row.get(i, neutral) for i in atoms]
+            pos[:, r] = [w[0] for w in row]
+            neg[:, r] = [w[1] for w in row]
+        values = np.empty((2 * self.size + 2, len(weights) * columns), dtype=float)
+        values[0] = one
+        values[1] = semiring.zero()
+        values[self.atoms + 1] = np.repeat(pos, columns, axis=1)
+        values[self.size + self.atoms + 1] = np.repeat(neg, columns, axis=1)
+        return values
+
+    def evaluate(self, values, semiring):
+        """Compute the values of all compound nodes in place.
+
+        :param values: value array as created by :meth:`initial_values` (atoms filled in)
+        :param semiring: (log) probability semiring
+        :return: values
+        """
+        if isinstance(semiring, SemiringLogProbability):
+            times, plus = np.add, np.logaddexp
+        else:
+            times, plus = np.multiply, np.add
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for cslots, cchildren, coffsets, dslots, dchildren, doffsets in self.levels:
+                if len(cslots):
+                    values[cslots] = times.reduceat(values[cchildren], coffsets, axis=0)
+                if len(dslots):
+                    values[dslots] = plus.reduceat(values[dchildren], doffsets, axis=0)
+        return values
+
+    def derivatives(self, values, semiring, root_derivative=None):
+        """Compute the derivatives of the root with respect to all slots (downward pass).
+
+        The derivative of a child of a conjunction is the product of its siblings.
+        It is obtained by dividing the product of the non-zero children by the value of the \
+        child, taking care of zero-valued children.
+
+        :param values: evaluated value array (as returned by :meth:`evaluate`) with one column
+        :param semiring: (log) probability semiring
+        :param root_derivative: derivative of the root (default: one)
+        :return: array of derivatives with one entry per slot
+        """
+        values = values.reshape(-1)
+        zero = semiring.zero()
+        derivs = np.full(values.shape, zero, dtype=float)
+        if not self.size:
+            return derivs
+        derivs[self.size + 1] = semiring.one() if root_derivative is None else root_derivative
+
+        if isinstance(semiring, SemiringLogProbability):
+            times, plus, divide, neutral = np.add, np.logaddexp, np.subtract, 0.0
+        else:
+            times, plus, divide, neutral = np.multiply, np.add, np.divide, 1.0
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for cslots, cchildren, coffsets, dslots, dchildren, doffsets in reversed(
+                self.levels
+            ):
+                if len(cslots):
+                    counts = np.diff(np.append(coffsets, len(cchildren)))
+                    parent = np.repeat(derivs[cslots], counts)
+                    child_values = values[cchildren]
+                    is_zero = child_values == zero
+                    nonzero = np.where(is_zero, neutral, child_values)
+                    product = np.repeat(times.reduceat(nonzero, coffsets), counts)
+                    zeros = np.repeat(np.add.reduceat(is_zero.astype(np.int64), coffsets), counts)
+                    siblings = np.where(
+                        zeros - is_zero > 0, zero, divide(product, nonzero)
+                    )
+                    plus.at(derivs, cchildren, times(parent, siblings))
+                if len(dslots):
+                    counts = np.diff(np.append(doffsets, len(dchildren)))
+                    plus.at(derivs, dchildren, np.repeat(derivs[dslots], counts))
+        return derivs
+
+    def reachable(self):
+        """Determine which slots are reachable from the root (the last node).
+
+        :return: boolean array with one entry per slot
+        """
+        if self._reachable is None:
+            reach = np.zeros(2 * self.size + 2, dtype=bool)
+            if self.size:
+                reach[self.size + 1] = True
+            for cslots, cchildren, coffsets, dslots, dchildren, doffsets in reversed(
+                self.levels
+            ):
+                for slots, children, offsets in (
+                    (cslots, cchildren, coffsets),
+                    (dslots, dchildren, doffsets),
+                ):
+                    if len(slots):
+                        counts = np.diff(np.append(offsets, len(children)))
+                        reach[children[np.repeat(reach[slots], counts)]] = True
+            self._reachable = reach
+        return self._reachable
+
+    def block_size(self, columns):
+        """Number of columns that can be evaluated in one pass."""
+        return max(1, min(columns, MAX_BLOCK_VALUES // (2 * self.size + 2)))
+
+
+class VectorizedFormulaEvaluator(FormulaEvaluator):
+    """Evaluator for NNF formulae that computes all node weights in one vectorized pass.
+
+    Only supports the (log) probability semirings.
+    Like the default evaluator, it does not perform smoothing.
+    """
+
+    def __init__(self, formula, semiring, weights=None):
+        FormulaEvaluator.__init__(self, formula, semiring, weights)
+        self.circuit = FlatCircuit(formula)
+        self._values = None
+
+    def set_weights(self, weights):
+        FormulaEvaluator.set_weights(self, weights)
+        self._values = None
+
+    def update_weights(self, weights):
+        FormulaEvaluator.update_weights(self, weights)
+        self._values = None
+
+    def propagate(self):
+        FormulaEvaluator.propagate(self)
+        self._values = None
+
+    def get_weight(self, index, smooth=None):
+        if index == self.formula.TRUE:
+            return self.semiring.one()
+        elif index == self.formula.FALSE:
+            return self.semiring.zero()
+        if self._values is None:
+            values = self.circuit.initial_values(self._fact_weights, self.semiring)
+            self._values = self.circuit.evaluate(values, self.semiring)[:, 0]
+        if index < 0 and type(self.formula.get_node(-index)).__name__ != "atom":
+            return self.semiring.negate(float(self._values[self.circuit.slot(-index)]))
+        return float(self._values[self.circuit.slot(index)])
@@ -1,14 +1,17 @@
 from __future__ import print_function
 
+import heapq
 import os
 
+from array import array
+
 from collections import defaultdict, namedtuple
 
 from .program import LogicProgram, PrologFile
 from .logic import *
 
 from .errors import GroundingError, InvalidValue
-from .util import OrderedSet
+from .engine_unify import compile_head
 
 
 class ClauseDB(LogicProgram):
@@ -21,8 +24,8 @@ class ClauseDB(LogicProgram):
         Pointer to all definitions of functor/arity.
         Definitions can be: ``fact``, ``clause`` or ``adc``.
 
-    clause( functor, arguments, bodynode, varcount )
-        Single clause. Functor is the head functor, Arguments are the head arguments. Body node is a pointer to the node representing the body. Var count is the number of variables in head and body.
+    clause( functor, arguments, bodynode, varcount, head )
+        Single clause. Functor is the head functor, Arguments are the head arguments. Body node is a pointer to the node representing the body. Var count is the number of variables in head and body. Head contains the unification instructions for the head arguments (see :func:`problog.engine_unify.compile_head`).
 
     fact( functor, arguments, probability )
         Single fact.
@@ -59,6 +62,7 @@ class ClauseDB(LogicProgram):
             "locvars",
             "group",
             "location",
+            "head",
         ),
     )
     _fact = namedtuple("fact", ("functor", "args", "probability", "location"))
@@ -218,6 +222,7 @@ class ClauseDB(LogicProgram):
                 locvars,
                 group,
                 head.location,
+                compile_head(head.args),
             )
         )
         return self._add_define_node(head, clause_node)
@@ -693,6 +698,23 @@ class ClauseDB(LogicProgram):
             i += self.__offset
             yield i, n
 
+    def statistics(self):
+        """Count the nodes of the database by type.
+
+        :return: number of facts, clauses and defined predicates, and the total number of nodes
+        :rtype: dict
+        """
+        counts = defaultdict(int)
+        for node in self.iter_nodes():
+            if node:
+                counts[type(node).__name__] += 1
+        return {
+            "facts": counts["fact"],
+            "clauses": counts["clause"],
+            "predicates": counts["define"],
+            "nodes": len(self),
+        }
+
     def iter_nodes(self):
         if self.__parent:
             for n in self.__parent.iter_nodes():
@@ -942,61 +964,150 @@ def intersection(l1, l2):
 
 
 class ClauseIndex(list):
+    """List of the clauses of a predicate with an index on their arguments.
+
+    For each argument, the positions of the clauses are stored per ground value of the argument \
+    as sorted integer arrays, together with the positions of the clauses in which the argument \
+    is not ground.
+    A lookup starts from the most selective bound argument and filters the candidates on the \
+    other bound arguments.
+    For large predicates, composite indices on multiple arguments are built on demand.
+    Erased clauses are marked in a tombstone bitmap.
+
+    :param parent: database containing the clauses
+    :type parent: ClauseDB
+    :param arity: arity of the predicate
+    :type arity: int
+    """
+
+    # Minimal number of clauses before composite indices are built.
+    composite_threshold = 10000
+
     def __init__(self, parent, arity):
         list.__init__(self)
         self.__parent = parent
-        self.__basetype = OrderedSet
-        self.__index = [defaultdict(self.__basetype) for _ in range(0, arity)]
-        self.__optimized = False
-        self.__erased = set()
+        self.__keys = []  # ground arguments of each clause (None if not ground)
+        self.__index = [{} for _ in range(0, arity)]
+        self.__nonground = [array("l") for _ in range(0, arity)]
+        self.__composite = {}  # bound arguments => (index, nonground)
+        self.__tombstones = bytearray()
+        self.__erased = 0
+        self.__positions = None  # clause => position (built on first erase)
 
     def find(self, arguments):
-        results = None
-        for i, arg in enumerate(arguments):
-            if not is_ground(arg):
-                pass  # Variable => no restrictions
-            else:
-                curr = self.__index[i].get(arg)
-                none = self.__index[i].get(None, self.__basetype())
-                if curr is None:
-                    curr = none
-                else:
-                    curr |= none
+        """Find the clauses that may match the given call arguments.
 
-                if results is None:  # First argument with restriction
-                    results = curr
-                else:
-                    results = results & curr  # for some reason &= doesn't work here
-            if results is not None and not results:
-                return []
-        if results is None:
+        :param arguments: arguments of the call
+        :return: clauses in order of definition (can contain false positives)
+        """
+        bound = [i for i, arg in enumerate(arguments) if is_ground(arg)]
+        if not bound:
             if self.__erased:
-                return OrderedSet(self) - self.__erased
+                return [c for c, t in zip(self, self.__tombstones) if not t]
             else:
                 return self
+
+        if len(bound) > 1 and len(self) >= self.composite_threshold:
+            index, nonground = self._get_composite(tuple(bound))
+            exact = index.get(tuple(arguments[i] for i in bound), ())
+            positions = _merge_positions(exact, nonground)
+            # Positions from the composite index match on all bound arguments.
+            remaining = bound if nonground else ()
         else:
-            if self.__erased:
-                return results - self.__erased
+            # Start from the most selective argument.
+            best = None
+            for i in bound:
+                exact = self.__index[i].get(arguments[i], ())
+                size = len(exact) + len(self.__nonground[i])
+                if size == 0:
+                    return []
+                elif best is None or size < best[0]:
+                    best = size, i, exact
+            _, first, exact = best
+            positions = _merge_positions(exact, self.__nonground[first])
+            remaining = [i for i in bound if i != first]
+
+        if not remaining and not self.__erased:
+            return [self[p] for p in positions]
+
+        keys = self.__keys
+        tombstones = self.__tombstones
+        erased = self.__erased
+        result = []
+        for p in positions:
+            if erased and tombstones[p]:
+                continue
+            key = keys[p]
+            for i in remaining:
+                k = key[i]
+                if k is not None and k != arguments[i]:
+                    break
             else:
-                return results
+                result.append(self[p])
+        return result
 
-    def _add(self, key, item):
-        for i, k in enumerate(key):
-            self.__index[i][k].add(item)
+    def _get_composite(self, bound):
+        composite = self.__composite.get(bound)
+        if composite is None:
+            composite = {}, array("l")
+            for p, key in enumerate(self.__keys):
+                self._add_composite(composite, bound, p, key)
+            self.__composite[bound] = composite
+        return composite
+
+    @staticmethod
+    def _add_composite(composite, bound, position, key):
+        index, nonground = composite
+        ckey = tuple(key[i] for i in bound)
+        if any(k is None for k in ckey):
+            nonground.append(position)
+        else:
+            _add_position(index, ckey, position)
 
     def append(self, item):
         list.append(self, item)
-        key = []
         try:
             args = self.__parent.get_node(item).args
         except AttributeError:
             args = [None] * self.__parent.get_node(item).arity
-        for arg in args:
-            if is_ground(arg):
-                key.append(arg)
+        key = tuple(arg if is_ground(arg) else None for arg in args)
+
+        position = len(self.__keys)
+        self.__keys.append(key)
+        self.__tombstones.append(0)
+        for i, k in enumerate(key):
+            if k is None:
+                self.__nonground[i].append(position)
             else:
-                key.append(None)
-        self._add(key, item)
+                _add_position(self.__index[i], k, position)
+        for bound, composite in self.__composite.items():
+            self._add_composite(composite, bound, position, key)
+        if self.__positions is not None:
+            self.__positions[item] = position
 
     def erase(self, items):
-        self.__erased |= set(items)
+        if self.__positions is None:
+            self.__positions = {c: p for p, c in enumerate(self)}
+        for item in list(items):
+            p = self.__positions.get(item)
+            if p is not None and not self.__tombstones[p]:
+                self.__tombstones[p] = 1
+                self.__erased += 1
+
+
+def _add_position(index, key, position):
+    bucket = index.get(key)
+    if bucket is None:
+        index[key] = array("l", (position,))
+    else:
+        bucket.append(position)
+
+
+def _merge_positions(a, b):
+    """Merge two sorted sequences of positions."""
+    if not b:
+        return a
+    elif not a:
+        return b
+    else:
+        return heapq.merge(a, b)
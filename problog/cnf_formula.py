@@ -24,6 +24,10 @@ Provides access to CNF and weighted CNF.
 """
 from __future__ import print_function
 
+import shutil
+import tempfile
+from io import StringIO
+
 from .formula import BaseFormula, LogicDAG
 
 from .core import transform
@@ -106,26 +110,69 @@ class CNF(BaseFormula):
         :param names: Print names in comments
         :return: string in DIMACS format
         """
+        output = StringIO()
+        self.write_dimacs(
+            output,
+            partial=partial,
+            weighted=weighted,
+            semiring=semiring,
+            smart_constraints=smart_constraints,
+            names=names,
+            invert_weights=invert_weights,
+        )
+        return output.getvalue()
+
+    def write_dimacs(
+        self,
+        output,
+        partial=False,
+        weighted=False,
+        semiring=None,
+        smart_constraints=False,
+        names=False,
+        invert_weights=False,
+    ):
+        """Write the CNF in DIMACS format to the given file.
+
+        The clauses are generated once and written to a temporary file while they are counted, \
+        such that the DIMACS representation is never stored in memory as a whole.
+        The header is written first and followed by the content of the temporary file.
+
+        :param output: file object to write to
+        :param partial: split variables if possibly true / certainly true
+        :param weighted: created a weighted (False, :class:`int`, :class:`float`)
+        :param semiring: semiring for weight transformation (if weighted)
+        :param names: Print names in comments
+        """
         if weighted:
             t = "wcnf"
         else:
             t = "cnf"
 
-        header, content = self._contents(
+        options = dict(
             partial=partial,
             weighted=weighted,
             semiring=semiring,
             smart_constraints=smart_constraints,
             invert_weights=invert_weights,
         )
-
-        result = "p %s %s\n" % (t, " ".join(map(str, header)))
-        if names:
-            tpl = "c {{:<{}}} {{}}\n".format(len(str(self._atomcount)) + 1)
-            for n, i, l in self.get_names_with_label():
-                result += tpl.format(i, n)
-        result += "\n".join(map(lambda cl: " ".join(map(str, cl)) + " 0", content))
-        return result
+        info = {}
+        clausecount = 0
+        with tempfile.TemporaryFile("w+") as body:
+            separator = ""
+            for cl in self._iter_contents(info, **options):
+                body.write(separator + " ".join(map(str, cl)) + " 0")
+                separator = "\n"
+                clausecount += 1
+            header = [info["atomcount"], clausecount] + info["w_max"]
+
+            output.write("p %s %s\n" % (t, " ".join(map(str, header))))
+            if names:
+                tpl = "c {{:<{}}} {{}}\n".format(len(str(self._atomcount)) + 1)
+                for n, i, l in self.get_names_with_label():
+                    output.write(tpl.format(i, n))
+            body.seek(0)
+            shutil.copyfileobj(body, output)
 
     def to_lp(self, partial=False, semiring=None, smart_constraints=False):
         """Transfrom to CPLEX lp format (MIP program).
@@ -206,6 +253,34 @@ class CNF(BaseFormula):
         smart_constraints=False,
         invert_weights=False,
     ):
+        info = {}
+        clauses = list(
+            self._iter_contents(
+                info,
+                partial=partial,
+                weighted=weighted,
+                semiring=semiring,
+                smart_constraints=smart_constraints,
+                invert_weights=invert_weights,
+            )
+        )
+        return [info["atomcount"], len(clauses)] + info["w_max"], clauses
+
+    def _iter_contents(
+        self,
+        info,
+        partial=False,
+        weighted=False,
+        semiring=None,
+        smart_constraints=False,
+        invert_weights=False,
+    ):
+        """Generate the clauses of the CNF.
+
+        :param info: dictionary in which the number of atoms (``atomcount``) and the weight \
+         of hard clauses (``w_max``) are stored
+        :return: generator of clauses (lists of integers)
+        """
         # Helper function to determine the certainly true / possibly true names (for partial)
 
         ct = lambda i: 2 * i
@@ -244,23 +319,20 @@ class CNF(BaseFormula):
         atomcount = self.atomcount
         if partial:
             atomcount *= 2
-        clausecount = self.clausecount
-        if partial:
-            clausecount += atomcount
-
-        clauses = []
+        info["atomcount"] = atomcount
+        info["w_max"] = w_max
 
         if partial:
             # For each atom: add constraint
             for a in range(1, self.atomcount + 1):
-                clauses.append(w_max + [pt(a), -ct(a)])
+                yield w_max + [pt(a), -ct(a)]
 
                 if weighted:
                     w_pos, w_neg = weights.get(a, (semiring.one(), semiring.one()))
                     if not semiring.is_one(w_pos):
-                        clauses.append([-wt(w_pos), -ct(a)])
+                        yield [-wt(w_pos), -ct(a)]
                     if not semiring.is_one(w_neg):
-                        clauses.append([-wt(w_neg), pt(a)])
+                        yield [-wt(w_neg), pt(a)]
 
             # For each clause:
             for c in self.clauses:
@@ -272,37 +344,36 @@ class CNF(BaseFormula):
                     head1, head2 = ct(head), pt(head)
                     if head_neg:
                         head1, head2 = -head1, -head2
-                    clauses.append(w_max + [head1, head2] + list(map(cpt, body)))
+                    yield w_max + [head1, head2] + list(map(cpt, body))
                 elif smart_constraints and not head:
                     # It's a constraint => add an indicator variable.
                     # a \/ -b ===> -pt(a) \/ I  => for all
                     atomcount += 1
+                    info["atomcount"] = atomcount
                     ind = atomcount
                     v = []
                     for b in body:
-                        clauses.append(w_max + [-ct(abs(b)), ind])
-                        clauses.append(w_max + [pt(abs(b)), ind])
+                        yield w_max + [-ct(abs(b)), ind]
+                        yield w_max + [pt(abs(b)), ind]
                         v += [ct(abs(b)), -pt(abs(b))]
-                    clauses.append(w_max + v + [-ind])
-                    clauses.append(w_max + list(map(cpt, body)) + [-ind])
+                    yield w_max + v + [-ind]
+                    yield w_max + list(map(cpt, body)) + [-ind]
                 else:
-                    clauses.append(w_max + list(map(cpt, body)))
+                    yield w_max + list(map(cpt, body))
         else:
             if weighted:
                 for a in range(1, self.atomcount + 1):
                     w_pos, w_neg = weights.get(a, (semiring.one(), semiring.one()))
                     if not semiring.is_one(w_pos):
-                        clauses.append([-wt(w_pos), -a])
+                        yield [-wt(w_pos), -a]
                     if not semiring.is_one(w_neg):
-                        clauses.append([-wt(w_neg), a])
+                        yield [-wt(w_neg), a]
             for c in self.clauses:
                 head, body = c[0], c[1:]
                 if head is None or type(head) == bool and not head:
-                    clauses.append(w_max + list(body))
+                    yield w_max + list(body)
                 else:
-                    clauses.append(w_max + [head] + list(body))
-
-        return [atomcount, len(clauses)] + w_max, clauses
+                    yield w_max + [head] + list(body)
 
     def from_partial(self, atoms):
         """Translates a (complete) conjunction in the partial formula back to the complete formula.
@@ -357,7 +428,7 @@ def clarks_completion(source, destination, force_atoms=False, **kwdargs):
     :param kwdargs: additional options (ignored)
     :return: destination
     """
-    with Timer("Clark's completion"):
+    with Timer("Clark's completion") as timer:
         # Each rule in the source formula will correspond to an atom.
         num_atoms = len(source)
 
@@ -392,4 +463,5 @@ def clarks_completion(source, destination, force_atoms=False, **kwdargs):
         for n, i, l in source.get_names_with_label():
             destination.add_name(n, i, l)
 
+        timer.count(atoms=destination.atomcount, clauses=destination.clausecount)
         return destination
@@ -108,7 +108,8 @@ class ProbLog(object):
         """
 
         for d in cls.create_as[target]:
-            if type(src) == d:
+            # The source is of class d, or it is constructed in the same way as d.
+            if type(src) == d or d in cls.create_as.get(type(src), ()):
                 return src.clone(target(**kwdargs))
 
         # Find transformation paths from source to target.
@@ -47,7 +47,7 @@ def break_cycles(source, target, translation=None, **kwdargs):
     """
 
     logger = logging.getLogger("problog")
-    with Timer("Cycle breaking"):
+    with Timer("Cycle breaking") as timer:
         cycles_broken = set()
         content = set()
         if translation is None:
@@ -87,6 +87,7 @@ def break_cycles(source, target, translation=None, **kwdargs):
                 target.add_name(q, newnode, target.LABEL_EVIDENCE_NEG)
             else:
                 target.add_name(q, newnode, target.LABEL_EVIDENCE_MAYBE)
+        timer.count(nodes=len(target), cycles_broken=len(cycles_broken))
 
         logger.debug("Ground program size: %s", len(target))
         return target
@@ -24,6 +24,7 @@ Common interface to decision diagrams (BDD, SDD).
 
 from __future__ import print_function
 
+import logging
 
 from .util import Timer, mktempfile
 from .formula import LogicFormula, atom, LogicNNF
@@ -36,13 +37,22 @@ from .evaluator import (
 )
 from .errors import InconsistentEvidenceError
 
+logger = logging.getLogger("problog")
+
 
 class DD(LogicFormula, EvaluatableDSP):
     """Root class for bottom-up compiled decision diagrams."""
 
-    def __init__(self, **kwdargs):
+    def __init__(self, keep_inodes=False, **kwdargs):
+        """Create a decision diagram.
+
+        :param keep_inodes: keep the internal nodes of all intermediate (unlabeled) nodes \
+        (by default they are dereferenced as soon as all their parents are compiled)
+        :param kwdargs: arguments for :class:`LogicFormula`
+        """
         LogicFormula.__init__(self, **kwdargs)
 
+        self.keep_inodes = keep_inodes
         self.inode_manager = None
 
         self.atom2var = {}  # index to node
@@ -91,21 +101,120 @@ class DD(LogicFormula, EvaluatableDSP):
                 mgr.nodes.append(None)
             result = mgr.nodes[index - 1]
             if result is None:
-                result = self._create_inode(node)
-                mgr.nodes[index - 1] = result
+                self._build_inodes([index])
+                result = mgr.nodes[index - 1]
         return mgr.negate(result) if negate else result
 
-    def _create_inode(
-        self, node
-    ):  # TODO: Recursion is slow in python. Change build_dd to not use this and get_inode?
-        if type(node).__name__ == "conj":
-            return self.get_manager().conjoin(
-                *[self.get_inode(c) for c in node.children]
-            )
-        else:
-            return self.get_manager().disjoin(
-                *[self.get_inode(c) for c in node.children]
-            )
+    def _build_inodes(self, roots, progress=None):
+        """Compile the internal nodes of the given nodes and their descendants.
+
+        The nodes are compiled bottom-up using an explicit stack, so the depth of the formula \
+        is not limited by Python's recursion limit.
+        Unless ``keep_inodes`` is set, the internal node of an intermediate node is \
+        dereferenced as soon as all its parents (within this build) are compiled.
+        Internal nodes that existed before the call and those of the roots are always kept.
+
+        :param roots: indices of the nodes to compile (positive)
+        :type roots: collections.Iterable[int]
+        :param progress: callback called as ``progress(done, total)`` while compiling
+        :type progress: callable
+        """
+        mgr = self.get_manager()
+        nodes = mgr.nodes
+        if len(nodes) < len(self):
+            nodes.extend([None] * (len(self) - len(nodes)))
+
+        # Collect the nodes to compile in post-order and count their parents.
+        order = []
+        parents = {}
+        visited = set()
+        stack = []
+        for root in roots:
+            if nodes[root - 1] is None:
+                stack.append((root, False))
+            while stack:
+                index, expanded = stack.pop()
+                if expanded:
+                    order.append(index)
+                    continue
+                elif index in visited:
+                    continue
+                visited.add(index)
+                stack.append((index, True))
+                for c in self.get_node(index).children:
+                    if self.is_false(c) or self.is_true(c):
+                        continue
+                    c = abs(c)
+                    if (
+                        nodes[c - 1] is not None
+                        or type(self.get_node(c)).__name__ == "atom"
+                    ):
+                        continue
+                    parents[c] = parents.get(c, 0) + 1
+                    if c not in visited:
+                        stack.append((c, False))
+
+        total = len(order)
+        if total == 0:
+            return
+        keep = set(roots)
+        release = not self.keep_inodes
+        step = max(total // 10, 1)
+        for done, index in enumerate(order, 1):
+            node = self.get_node(index)
+            children = []
+            negated = []
+            for c in node.children:
+                if self.is_false(c):
+                    children.append(mgr.false())
+                elif self.is_true(c):
+                    children.append(mgr.true())
+                else:
+                    if type(self.get_node(abs(c))).__name__ == "atom":
+                        inode = mgr.literal(self.atom2var[abs(c)])
+                    else:
+                        inode = nodes[abs(c) - 1]
+                    if c < 0:
+                        inode = mgr.negate(inode)
+                        negated.append(inode)
+                    children.append(inode)
+            if type(node).__name__ == "conj":
+                nodes[index - 1] = mgr.conjoin(*children)
+            else:
+                nodes[index - 1] = mgr.disjoin(*children)
+            if negated:
+                mgr.deref(*negated)
+
+            if release:
+                for c in node.children:
+                    if c is None:
+                        continue
+                    c = abs(c)
+                    count = parents.get(c)
+                    if count is None:
+                        continue
+                    if count == 1:
+                        del parents[c]
+                        if c not in keep:
+                            mgr.deref(nodes[c - 1])
+                            nodes[c - 1] = None
+                    else:
+                        parents[c] = count - 1
+            if done % step == 0 or done == total:
+                self._compile_step(done, total)
+                if progress is not None:
+                    progress(done, total)
+                logger.debug("Compiled %s/%s nodes", done, total)
+
+    def _compile_step(self, done, total):
+        """Called after each batch of nodes compiled by :meth:`_build_inodes`.
+
+        All nodes compiled so far are referenced.
+
+        :param done: number of nodes compiled
+        :param total: total number of nodes to compile
+        """
+        pass
 
     def set_inode(self, index, node):
         """Set the internal node for the given index.
@@ -131,20 +240,126 @@ class DD(LogicFormula, EvaluatableDSP):
         else:
             return DDEvaluator(self, semiring, weights, **kwargs)
 
-    def build_dd(self):
-        """Build the internal representation of the formula."""
+    def get_weight_columns(self):
+        """Get the mapping of columns of a weight matrix onto the atoms of this formula.
+
+        Columns correspond to the variables of the decision diagram (see ``atom2var``).
+
+        :return: dictionary of column index to atom key
+        :rtype: dict[int, int]
+        """
+        return dict(self.var2atom)
+
+    def _get_batch_evaluator(self, evaluator, semiring, evidence, weights, **kwargs):
+        if isinstance(evaluator, DDEvaluator):
+            # Reuse the compiled evidence and query nodes.
+            evaluator.set_given_weights(weights)
+            return evaluator
+        else:
+            return self.get_evaluator(semiring, evidence, weights, **kwargs)
+
+    def build_dd(self, progress=None):
+        """Build the internal representation of the formula.
+
+        :param progress: callback called as ``progress(done, total)`` while compiling
+        :type progress: callable
+        """
         required_nodes = set(
             [abs(n) for q, n, l in self.labeled() if self.is_probabilistic(n)]
-        )
-        required_nodes |= set(
-            [abs(n) for q, n, l in self.labeled() if self.is_probabilistic(n)]
         )  # TODO self.evidence_all() ipv self.labeled() ? see forward.py
+        required_nodes = sorted(
+            n for n in required_nodes if type(self.get_node(n)).__name__ != "atom"
+        )
 
-        for n in required_nodes:
-            self.get_inode(n)
+        self._build_inodes(required_nodes, progress=progress)
 
         self.build_constraint_dd()
 
+    def update(self, source):
+        """Update this diagram to represent the given formula, reusing the compiled parts.
+
+        The nodes of the source formula are mapped onto structurally identical nodes of this \
+        formula (atoms are matched on their identifier), so only new nodes need to be compiled \
+        and the manager is kept alive.
+        The probabilities of the atoms and all labels are taken from the source formula.
+        Internal nodes that are no longer used are dereferenced.
+
+        :param source: formula without cycles (e.g. obtained from a grounding session)
+        :type source: LogicDAG
+        :return: this formula
+        """
+        with Timer("Updating %s" % self.__class__.__name__) as timer:
+            for label in list(self._names):
+                self.clear_labeled(label)
+
+            translate = {}
+
+            def _translate(key):
+                if key is None or key == 0:
+                    return key
+                elif key > 0:
+                    return translate[key]
+                else:
+                    return self.negate(translate[-key])
+
+            for i, n, t in source:
+                if t == "atom":
+                    j = self.add_atom(
+                        n.identifier,
+                        n.probability,
+                        n.group,
+                        name=source.get_name(i),
+                        cr_extra=False,
+                    )
+                    if self.is_probabilistic(j):
+                        node = self.get_node(j)
+                        if node.probability != n.probability:
+                            self._update(j, node._replace(probability=n.probability))
+                elif t == "conj":
+                    j = self.add_and([_translate(c) for c in n.children], name=n.name)
+                elif t == "disj":
+                    j = self.add_or([_translate(c) for c in n.children], name=n.name)
+                else:
+                    raise TypeError("Unknown node type")
+                translate[i] = j
+
+            for name, key, label in source.get_names_with_label():
+                self.add_name(name, _translate(key), label)
+
+            mgr = self.get_manager()
+            if mgr.constraint_dd is not None:
+                mgr.deref(mgr.constraint_dd)
+            self.build_dd()
+            self._release_unused()
+            if timer.recording:
+                timer.count(nodes=len(self), **self.get_manager().statistics())
+        return self
+
+    def _release_unused(self):
+        """Dereference the internal nodes that are not used by any label or constraint."""
+        nodes = self.get_manager().nodes
+        used = set()
+        queue = [
+            abs(n)
+            for q, n, l in self.get_names_with_label()
+            if l != self.LABEL_NAMED and self.is_probabilistic(n)
+        ]
+        for c in self.constraints():
+            for rule in c.as_clauses():
+                queue += [abs(r) for r in rule if self.is_probabilistic(r)]
+        while queue:
+            index = queue.pop()
+            if index in used:
+                continue
+            used.add(index)
+            node = self.get_node(index)
+            if type(node).__name__ != "atom":
+                queue += [abs(c) for c in node.children if self.is_probabilistic(c)]
+        for i, inode in enumerate(nodes):
+            if inode is not None and i + 1 not in used:
+                self.get_manager().deref(inode)
+                nodes[i] = None
+
     def build_constraint_dd(self):
         """Build the internal representation of the constraint of this formula."""
         self.get_manager().constraint_dd = self.get_manager().true()
@@ -198,6 +413,14 @@ class DDManager(object):
     def add_node(self, node):
         self.nodes.append(node)
 
+    def statistics(self):
+        """Get the size of the diagrams stored in the manager.
+
+        :return: counts by name (at least the number of stored internal nodes)
+        :rtype: dict
+        """
+        return {"inodes": sum(1 for n in self.nodes if n is not None)}
+
     def add_variable(self, label=0):
         """Add a variable to the manager and return its label.
 
@@ -377,6 +600,16 @@ class DDManager(object):
         """
         raise NotImplementedError("abstract method")
 
+    def wmc_batch(self, node, weights, semiring):
+        """Perform Weighted Model Count on the given node for a batch of weight assignments.
+
+        :param node: node to evaluate
+        :param weights: list of weight assignments for the variables in the node
+        :param semiring: use the operations defined by this semiring
+        :return: list of weighted model counts
+        """
+        return [self.wmc(node, w, semiring) for w in weights]
+
     def wmc_literal(self, node, weights, semiring, literal):
         """Evaluate a literal in the decision diagram.
 
@@ -419,6 +652,7 @@ class DDEvaluator(Evaluator):
         self.normalization = None
         self._evidence_weight = None
         self.evidence_inode = None
+        self._evidence_nodes = None
 
     def _get_manager(self):
         return self.formula.get_manager()
@@ -455,13 +689,97 @@ class DDEvaluator(Evaluator):
             self.normalization = None
         self.evaluate_evidence(recompute=True)
 
-    def _evaluate_evidence(self, recompute=False):
-        if self._evidence_weight is None or recompute:
+    def _get_evidence_inode(self):
+        """Get the internal node representing the constraints and the current evidence.
+
+        The node is only rebuilt when the evidence has changed.
+        """
+        evidence = tuple(self.evidence())
+        if self.evidence_inode is None or evidence != self._evidence_nodes:
+            if self.evidence_inode is not None:
+                self._get_manager().deref(self.evidence_inode)
             constraint_inode = self.formula.get_constraint_inode()
-            evidence_nodes = [self.formula.get_inode(ev) for ev in self.evidence()]
+            evidence_nodes = [self.formula.get_inode(ev) for ev in evidence]
             self.evidence_inode = self._get_manager().conjoin(
                 constraint_inode, *evidence_nodes
             )
+            self._evidence_nodes = evidence
+        return self.evidence_inode
+
+    def _get_query_inode(self, node):
+        """Get the internal node representing the conjunction of the given node and the evidence.
+
+        The caller has to dereference the node when it is no longer needed.
+        """
+        query_def_inode = self.formula.get_inode(node)
+        return self._get_manager().conjoin(query_def_inode, self._get_evidence_inode())
+
+    def set_given_weights(self, weights):
+        """Replace the weights given at construction time and propagate them.
+
+        Compiled (intermediate) nodes are reused, only the weighted model counts are recomputed.
+
+        :param weights: weights to use (replace weights defined in formula)
+        """
+        self.given_weights = weights
+        self.propagate()
+
+    def evaluate_batch(self, nodes, weights):
+        """Evaluate the given nodes for a batch of weight assignments.
+
+        Only supports the (log) probability semirings.
+        The weighted model count of each node is computed for all assignments at once (see \
+        :meth:`DDManager.wmc_batch`).
+
+        :param nodes: nodes to evaluate
+        :param weights: list of N weight assignments (replace weights defined in formula)
+        :return: N lists of results
+        """
+        semiring = self.semiring
+        manager = self._get_manager()
+        batch_weights = []
+        normalization = []
+        for given in weights:
+            self.given_weights = given
+            self._initialize()
+            batch_weights.append(dict(self.weights))
+            normalization.append(manager.wmc_true(self.weights, semiring))
+
+        evidence_weight = []
+        for z, result in zip(
+            normalization,
+            manager.wmc_batch(self._get_evidence_inode(), batch_weights, semiring),
+        ):
+            if semiring.is_zero(result):
+                raise InconsistentEvidenceError(context=" during compilation")
+            evidence_weight.append(semiring.normalize(result, z))
+
+        columns = []
+        query_inodes = {}  # conjunctions of the queries and the evidence
+        try:
+            for node in nodes:
+                if node == self.formula.TRUE:
+                    column = [semiring.one()] * len(weights)
+                elif node == self.formula.FALSE:
+                    column = [semiring.zero()] * len(weights)
+                else:
+                    query_inode = query_inodes.get(node)
+                    if query_inode is None:
+                        query_inode = self._get_query_inode(node)
+                        query_inodes[node] = query_inode
+                    column = manager.wmc_batch(query_inode, batch_weights, semiring)
+                    column = [
+                        semiring.normalize(semiring.normalize(result, z), e)
+                        for result, z, e in zip(column, normalization, evidence_weight)
+                    ]
+                columns.append([semiring.result(r, self.formula) for r in column])
+        finally:
+            manager.deref(*query_inodes.values())
+        return [list(row) for row in zip(*columns)] or [[] for _ in weights]
+
+    def _evaluate_evidence(self, recompute=False):
+        if self._evidence_weight is None or recompute:
+            self._get_evidence_inode()
 
             if isinstance(self.semiring, SemiringLogProbability) or isinstance(
                 self.semiring, SemiringProbability
@@ -513,14 +831,8 @@ class DDEvaluator(Evaluator):
         elif node == self.formula.FALSE:
             result = self.semiring.zero()
         else:
-            query_def_inode = self.formula.get_inode(node)
-            evidence_inode = self.evidence_inode
-            # Construct the query SDD
-            # if not evidence propagated or (query and evidence share variables):
-            query_sdd = self._get_manager().conjoin(query_def_inode, evidence_inode)
-            # else:
-            #    query_sdd = query_def_inode
-
+            # Construct the query SDD (conjunction of query and evidence)
+            query_sdd = self._get_query_inode(node)
             result = self._get_manager().wmc(query_sdd, self.weights, self.semiring)
             self._get_manager().deref(query_sdd)
             # TODO only normalize when there are evidence or constraints.
@@ -608,7 +920,7 @@ def build_dd(source, destination, **kwdargs):
     :param kwdargs: extra arguments
     :return: destination
     """
-    with Timer("Compiling %s" % destination.__class__.__name__):
+    with Timer("Compiling %s" % destination.__class__.__name__) as timer:
 
         # TODO maintain a translation table
         for i, n, t in source:
@@ -631,6 +943,10 @@ def build_dd(source, destination, **kwdargs):
         for name, node, label in source.get_names_with_label():
             destination.add_name(name, node, label)
 
-        destination.build_dd()
+        destination.build_dd(progress=kwdargs.get("progress"))
+        if timer.recording:
+            timer.count(
+                nodes=len(destination), **destination.get_manager().statistics()
+            )
 
     return destination
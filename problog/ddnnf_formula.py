@@ -26,16 +26,18 @@ from __future__ import print_function
 import tempfile
 import os
 import subprocess
+from array import array
 from collections import defaultdict
 
 from . import system_info
-from .evaluator import Evaluator, EvaluatableDSP
+from .evaluator import Evaluator, EvaluatableDSP, SemiringLogProbability
 from .errors import InconsistentEvidenceError
-from .formula import LogicDAG
+from .formula import LogicDAG, use_compact_storage
 from .cnf_formula import CNF
 from .core import transform
 from .errors import CompilationError
 from .util import Timer, subprocess_check_call
+from .circuit import FlatCircuit, is_vectorizable
 
 
 class DSharpError(CompilationError):
@@ -52,14 +54,119 @@ class DDNNF(LogicDAG, EvaluatableDSP):
     """A d-DNNF formula."""
 
     transform_preference = 20
+    supports_parallel = True
 
     # noinspection PyUnusedLocal,PyUnusedLocal,PyUnusedLocal
     def __init__(self, **kwdargs):
         LogicDAG.__init__(self, auto_compact=False)
+        self._flat_circuit = None
 
-    def _create_evaluator(self, semiring, weights, **kwargs):
+    def get_flat_circuit(self):
+        """Get the flattened (array-based) representation of this formula.
+
+        :rtype: FlatCircuit
+        """
+        if self._flat_circuit is None or self._flat_circuit.size != len(self):
+            self._flat_circuit = FlatCircuit(self)
+        return self._flat_circuit
+
+    def _create_evaluator(self, semiring, weights, vectorize=False, **kwargs):
+        if vectorize and is_vectorizable(semiring) and len(self) > 0:
+            return VectorizedDDNNFEvaluator(self, semiring, weights)
         return SimpleDDNNFEvaluator(self, semiring, weights)
 
+    def _get_batch_evaluator(self, evaluator, semiring, evidence, weights, **kwargs):
+        if isinstance(evaluator, SimpleDDNNFEvaluator):
+            # Reuse the evidence of the previous assignment.
+            evaluator.given_weights = weights
+            evaluator.propagate()
+            return evaluator
+        else:
+            return self.get_evaluator(semiring, evidence, weights, **kwargs)
+
+    def evaluate_batch(
+        self, weights, index=None, semiring=None, evidence=None, **kwargs
+    ):
+        """Evaluate a set of nodes for each row of a weight matrix.
+
+        For the (log) probability semirings, all rows are evaluated at once on the flattened \
+        circuit.
+        Each row takes one column for the evidence and one column per query, in which the \
+        negation of the query is set to zero.
+        See :meth:`Evaluatable.evaluate_batch` for the arguments.
+        """
+        if semiring is None:
+            semiring = SemiringLogProbability()
+        if index is None:
+            index = [node for name, node, label in self.labeled()]
+        if (
+            not is_vectorizable(semiring)
+            or len(self) == 0
+            or any(
+                node is not None
+                and node != 0
+                and type(self.get_node(abs(node))).__name__ != "atom"
+                for node in index
+            )
+        ):
+            return EvaluatableDSP.evaluate_batch(
+                self, weights, index, semiring, evidence, **kwargs
+            )
+
+        batch_rows = self._get_batch_rows(weights)
+        if not batch_rows:
+            return self._get_batch_result([], len(index))
+        evaluator = self.get_evaluator(semiring, evidence, batch_rows[0], **kwargs)
+        ev_nodes = list(evaluator.evidence())
+        rows = []
+        for given in batch_rows:
+            row = self.extract_weights(semiring, given)
+            for ev in ev_nodes:
+                pos, neg = row.get(abs(ev))
+                if semiring.is_zero(pos if ev > 0 else neg):
+                    raise InconsistentEvidenceError(self.get_node(abs(ev)).name)
+                row[abs(ev)] = semiring.to_evidence(pos, neg, sign=ev > 0)
+            rows.append(row)
+
+        circuit = self.get_flat_circuit()
+        queries = [
+            circuit.slot(-node)
+            if node is not None and node != 0
+            else None
+            for node in index
+        ]
+        width = len(index) + 1
+        block = max(1, circuit.block_size(len(rows) * width) // width)
+        results = []
+        for start in range(0, len(rows), block):
+            batch = rows[start : start + block]
+            values = circuit.batch_values(batch, semiring, width)
+            for j, slot in enumerate(queries):
+                if slot is not None:
+                    values[slot, j + 1 :: width] = semiring.zero()
+            totals = circuit.evaluate(values, semiring)[circuit.size + 1]
+            for r, row in enumerate(batch):
+                row_totals = totals[r * width : (r + 1) * width].tolist()
+                true_weight = row.get(0)
+                if true_weight is not None:
+                    row_totals = [semiring.times(t, true_weight[0]) for t in row_totals]
+                z = row_totals[0]
+                if semiring.is_zero(z):
+                    raise InconsistentEvidenceError(context=" during evidence evaluation")
+                result = []
+                for node, total in zip(index, row_totals[1:]):
+                    if node == 0:
+                        value = semiring.one()
+                    elif node is None:
+                        value = semiring.zero()
+                    elif ev_nodes:
+                        value = semiring.normalize(total, z)
+                    else:
+                        value = total
+                    result.append(semiring.result(value, self))
+                results.append(result)
+        return self._get_batch_result(results, len(index))
+
 
 class SimpleDDNNFEvaluator(Evaluator):
     """Evaluator for d-DNNFs."""
@@ -67,9 +174,11 @@ class SimpleDDNNFEvaluator(Evaluator):
     def __init__(self, formula, semiring, weights=None, **kwargs):
         Evaluator.__init__(self, formula, semiring, weights, **kwargs)
         self.cache_intermediate = {}  # weights of intermediate nodes
+        self.cache_derivatives = None  # derivatives of the root weight w.r.t. each literal
 
     def _initialize(self, with_evidence=True):
         self.weights.clear()
+        self.cache_derivatives = None
 
         model_weights = self.formula.extract_weights(self.semiring, self.given_weights)
         self.weights = model_weights.copy()
@@ -114,6 +223,10 @@ class SimpleDDNNFEvaluator(Evaluator):
                 result = self.semiring.normalize(result, self._get_z())
         elif node is None:
             result = self.semiring.zero()
+        elif self._use_derivatives(node):
+            result = self._get_literal_weight(node)
+            if self.has_evidence():
+                result = self.semiring.normalize(result, self._get_z())
         else:
             p = self._get_weight(abs(node))
             n = self._get_weight(-abs(node))
@@ -124,9 +237,105 @@ class SimpleDDNNFEvaluator(Evaluator):
                 result = self.semiring.normalize(result, self._get_z())
         return self.semiring.result(result, self.formula)
 
+    def prepare_queries(self, nodes):
+        """Compute the derivatives shared by the atom queries.
+
+        :param nodes: nodes that will be evaluated
+        :return: the nodes that are not atoms (each requires a separate pass over the circuit)
+        :rtype: list
+        """
+        separate = []
+        shared = False
+        for node in nodes:
+            if node is None or node == 0:
+                continue
+            elif self._use_derivatives(node):
+                shared = True
+            else:
+                separate.append(node)
+        if shared:
+            self._get_z()
+            self._get_derivatives()
+        return separate
+
     def _reset_value(self, index, pos, neg):
         self.set_weight(index, pos, neg)
 
+    def _use_derivatives(self, node):
+        return (
+            self.semiring.is_commutative()
+            and not self.semiring.is_nsp()
+            and type(self.formula.get_node(abs(node))).__name__ == "atom"
+        )
+
+    def _get_literal_weight(self, literal):
+        """Get the root weight with the given literal set to true.
+
+        The d-DNNF is assumed to be smooth, such that this weight equals the weight of the \
+        literal times the derivative of the root weight with respect to the literal.
+
+        :param literal: literal of an atom
+        :return: internal value
+        """
+        derivatives = self._get_derivatives()
+        if literal not in derivatives and -literal not in derivatives:
+            # Atom does not occur in the circuit.
+            return self.get_root_weight()
+        derivative = derivatives.get(literal, self.semiring.zero())
+        return self.semiring.times(self._get_weight(literal), derivative)
+
+    def _get_derivatives(self):
+        """Compute the derivatives of the root weight with respect to all literals.
+
+        Performs one upward pass (the weights of all nodes) and one downward pass over the \
+        circuit, which yields the weights of all queries at once.
+
+        :return: dictionary of literal to derivative (missing literals have derivative zero)
+        """
+        if self.cache_derivatives is not None:
+            return self.cache_derivatives
+        semiring = self.semiring
+        size = len(self.formula)
+        derivatives = {}
+        if size > 0:
+            true_weight = self.weights.get(0)
+            derivatives[size] = semiring.one() if true_weight is None else true_weight[0]
+
+        def add(child, value):
+            if child in derivatives:
+                derivatives[child] = semiring.plus(derivatives[child], value)
+            else:
+                derivatives[child] = value
+
+        # Children always have a lower index than their parents.
+        for index in range(size, 0, -1):
+            d = derivatives.get(index)
+            if d is None:
+                continue
+            node = self.formula.get_node(index)
+            ntype = type(node).__name__
+            if ntype == "atom":
+                continue
+            children = list(node.children)
+            if ntype == "conj":
+                # The derivative of a child is the product of its siblings.
+                childprobs = [self._get_weight(c) for c in children]
+                suffix = [semiring.one()]
+                for w in reversed(childprobs[1:]):
+                    suffix.append(semiring.times(w, suffix[-1]))
+                suffix.reverse()
+                prefix = d
+                for c, w, s in zip(children, childprobs, suffix):
+                    if c is not None and c != 0:
+                        add(c, semiring.times(prefix, s))
+                    prefix = semiring.times(prefix, w)
+            else:
+                for c in children:
+                    if c is not None and c != 0:
+                        add(c, d)
+        self.cache_derivatives = derivatives
+        return derivatives
+
     def get_root_weight(self):
         """
         Get the WMC of the root of this formula.
@@ -160,6 +369,7 @@ class SimpleDDNNFEvaluator(Evaluator):
         # index = index of atom in weights, so atom2var[key] = index
         self.weights[index] = (pos, neg)
         self.cache_intermediate.clear()
+        self.cache_derivatives = None
 
     def set_evidence(self, index, value):
         curr_pos_weight, curr_neg_weight = self.weights.get(index)
@@ -217,6 +427,70 @@ class SimpleDDNNFEvaluator(Evaluator):
                 raise TypeError("Unexpected node type: '%s'." % ntype)
 
 
+class VectorizedDDNNFEvaluator(SimpleDDNNFEvaluator):
+    """Evaluator for d-DNNFs that evaluates the flattened circuit with NumPy.
+
+    The weights of all nodes are computed level by level over the circuit, and the weights of \
+    all queries are obtained from one vectorized derivative pass.
+    Only supports the (log) probability semirings.
+    """
+
+    def __init__(self, formula, semiring, weights=None, **kwargs):
+        SimpleDDNNFEvaluator.__init__(self, formula, semiring, weights, **kwargs)
+        self.circuit = formula.get_flat_circuit()
+        self._values = None
+        self._derivatives = None
+
+    def _initialize(self, with_evidence=True):
+        self._values = None
+        self._derivatives = None
+        SimpleDDNNFEvaluator._initialize(self, with_evidence)
+
+    def set_weight(self, index, pos, neg):
+        SimpleDDNNFEvaluator.set_weight(self, index, pos, neg)
+        self._values = None
+        self._derivatives = None
+
+    def _get_values(self):
+        if self._values is None:
+            values = self.circuit.initial_values(self.weights, self.semiring)
+            self._values = self.circuit.evaluate(values, self.semiring)[:, 0]
+        return self._values
+
+    def get_root_weight(self):
+        result = float(self._get_values()[self.circuit.size + 1])
+        true_weight = self.weights.get(0)
+        if true_weight is not None:
+            result = self.semiring.times(result, true_weight[0])
+        return result
+
+    def _get_literal_weight(self, literal):
+        circuit = self.circuit
+        slot = circuit.slot(literal)
+        reachable = circuit.reachable()
+        if not reachable[slot] and not reachable[circuit.slot(-literal)]:
+            # Atom does not occur in the circuit.
+            return self.get_root_weight()
+        derivatives = self._get_derivatives()
+        return self.semiring.times(
+            float(self._get_values()[slot]), float(derivatives[slot])
+        )
+
+    def _get_derivatives(self):
+        """Compute the derivatives of the root weight with respect to all slots of the circuit.
+
+        :return: array of derivatives (indexed by slot)
+        """
+        if self._derivatives is None:
+            true_weight = self.weights.get(0)
+            self._derivatives = self.circuit.derivatives(
+                self._get_values(),
+                self.semiring,
+                None if true_weight is None else true_weight[0],
+            )
+        return self._derivatives
+
+
 class Compiler(object):
     """Interface to CNF to d-DNNF compiler tool."""
 
@@ -255,7 +529,7 @@ class Compiler(object):
 if system_info.get("c2d", False):
     # noinspection PyUnusedLocal
     @transform(CNF, DDNNF)
-    def _compile_with_c2d(cnf, nnf=None, smooth=True, **kwdargs):
+    def _compile_with_c2d(cnf, nnf=None, smooth=True, compact_nnf=False, **kwdargs):
         fd, cnf_file = tempfile.mkstemp(".cnf")
         os.close(fd)
         nnf_file = cnf_file + ".nnf"
@@ -275,16 +549,19 @@ if system_info.get("c2d", False):
         except OSError:
             pass
 
-        return _compile(cnf, cmd, cnf_file, nnf_file)
+        with Timer("c2d compilation") as timer:
+            result = _compile(cnf, cmd, cnf_file, nnf_file, compact_nnf=compact_nnf)
+            timer.count(nodes=len(result))
+        return result
 
     Compiler.add("c2d", _compile_with_c2d)
 
 
 # noinspection PyUnusedLocal
 @transform(CNF, DDNNF)
-def _compile_with_dsharp(cnf, nnf=None, smooth=True, **kwdargs):
+def _compile_with_dsharp(cnf, nnf=None, smooth=True, compact_nnf=False, **kwdargs):
     result = None
-    with Timer("DSharp compilation"):
+    with Timer("DSharp compilation") as timer:
         fd1, cnf_file = tempfile.mkstemp(".cnf")
         fd2, nnf_file = tempfile.mkstemp(".nnf")
         os.close(fd1)
@@ -296,9 +573,10 @@ def _compile_with_dsharp(cnf, nnf=None, smooth=True, **kwdargs):
         cmd = ["dsharp", "-Fnnf", nnf_file] + smoothl + ["-disableAllLits", cnf_file]  #
 
         try:
-            result = _compile(cnf, cmd, cnf_file, nnf_file)
+            result = _compile(cnf, cmd, cnf_file, nnf_file, compact_nnf=compact_nnf)
         except subprocess.CalledProcessError:
             raise DSharpError()
+        timer.count(nodes=len(result))
 
         try:
             os.remove(cnf_file)
@@ -315,7 +593,21 @@ def _compile_with_dsharp(cnf, nnf=None, smooth=True, **kwdargs):
 Compiler.add("dsharp", _compile_with_dsharp)
 
 
-def _compile(cnf, cmd, cnf_file, nnf_file):
+def _compile(cnf, cmd, cnf_file, nnf_file, compact_nnf=False):
+    """Compile the given CNF with an external compiler.
+
+    The CNF is streamed to ``cnf_file`` (the compilers read their input more than once, which \
+    rules out a pipe) and the resulting d-DNNF is parsed line by line.
+
+    :param cnf: CNF to compile
+    :param cmd: command that reads the CNF from ``cnf_file`` and writes the d-DNNF to ``nnf_file``
+    :param cnf_file: file used for passing the CNF to the compiler
+    :param nnf_file: file in which the compiler stores the d-DNNF
+    :param compact_nnf: store the nodes of the resulting d-DNNF in typed arrays \
+     (see :class:`problog.formula.CompactLogicFormula`)
+    :return: compiled d-DNNF
+    :rtype: DDNNF
+    """
     names = cnf.get_names_with_label()
 
     if cnf.is_trivial():
@@ -337,7 +629,7 @@ def _compile(cnf, cmd, cnf_file, nnf_file):
         return nnf
     else:
         with open(cnf_file, "w") as f:
-            f.write(cnf.to_dimacs())
+            cnf.write_dimacs(f)
 
         attempts_left = 1
         success = False
@@ -350,11 +642,27 @@ def _compile(cnf, cmd, cnf_file, nnf_file):
                 attempts_left -= 1
                 if attempts_left == 0:
                     raise err
-        return _load_nnf(nnf_file, cnf)
+        return _load_nnf(nnf_file, cnf, compact=compact_nnf)
 
 
-def _load_nnf(filename, cnf):
+# Encoding of FALSE (None) in the line-to-node table of the NNF reader.
+_NNF_FALSE = -(2 ** 31)
+
+
+def _load_nnf(filename, cnf, compact=False):
+    """Read a d-DNNF in the NNF format of c2d and dsharp.
+
+    The file is parsed line by line.
+
+    :param filename: NNF file
+    :param cnf: CNF the d-DNNF was compiled from
+    :param compact: store the nodes of the d-DNNF in typed arrays
+    :return: d-DNNF
+    :rtype: DDNNF
+    """
     nnf = DDNNF()
+    if compact:
+        use_compact_storage(nnf)
 
     weights = cnf.get_weights()
 
@@ -362,10 +670,16 @@ def _load_nnf(filename, cnf):
     for name, node, label in cnf.get_names_with_label():
         names_inv[node].append((name, label))
 
+    def _node(line_number):
+        node = line2node[line_number]
+        return None if node == _NNF_FALSE else node
+
+    def _line(node):
+        return _NNF_FALSE if node is None else node
+
     with open(filename) as f:
-        line2node = {}
+        line2node = array("i")
         rename = {}
-        lnum = 0
         for line in f:
             line = line.strip().split()
             if line[0] == "nnf":
@@ -377,20 +691,17 @@ def _load_nnf(filename, cnf):
                 rename[abs(name)] = node
                 if name < 0:
                     node = -node
-                line2node[lnum] = node
+                line2node.append(_line(node))
                 if name in names_inv:
                     for actual_name, label in names_inv[name]:
                         nnf.add_name(actual_name, node, label)
                     del names_inv[name]
-                lnum += 1
             elif line[0] == "A":
-                children = map(lambda x: line2node[int(x)], line[2:])
-                line2node[lnum] = nnf.add_and(children)
-                lnum += 1
+                children = map(lambda x: _node(int(x)), line[2:])
+                line2node.append(_line(nnf.add_and(children)))
             elif line[0] == "O":
-                children = map(lambda x: line2node[int(x)], line[3:])
-                line2node[lnum] = nnf.add_or(children)
-                lnum += 1
+                children = map(lambda x: _node(int(x)), line[3:])
+                line2node.append(_line(nnf.add_or(children)))
             else:
                 print("Unknown line type")
         for name in names_inv:
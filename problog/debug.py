@@ -19,6 +19,8 @@ from __future__ import print_function
 
 from .logic import Term
 from collections import defaultdict
+import json
+import threading
 import time
 import sys
 
@@ -224,6 +226,257 @@ class EngineTracer(object):
         return s
 
 
+class EngineProfiler(object):
+    """Low-overhead sampling profiler for the grounding engine (StackBasedEngine).
+
+    While the profiler is running, a background thread periodically inspects the stack of \
+    the engine and attributes the elapsed time to the predicates of the goals that are \
+    being evaluated (``time``: inclusive, ``self_time``: innermost goal only).
+    In addition, the engine counts for each predicate:
+
+        * ``calls``: number of calls
+        * ``hits`` and ``misses``: lookups of the calls in the tabling cache
+        * ``instances``: number of evaluation nodes (EvalDefine) created for the calls
+        * ``results``: number of results of the completed calls
+        * ``nodes``: number of nodes added to the ground program by the calls (excluding the \
+          nodes added by nested calls of other goals)
+
+    Usage::
+
+        with EngineProfiler(engine) as profiler:
+            engine.ground_all(db)
+        profiler.write_json('profile.json')
+
+    :param engine: engine to profile
+    :type engine: StackBasedEngine
+    :param interval: time between two samples (in seconds); the actual interval can be larger \
+     because the sampling thread has to wait for the interpreter lock
+    """
+
+    def __init__(self, engine, interval=0.001):
+        self.engine = engine
+        self.interval = interval
+        self.predicates = defaultdict(self._new_stats)
+        self.stacks = defaultdict(float)
+        self.samples = 0
+        self.time = 0.0
+        self._thread = None
+        self._running = False
+        self._last = None
+
+    @staticmethod
+    def _new_stats():
+        return {
+            "time": 0.0,
+            "self_time": 0.0,
+            "calls": 0,
+            "hits": 0,
+            "misses": 0,
+            "instances": 0,
+            "results": 0,
+            "nodes": 0,
+        }
+
+    def start(self):
+        """Start sampling and collecting the statistics of the engine."""
+        self.engine.profiler = self
+        self._running = True
+        self._last = time.time()
+        self._thread = threading.Thread(target=self._run, name="EngineProfiler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.engine.profiler is self:
+            self.engine.profiler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            now = time.time()
+            try:
+                self.sample(now - self._last)
+            except (IndexError, AttributeError, TypeError):
+                # The stack was modified while it was inspected.
+                pass
+            self._last = now
+
+    def sample(self, elapsed):
+        """Attribute the given time to the goals that are currently being evaluated.
+
+        :param elapsed: time since the previous sample
+        """
+        from .engine_stack import EvalDefine
+
+        engine = self.engine
+        stack = engine.stack
+        pointer = engine.pointer
+        if pointer == 0:
+            return
+        self.samples += 1
+        self.time += elapsed
+        # Follow the parents of the most recent evaluation node.
+        chain = []
+        node = stack[pointer - 1]
+        for _ in range(pointer):
+            if node is None:
+                break
+            if isinstance(node, EvalDefine):
+                chain.append("%s/%s" % (node.node.functor, len(node.context)))
+            if node.parent is None:
+                break
+            node = stack[node.parent]
+        if not chain:
+            return
+        self.predicates[chain[0]]["self_time"] += elapsed
+        for signature in set(chain):
+            self.predicates[signature]["time"] += elapsed
+        self.stacks[";".join(reversed(chain))] += elapsed
+
+    def call(self, key, hit):
+        """Register a call to a predicate (called by the engine).
+
+        :param key: key of the call
+        :type key: CallKey
+        :param hit: whether the results were found in the tabling cache
+        """
+        stats = self.predicates["%s/%s" % (key.functor, key.arity)]
+        stats["calls"] += 1
+        if hit:
+            stats["hits"] += 1
+        else:
+            stats["misses"] += 1
+
+    def instance(self, node):
+        """Register a new evaluation node for a call (called by the engine).
+
+        :param node: new evaluation node
+        :type node: EvalDefine
+        """
+        key = node.call_key
+        self.predicates["%s/%s" % (key.functor, key.arity)]["instances"] += 1
+        node.target_size = len(node.target)
+        node.nested_size = 0
+
+    def complete(self, node):
+        """Register the completion of an evaluation node (called by the engine).
+
+        :param node: completed evaluation node
+        :type node: EvalDefine
+        """
+        key = node.call_key
+        stats = self.predicates["%s/%s" % (key.functor, key.arity)]
+        stats["results"] += len(node.results)
+        # Nodes added by nested calls are attributed to those calls.
+        nodes = len(node.target) - node.target_size
+        stats["nodes"] += nodes - node.nested_size
+        parent = self._parent_define(node)
+        if parent is not None and parent.target_size is not None:
+            parent.nested_size += nodes
+
+    def _parent_define(self, node):
+        from .engine_stack import EvalDefine
+
+        stack = self.engine.stack
+        for _ in range(self.engine.pointer):
+            if node.parent is None:
+                return None
+            node = stack[node.parent]
+            if node is None:
+                return None
+            elif isinstance(node, EvalDefine):
+                return node
+        return None
+
+    def to_dict(self):
+        """Get the collected statistics.
+
+        :return: dictionary with the number of samples, the total sampled time and the \
+         statistics per predicate signature
+        :rtype: dict
+        """
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "time": self.time,
+            "predicates": {k: dict(v) for k, v in self.predicates.items()},
+        }
+
+    def write_json(self, filename):
+        """Write the collected statistics to a JSON file (see :meth:`to_dict`).
+
+        :param filename: output file
+        """
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    def folded_stacks(self):
+        """Get the sampled stacks in the folded format used by flame graph tools \
+        (e.g. ``flamegraph.pl``).
+
+        Each line contains the predicates from the outermost call to the innermost one, \
+        separated by semicolons, followed by the sampled time in microseconds.
+
+        :return: folded stacks
+        :rtype: str
+        """
+        return "".join(
+            "%s %d\n" % (stack, round(t * 1e6))
+            for stack, t in sorted(self.stacks.items())
+        )
+
+    def write_stacks(self, filename):
+        """Write the sampled stacks in the folded format (see :meth:`folded_stacks`).
+
+        :param filename: output file
+        """
+        with open(filename, "w") as f:
+            f.write(self.folded_stacks())
+
+    def show_profile(self):
+        """Creates a table with the statistics per predicate (sorted by time).
+
+        :return: string
+        """
+        s = "%30s\t %9s \t %9s \t %7s \t %7s \t %7s \t %7s \t %7s\n" % (
+            "predicate",
+            "time",
+            "self",
+            "#call",
+            "#hit",
+            "#eval",
+            "#sol",
+            "#node",
+        )
+        s += "-" * 120 + "\n"
+        for signature, stats in sorted(
+            self.predicates.items(), key=lambda x: (-x[1]["time"], x[0])
+        ):
+            s += "%30s\t %.5f \t %.5f \t %7d \t %7d \t %7d \t %7d \t %7d\n" % (
+                signature,
+                stats["time"],
+                stats["self_time"],
+                stats["calls"],
+                stats["hits"],
+                stats["instances"],
+                stats["results"],
+                stats["nodes"],
+            )
+        return s
+
+
 def location_string(location):
     if location is None:
         return ""
@@ -195,9 +195,17 @@ class ClauseDBEngine(GenericEngine):
         :return: logic program in a suitable format for this engine
         :rtype: ClauseDB
         """
-        result = ClauseDB.createFrom(db, builtins=self.get_builtins())
-        result.engine = self
-        self._process_directives(result)
+        if isinstance(db, ClauseDB):
+            # Already loaded: only (re)process the directives.
+            db.engine = self
+            self._process_directives(db)
+            return db
+        with Timer("Loading") as timer:
+            result = ClauseDB.createFrom(db, builtins=self.get_builtins())
+            result.engine = self
+            self._process_directives(result)
+            if timer.recording:
+                timer.count(**result.statistics())
         return result
 
     def call(self, query, database, target, transform=None, **kwdargs):
@@ -549,7 +557,7 @@ class ClauseDBEngine(GenericEngine):
         db = self.prepare(db)
 
         logger = logging.getLogger("problog")
-        with Timer("Grounding"):
+        with Timer("Grounding") as timer:
             # Load queries: use argument if available, otherwise load from database.
             if queries is None:
                 queries = [q[0] for q in self.query(db, Term("query", None))]
@@ -586,6 +594,14 @@ class ClauseDBEngine(GenericEngine):
             else:
                 self.ground_queries(db, target, queries)
                 self.ground_evidence(db, target, evidence)
+            timer.count(nodes=len(target))
+        table_stats = getattr(self, "table_stats", None)
+        if table_stats is not None:
+            logger.debug(
+                "Tabling: %(hits)s hits, %(misses)s misses, %(evictions)s evictions, "
+                "%(size)s results stored (peak %(peak)s)",
+                table_stats,
+            )
         return target
 
     def add_external_calls(self, externals):
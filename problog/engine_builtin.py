@@ -1770,31 +1770,36 @@ def _builtin_call_nc(*args, **kwdargs):
     return _builtin_call(*args, dont_cache=True, **kwdargs)
 
 
-def _builtin_subquery(term, prob, evidence=None, engine=None, database=None, **kwdargs):
+def _builtin_subquery(
+    term, prob, evidence=None, engine=None, database=None, target=None, **kwdargs
+):
     if evidence:
         check_mode((term, prob, evidence), ["cvL"], functor="subquery")
     else:
         check_mode((term, prob), ["cv"], functor="subquery")
 
-    eng = engine.__class__()
-    target = eng.ground(database, term, label="query")
-
-    if evidence:
-        for ev in term2list(evidence):
-            target = eng.ground(
-                database, ev, target=target, label=target.LABEL_EVIDENCE_POS
-            )
+    # Variants of the same subquery are only grounded and compiled once per grounding.
+    key = target._cache.key(("subquery", (term, evidence)))
+    results = target._cache.subqueries.get(key)
+    if results is None:
+        eng = engine.__class__(koption=engine.subquery_knowledge)
+        formula = eng.ground(database, term, label="query")
+
+        if evidence:
+            for ev in term2list(evidence):
+                formula = eng.ground(
+                    database, ev, target=formula, label=formula.LABEL_EVIDENCE_POS
+                )
 
-    from . import get_evaluatable
+        from . import get_evaluatable
 
-    kc = get_evaluatable(
-        name=None
-    )  # TODO somehow pass evaluatable preference (name, -k)
-    results = kc.create_from(target).evaluate()
+        kc = get_evaluatable(name=engine.subquery_knowledge)
+        results = list(kc.create_from(formula).evaluate().items())
+        target._cache.subqueries[key] = results
     if evidence:
-        return [(t, Constant(p), evidence) for t, p in results.items()]
+        return [(t, Constant(p), evidence) for t, p in results]
     else:
-        return [(t, Constant(p)) for t, p in results.items()]
+        return [(t, Constant(p)) for t, p in results]
 
 
 def _builtin_calln(term, *args, **kwdargs):
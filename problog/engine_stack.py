@@ -23,10 +23,20 @@ Default implementation of the ProbLog grounding engine.
 """
 from __future__ import print_function
 
+import logging
 import sys
 import random
 
-from .logic import Term, ArithmeticError, is_ground, list2term
+from .logic import (
+    Term,
+    ArithmeticError,
+    is_ground,
+    list2term,
+    AnnotatedDisjunction,
+    Clause,
+    Or,
+    intern_term,
+)
 from .engine import (
     UnifyError,
     instantiate,
@@ -36,17 +46,20 @@ from .engine import (
 )
 from .engine import NonGroundProbabilisticClause
 from .errors import GroundingError
+from .formula import LogicFormula
+from .util import Timer
 from .engine import (
     ClauseDBEngine,
     substitute_head_args,
     substitute_call_args,
-    unify_call_head,
+    unify_head,
+    unify_fact,
     unify_call_return,
     OccursCheck,
     substitute_simple,
 )
 from .engine_builtin import add_standard_builtins, IndirectCallCycleError
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 
 class NegativeCycle(GroundingError):
@@ -181,6 +194,31 @@ class StackBasedEngine(ClauseDBEngine):
 
         self.ignoring = set()
 
+        self.table_size = kwdargs.get("table_size")
+        self.table_stats = new_table_stats()
+
+        # Share equal ground terms in the results (see problog.logic.intern_term).
+        self.intern_terms = kwdargs.get("intern_terms", False)
+
+        # Knowledge compilation used by subquery/2,3 (default: see problog.get_evaluatable).
+        self.subquery_knowledge = kwdargs.get("koption")
+
+        # Sampling profiler (see problog.debug.EngineProfiler)
+        self.profiler = None
+
+    def create_table(self, database):
+        """Create the table that stores the results of the evaluated goals.
+
+        The statistics of all tables created by this engine are collected in ``table_stats``.
+
+        :param database: database containing the logic program
+        :return: new table
+        :rtype: DefineCache
+        """
+        return DefineCache(
+            database.dont_cache, max_size=self.table_size, stats=self.table_stats
+        )
+
     def eval(self, node_id, **kwdargs):
         # print (kwdargs.get('parent'))
         database = kwdargs["database"]
@@ -369,7 +407,7 @@ class StackBasedEngine(ClauseDBEngine):
         # This is stored in the target ground program because
         # node ids are only valid in that context.
         if not hasattr(target, "_cache"):
-            target._cache = DefineCache(database.dont_cache)
+            target._cache = self.create_table(database)
 
         # Retrieve the list of actions needed to evaluate the top-level node.
         # parent = kwdargs.get('parent')
@@ -581,7 +619,7 @@ class StackBasedEngine(ClauseDBEngine):
         # This is stored in the target ground program because
         # node ids are only valid in that context.
         if not hasattr(target, "_cache"):
-            target._cache = DefineCache(database.dont_cache)
+            target._cache = self.create_table(database)
 
         # Retrieve the list of actions needed to evaluate the top-level node.
         # parent = kwdargs.get('parent')
@@ -816,7 +854,9 @@ class StackBasedEngine(ClauseDBEngine):
                 raise UnknownClause(query.signature, database.lineno(query.location))
 
         call_args = range(0, len(query.args))
-        call_term = query.with_args(*call_args)
+        call_term = CallTerm(
+            query.functor, *call_args, location=query.location, p=query.probability
+        )
         call_term.defnode = node_id
         call_term.child = node_id
 
@@ -855,7 +895,7 @@ class StackBasedEngine(ClauseDBEngine):
     def eval_fact(self, parent, node_id, node, context, target, identifier, **kwdargs):
         try:
             # Verify that fact arguments unify with call arguments.
-            unify_call_head(context, node.args, context)
+            unify_fact(context, node.args)
 
             if True or self.label_all:
                 name = Term(node.functor, *node.args)
@@ -916,12 +956,14 @@ class StackBasedEngine(ClauseDBEngine):
 
         # Extract a descriptor for the current goal being evaluated.
         functor = node.functor
-        goal = (functor, context)
+        goal = target._cache.key((functor, context))
         # Look up the results in the cache.
         if no_cache:
             results = None
         else:
             results = target._cache.get(goal)
+        if self.profiler is not None:
+            self.profiler.call(goal, results is not None)
         if results is not None:
             # We have results for this goal, i.e. it has been fully evaluated before.
             # Transform the results to actions and return.
@@ -976,6 +1018,7 @@ class StackBasedEngine(ClauseDBEngine):
                         transform=transform,
                         is_root=is_root,
                         no_cache=no_cache,
+                        call_key=goal,
                         **kwdargs
                     )
                     self.add_record(evalnode)
@@ -1002,6 +1045,7 @@ class StackBasedEngine(ClauseDBEngine):
                         transform=transform,
                         parent=parent,
                         no_cache=no_cache,
+                        call_key=goal,
                         **kwdargs
                     )
                     self.add_record(evalnode)
@@ -1108,7 +1152,7 @@ class StackBasedEngine(ClauseDBEngine):
 
         try:
             try:
-                unify_call_head(context, node.args, new_context)
+                unify_head(node.head, context, new_context)
             except OccursCheck as err:
                 raise OccursCheck(location=kwdargs["database"].lineno(node.location))
 
@@ -1222,8 +1266,306 @@ class StackBasedEngine(ClauseDBEngine):
         return con
 
     def _fix_context(self, context):
+        if self.intern_terms:
+            fixed = FixedContext([intern_term(arg) for arg in context])
+            fixed.state = get_state(context)
+            return fixed
         return FixedContext(context)
 
+    def create_session(self, db, target=None):
+        """Start an incremental grounding session on the given database.
+
+        :param db: logic program
+        :type db: LogicProgram
+        :param target: ground program to extend (default: new LogicFormula)
+        :type target: LogicFormula
+        :return: grounding session
+        :rtype: GroundingSession
+        """
+        return GroundingSession(self, db, target)
+
+
+class GroundingSession(object):
+    """Long-lived grounding context for adding queries and evidence incrementally.
+
+    The session keeps the ground program and its tabling cache alive across calls, such that \
+    each new query or evidence atom only grounds the goals that were not grounded before.
+    When clauses are added or retracted, only the tabled results of the predicates that depend \
+    on them are discarded, and only the queries and evidence on those predicates are grounded \
+    again.
+
+    :param engine: grounding engine
+    :type engine: StackBasedEngine
+    :param db: logic program
+    :type db: LogicProgram
+    :param target: ground program to extend (default: new LogicFormula)
+    :type target: LogicFormula
+    """
+
+    def __init__(self, engine, db, target=None):
+        self.engine = engine
+        self.database = engine.prepare(db)
+        if target is None:
+            target = LogicFormula()
+        if not hasattr(target, "_cache"):
+            target._cache = self.engine.create_table(self.database)
+        self.target = target
+        self.__grounded = {}  # (label, term) => additional grounding arguments
+        self.__callers = defaultdict(set)  # predicate => predicates calling it
+        self.__scanned = 0  # number of database nodes included in __callers
+
+    def is_grounded(self, term, label=None):
+        """Checks whether the given term was already grounded with the given label."""
+        if label is None:
+            label = self.target.LABEL_QUERY
+        return (label, term) in self.__grounded
+
+    def _ground(self, term, label, **kwdargs):
+        if not isinstance(term, Term):
+            raise GroundingError("Invalid query")
+        if (label, term) not in self.__grounded:
+            logger = logging.getLogger("problog")
+            logger.debug("Grounding %s '%s'", label, term)
+            self.engine.ground(self.database, term, self.target, label=label, **kwdargs)
+            self.__grounded[(label, term)] = kwdargs
+            logger.debug("Ground program size: %s", len(self.target))
+        return self.target
+
+    def add_query(self, term, label=None):
+        """Ground the given query.
+
+        :param term: query term
+        :type term: Term
+        :param label: type of query (default: ``query``)
+        :type label: str
+        :return: the ground program
+        :rtype: LogicFormula
+        """
+        if label is None:
+            label = self.target.LABEL_QUERY
+        return self._ground(term, label)
+
+    def add_evidence(self, term, value=True):
+        """Ground the given evidence.
+
+        :param term: evidence term (can be negated)
+        :type term: Term
+        :param value: truth value of the evidence (True, False or None for unknown)
+        :return: the ground program
+        :rtype: LogicFormula
+        """
+        if term.is_negated():
+            term = -term
+            value = None if value is None else not value
+        if value is None:
+            label = self.target.LABEL_EVIDENCE_MAYBE
+        elif value:
+            label = self.target.LABEL_EVIDENCE_POS
+        else:
+            label = self.target.LABEL_EVIDENCE_NEG
+        return self._ground(term, label, is_root=True)
+
+    def ground_all(self):
+        """Ground all queries and evidence declared in the database that were not grounded yet.
+
+        :return: the ground program
+        :rtype: LogicFormula
+        """
+        db = self.database
+        with Timer("Grounding") as timer:
+            for q in self.engine.query(db, Term("query", None)):
+                self.add_query(q[0])
+            for ev in self.engine.query(db, Term("evidence", None, None)):
+                value = str(ev[1])
+                if value == "true":
+                    self.add_evidence(ev[0], True)
+                elif value == "false":
+                    self.add_evidence(ev[0], False)
+                else:
+                    self.add_evidence(ev[0], None)
+            for ev in self.engine.query(db, Term("evidence", None)):
+                self.add_evidence(ev[0])
+            timer.count(nodes=len(self.target))
+        return self.target
+
+    def add_clause(self, clause):
+        """Add a fact, clause or annotated disjunction to the database and update the ground \
+        program.
+
+        :param clause: statement to add
+        :type clause: Term | Clause | AnnotatedDisjunction
+        :return: the ground program
+        :rtype: LogicFormula
+        """
+        self.database += clause
+        return self._update(
+            set((h.functor, h.arity) for h in _statement_heads(clause))
+        )
+
+    def retract(self, term):
+        """Remove all facts and clauses whose head matches the given term and update the ground \
+        program.
+
+        :param term: head of the clauses to remove
+        :type term: Term
+        :return: number of removed clauses
+        :rtype: int
+        """
+        node_id = self.database.find(term)
+        if node_id is None:
+            return 0
+        clauses = self.database.get_node(node_id).children
+        to_erase = [
+            c
+            for c in clauses.find(term.args)
+            if _is_instance(_head_of(self.database, c), term)
+        ]
+        if to_erase:
+            clauses.erase(to_erase)
+            self._update({(term.functor, term.arity)})
+        return len(to_erase)
+
+    def reset_cache(self):
+        """Clear the tabling cache (e.g. after the database was modified externally)."""
+        self.target._cache.reset()
+
+    def _update(self, predicates):
+        """Ground the queries and evidence that depend on the given predicates again.
+
+        :param predicates: predicates (functor, arity) that were modified
+        :return: the ground program
+        """
+        affected = self._dependents(predicates)
+        self.target._cache.invalidate(affected)
+
+        update = [
+            (label, term, kwdargs)
+            for (label, term), kwdargs in self.__grounded.items()
+            if _predicate_of(term) in affected
+        ]
+        # Remove the names produced by these queries: they may no longer be derivable.
+        for label, term, kwdargs in update:
+            goal = _goal_of(term)
+            for name, key in list(self.target.get_names(label)):
+                if _is_instance(_goal_of(name), goal):
+                    self.target.remove_name(name, label)
+        with Timer("Grounding") as timer:
+            for label, term, kwdargs in update:
+                self.engine.ground(
+                    self.database, term, self.target, label=label, **kwdargs
+                )
+            timer.count(nodes=len(self.target))
+        return self.target
+
+    def _dependents(self, predicates):
+        """Get the predicates whose results may depend on the given predicates."""
+        db = self.database
+        callers = self.__callers
+        for index in range(self.__scanned, len(db)):
+            node = db.get_node(index)
+            if type(node).__name__ == "clause":
+                head = (node.functor, len(node.args))
+                for callee in _body_calls(db, node.child):
+                    callers[callee].add(head)
+        self.__scanned = len(db)
+
+        # Predicates with dynamic calls (None) depend on all predicates.
+        result = set(predicates)
+        queue = list(predicates) + [None]
+        while queue:
+            for caller in callers.get(queue.pop(), ()):
+                if caller not in result:
+                    result.add(caller)
+                    queue.append(caller)
+        return result
+
+
+def _statement_heads(statement):
+    if isinstance(statement, AnnotatedDisjunction):
+        return statement.heads
+    elif isinstance(statement, Clause):
+        return [statement.head]
+    elif isinstance(statement, Or):
+        return statement.to_list()
+    else:
+        return [statement]
+
+
+def _goal_of(term):
+    """Strip the negation from the given query term."""
+    if term.is_negated():
+        return -term
+    elif term.functor in ("not", "\\+") and term.arity == 1:
+        return term.args[0]
+    else:
+        return term
+
+
+def _predicate_of(term):
+    goal = _goal_of(term)
+    return goal.functor, goal.arity
+
+
+def _head_of(db, index):
+    node = db.get_node(index)
+    return Term(node.functor, *node.args)
+
+
+def _body_calls(db, index):
+    """Get the predicates (functor, arity) called by the given clause body.
+
+    Terms occurring in the arguments of calls are included as well, to account for meta-calls \
+    such as ``findall/3``.
+    A call with a variable goal is reported as None.
+    """
+    calls = set()
+    stack = [index]
+    while stack:
+        node = db.get_node(stack.pop())
+        ntype = type(node).__name__
+        if ntype == "call":
+            calls.add((node.functor, len(node.args)))
+            if node.functor == "call" and node.args and not isinstance(node.args[0], Term):
+                calls.add(None)
+            terms = list(node.args)
+            while terms:
+                t = terms.pop()
+                if isinstance(t, Term) and not is_variable(t):
+                    calls.add((t.functor, t.arity))
+                    terms.extend(t.args)
+        elif ntype in ("conj", "disj"):
+            stack.extend(node.children)
+        elif ntype == "neg":
+            stack.append(node.child)
+    return calls
+
+
+def _is_instance(term, pattern, bindings=None):
+    """Checks whether the given term is an instance of the given pattern.
+
+    :param term: term
+    :param pattern: pattern in which variables are represented by Var, None or integers
+    :param bindings: current variable bindings (used internally)
+    :return: True if the pattern subsumes the term
+    """
+    if bindings is None:
+        bindings = {}
+    if pattern is None or is_variable(pattern) or type(pattern) == int:
+        if pattern is None or pattern == "_" or getattr(pattern, "name", None) == "_":
+            return True
+        if pattern in bindings:
+            return bindings[pattern] == term
+        bindings[pattern] = term
+        return True
+    elif not isinstance(term, Term) or not isinstance(pattern, Term):
+        return term == pattern
+    elif pattern.is_constant() or term.is_constant():
+        return term == pattern
+    elif term.signature != pattern.signature:
+        return False
+    else:
+        return all(_is_instance(t, p, bindings) for t, p in zip(term.args, pattern.args))
+
 
 def get_state(c):
     if hasattr(c, "state"):
@@ -1690,78 +2032,80 @@ class EvalOr(EvalNode):
         return EvalNode.__str__(self) + " tc: " + str(self.to_complete)
 
 
-class NestedDict(object):
-    def __init__(self):
-        self.__base = {}
+class CallTerm(Term):
+    """Term that is used as a call node, e.g. for the goal of ``call/1``.
 
-    def __getitem__(self, key):
-        p_key, s_key = key
-        p_key = (p_key, len(s_key))
-        s_key = list(s_key) + [get_state(s_key)]
-        elem = self.__base[p_key]
-        for s in s_key:
-            elem = elem[s]
-        return elem
+    :param functor: functor of the called predicate
+    :param args: arguments of the call (variables of the calling context)
+    :param kwdargs: additional arguments of :class:`problog.logic.Term`
+    """
 
-    def get(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            return default
+    __slots__ = ("defnode", "child")
 
-    def __contains__(self, key):
-        p_key, s_key = key
-        p_key = (p_key, len(s_key))
-        s_key = list(s_key) + [get_state(s_key)]
-        try:
-            elem = self.__base[p_key]
-            for s in s_key:
-                elem = elem[s]
-            return True
-        except KeyError:
-            return False
 
-    def __setitem__(self, key, value):
-        p_key, s_key = key
-        p_key = (p_key, len(s_key))
-        s_key = list(s_key) + [get_state(s_key)]
-        if s_key:
-            elem = self.__base.get(p_key)
-            if elem is None:
-                elem = {}
-                self.__base[p_key] = elem
-            for s in s_key[:-1]:
-                elemN = elem.get(s)
-                if elemN is None:
-                    elemN = {}
-                    elem[s] = elemN
-                elem = elemN
-            elem[s_key[-1]] = value
-        else:
-            self.__base[p_key] = value
-
-    def __delitem__(self, key):
-        p_key, s_key = key
-        p_key = (p_key, len(s_key))
-        s_key = list(s_key) + [get_state(s_key)]
-        if s_key:
-            elem = self.__base[p_key]
-            elems = [(p_key, self.__base, elem)]
-            for s in s_key[:-1]:
-                elem_n = elem[s]
-                elems.append((s, elem, elem_n))
-                elem = elem_n
-            del elem[s_key[-1]]  # Remove last element
-            for s, e, ec in reversed(elems):
-                if len(ec) == 0:
-                    del e[s]
-                else:
-                    break
+class CallKey(object):
+    """Canonical key of a call, used to look up the call in a :class:`DefineCache`.
+
+    Variants of a non-ground call (i.e. calls that are equal up to the names of their \
+    variables) have equal keys: their variables are renumbered in order of appearance.
+    The key of a ground call also includes its state.
+    The hash is computed only once, such that the key can be reused cheaply for all \
+    operations on the table.
+
+    :param functor: functor of the called predicate
+    :param args: arguments of the call
+    """
+
+    __slots__ = ("functor", "args", "values", "state", "ground", "_hash", "_variant")
+
+    def __init__(self, functor, args):
+        self.functor = functor
+        self.args = args
+        self.ground = is_ground(*args)
+        if self.ground:
+            self.values = tuple(args)
+            self.state = get_state(args) or None
         else:
-            del self.__base[p_key]
+            ri = VarReindex()
+            self.values = tuple([substitute_simple(a, ri) for a in args])
+            self.state = None
+        self._hash = hash((functor, self.values, self.state))
+        self._variant = None
+
+    @property
+    def arity(self):
+        return len(self.values)
+
+    @property
+    def variant(self):
+        """Key of the call without its state."""
+        if self.state is None:
+            return self
+        if self._variant is None:
+            self._variant = CallKey(self.functor, list(self.values))
+        return self._variant
 
-    def __str__(self):  # pragma: no cover
-        return str(self.__base)
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return self is other or (
+            type(other) is CallKey
+            and self._hash == other._hash
+            and self.functor == other.functor
+            and self.values == other.values
+            and self.state == other.state
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "%s(%s) {%s}" % (
+            self.functor,
+            ", ".join(map(str, self.values)),
+            self.state or "",
+        )
 
 
 class VarReindex(object):
@@ -1784,19 +2128,140 @@ class VarReindex(object):
 
 
 class DefineCache(object):
-    def __init__(self, dont_cache):
-        self.__non_ground = NestedDict()
-        self.__ground = NestedDict()
-        self.__active = NestedDict()
+    """Table that stores the results of the goals that were evaluated before.
+
+    Goals can be given as a tuple (functor, arguments) or as a :class:`CallKey`.
+    The latter avoids recomputing the canonical key of the goal on every operation.
+
+    The table keeps track of its size (the number of results stored).
+    When a maximal size is given, the results of the least recently used goals are evicted \
+    when the table is full.
+    The results of goals that are currently being evaluated and of goals that are part of a \
+    cycle are never evicted, because they refer to nodes that can still be extended.
+    An evicted goal is evaluated again when it is needed, which results in the same ground nodes.
+
+    :param dont_cache: predicates (functor, arity) whose results should not be stored
+    :param max_size: maximal number of results in the table (None: unbounded)
+    :param stats: dictionary in which the number of hits, misses and evictions, and the size \
+    (current and peak) of the table are counted (can be shared between tables)
+    """
+
+    def __init__(self, dont_cache, max_size=None, stats=None):
+        self.__non_ground = {}
+        self.__ground = {}
+        self.__active = {}
         self.__dont_cache = dont_cache
+        self.__max_size = max_size
+        if stats is None:
+            stats = new_table_stats()
+        self.stats = stats
+        # Entries in order of use: key => size (only used when the size is bounded)
+        self.__entries = OrderedDict()
+        # Entries that can not be evicted: key => size (only used when the size is bounded)
+        self.__pinned = {}
+        self.size = 0
+        # Results of subquery/2,3 by call key
+        self.subqueries = {}
+
+    def key(self, goal):
+        """Get the canonical key of the given goal.
+
+        :param goal: goal (functor, arguments) or its key
+        :rtype: CallKey
+        """
+        if type(goal) is CallKey:
+            return goal
+        else:
+            return CallKey(*goal)
+
+    def _table(self, key):
+        if key.ground:
+            return self.__ground
+        else:
+            return self.__non_ground
 
     def reset(self):
-        self.__non_ground = NestedDict()
-        self.__ground = NestedDict()
+        self.__non_ground = {}
+        self.__ground = {}
+        self.__entries.clear()
+        self.__pinned.clear()
+        self._resize(-self.size)
+        self.subqueries = {}
 
-    def _reindex_vars(self, goal):
-        ri = VarReindex()
-        return goal[0], [substitute_simple(g, ri) for g in goal[1]]
+    def invalidate(self, predicates):
+        """Remove the results of the given predicates from the cache.
+
+        :param predicates: collection of (functor, arity)
+        """
+        predicates = set(predicates)
+        # A subquery can depend on any predicate.
+        self.subqueries = {}
+        for table in (self.__non_ground, self.__ground):
+            for key in [k for k in table if (k.functor, k.arity) in predicates]:
+                self._remove_entry(key)
+                del table[key]
+
+    def _resize(self, delta):
+        self.size += delta
+        stats = self.stats
+        stats["size"] += delta
+        if stats["size"] > stats["peak"]:
+            stats["peak"] = stats["size"]
+
+    def _entry_size(self, key):
+        """Get the size of the results stored for the given key (0 if there are none)."""
+        if key.ground:
+            return 1 if key in self.__ground else 0
+        results = self.__non_ground.get(key)
+        if results is None:
+            return 0
+        return max(len(results), 1)
+
+    def _add_entry(self, key, size, pinned):
+        """Register the size of the results that are about to be stored for the given key."""
+        if self.__max_size is None:
+            # Unbounded: only the size of the table is tracked.
+            self._resize(size - self._entry_size(key))
+            return
+        old = self.__entries.pop(key, None)
+        if old is None:
+            old = self.__pinned.pop(key, None)
+            pinned = pinned or old is not None
+        if old is not None:
+            self._resize(-old)
+        if pinned:
+            self.__pinned[key] = size
+        else:
+            self.__entries[key] = size
+        self._resize(size)
+        if self.__max_size is not None and self.size > self.__max_size:
+            self._evict()
+
+    def _remove_entry(self, key):
+        """Unregister the results stored for the given key (before they are removed)."""
+        if self.__max_size is None:
+            self._resize(-self._entry_size(key))
+            return
+        old = self.__entries.pop(key, None)
+        if old is None:
+            old = self.__pinned.pop(key, None)
+        if old is not None:
+            self._resize(-old)
+
+    def _evict(self):
+        """Evict the least recently used entries until the table is within its maximal size."""
+        entries = self.__entries
+        candidates = len(entries) - 1  # never evict the most recent entry
+        while self.size > self.__max_size and candidates > 0:
+            candidates -= 1
+            key, size = entries.popitem(last=False)
+            if key.variant in self.__active:
+                # The goal is being evaluated: keep it.
+                entries[key] = size
+            else:
+                del self._table(key)[key]
+                self._resize(-size)
+                self.stats["evictions"] += 1
 
     def is_dont_cache(self, goal):
         return (
@@ -1804,35 +2269,45 @@ class DefineCache(object):
         )
 
     def activate(self, goal, node):
-        self.__active[self._reindex_vars(goal)] = node
+        self.__active[self.key(goal).variant] = node
 
     def deactivate(self, goal):
-        del self.__active[self._reindex_vars(goal)]
+        del self.__active[self.key(goal).variant]
 
     def getEvalNode(self, goal):
-        return self.__active.get(self._reindex_vars(goal))
+        return self.__active.get(self.key(goal).variant)
 
     def __setitem__(self, goal, results):
-        if self.is_dont_cache(goal):
+        self.store(goal, results)
+
+    def store(self, goal, results, pinned=False):
+        """Store the results of the given goal.
+
+        :param goal: goal (functor, arguments) or its key
+        :param results: results of the goal {arguments: node}
+        :param pinned: the results can not be evicted (e.g. because the goal is part of a cycle)
+        """
+        key = self.key(goal)
+        functor = key.functor
+        if functor[:9] == "_nocache_" or (functor, key.arity) in self.__dont_cache:
             return
         # Results
-        functor, args = goal
-        if is_ground(*args):
+        if key.ground:
             if results:
                 # assert(len(results) == 1)
                 res_key = next(iter(results.keys()))
-                key = (functor, res_key)
+                key = CallKey(functor, res_key)
+                self._add_entry(key, 1, pinned)
                 self.__ground[key] = results[res_key]
             else:
-                key = (functor, args)
+                self._add_entry(key, 1, pinned)
                 self.__ground[key] = NODE_FALSE  # Goal failed
         else:
-            goal = self._reindex_vars(goal)
             res_keys = list(results.keys())
-            self.__non_ground[goal] = results
+            self._add_entry(key, max(len(res_keys), 1), pinned)
+            self.__non_ground[key] = results
             all_ground = True
             for res_key in res_keys:
-                key = (functor, res_key)
                 all_ground &= is_ground(*res_key)
                 if not all_ground:
                     break
@@ -1840,44 +2315,51 @@ class DefineCache(object):
             # TODO caching might be incorrect if program contains var(X) or nonvar(X) or ground(X).
             if all_ground:
                 for res_key in res_keys:
-                    key = (functor, res_key)
+                    key = CallKey(functor, res_key)
+                    self._add_entry(key, 1, pinned)
                     self.__ground[key] = results[res_key]
 
-    def get(self, key, default=None):
+    def get(self, goal, default=None):
+        key = self.key(goal)
         try:
-            return self[key]
+            result = self[key]
         except KeyError:
+            self.stats["misses"] += 1
             return default
+        self.stats["hits"] += 1
+        if self.__max_size is not None and key in self.__entries:
+            self.__entries.move_to_end(key)
+        return result
 
     def __getitem__(self, goal):
-        functor, args = goal
-        if is_ground(*args):
-            return [(args, self.__ground[goal])]
+        key = self.key(goal)
+        if key.ground:
+            return [(key.args, self.__ground[key])]
         else:
-            goal = self._reindex_vars(goal)
-            # res_keys = self.__non_ground[goal]
-            return self.__non_ground[goal].items()
+            return self.__non_ground[key].items()
 
     def __delitem__(self, goal):
-        functor, args = goal
-        if is_ground(*args):
-            del self.__ground[goal]
-        else:
-            goal = self._reindex_vars(goal)
-            del self.__non_ground[goal]
+        key = self.key(goal)
+        self._remove_entry(key)
+        del self._table(key)[key]
 
     def __contains__(self, goal):
-        functor, args = goal
-        if is_ground(*args):
-            return goal in self.__ground
-        else:
-            goal = self._reindex_vars(goal)
-            return goal in self.__non_ground
+        key = self.key(goal)
+        return key in self._table(key)
 
     def __str__(self):  # pragma: no cover
         return "%s\n%s" % (self.__non_ground, self.__ground)
 
 
+def new_table_stats():
+    """Create the statistics of a table (see :class:`DefineCache`).
+
+    :return: counters for hits, misses, evictions, size and peak size
+    :rtype: dict[str, int]
+    """
+    return {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "peak": 0}
+
+
 class ResultSet(object):
     def __init__(self):
         self.results = []
@@ -1937,7 +2419,9 @@ class ResultSet(object):
 
 class EvalDefine(EvalNode):
     # A buffered Define node.
-    def __init__(self, call=None, to_complete=None, is_root=False, **parent_args):
+    def __init__(
+        self, call=None, to_complete=None, is_root=False, call_key=None, **parent_args
+    ):
         EvalNode.__init__(self, **parent_args)
         # self.__buffer = defaultdict(list)
         # self.results = None
@@ -1952,10 +2436,17 @@ class EvalDefine(EvalNode):
         self.siblings = []  # These are nodes that have is_cycle_child set
 
         self.call = (self.node.functor, self.context)
+        if call_key is None:
+            call_key = self.target._cache.key(self.call)
+        self.call_key = call_key  # key of the call in the table
         self.to_complete = to_complete
-        self.is_ground = is_ground(*self.context)
+        self.is_ground = call_key.ground
         self.is_root = is_root
         self.engine.stats[1] += 1
+        # Size of the ground program when the evaluation started (only set when profiling)
+        self.target_size = None
+        if self.engine.profiler is not None:
+            self.engine.profiler.instance(self)
 
         if not self.is_buffered():
             self.flushBuffer(True)
@@ -2012,7 +2503,7 @@ class EvalDefine(EvalNode):
                         a = False
                     return a, actions
                 else:
-                    cache_key = self.call  # (self.node.functor, res)
+                    cache_key = self.call_key
                     if not self.no_cache and cache_key in self.target._cache:
                         # Get direct
                         stored_result = self.target._cache[cache_key]
@@ -2047,9 +2538,12 @@ class EvalDefine(EvalNode):
                     if (
                         not self.no_cache
                         and is_ground(*res)
-                        and is_ground(*self.call[1])
+                        and self.is_ground
                     ):
-                        self.target._cache[cache_key] = {res: result_node}
+                        # The result node can still be extended: keep it in the table.
+                        self.target._cache.store(
+                            cache_key, {res: result_node}, pinned=True
+                        )
                     actions = []
                     # Send results to cycle
                     if not self.is_buffered() and result_node is not NODE_FALSE:
@@ -2089,12 +2583,18 @@ class EvalDefine(EvalNode):
         else:
             self.to_complete -= 1
             if self.to_complete == 0:
-                cache_key = self.call
-                # cache_key = (self.node.functor, self.context)
+                cache_key = self.call_key
                 # assert (not cache_key in self.target._cache)
                 self.flushBuffer()
-                self.target._cache[cache_key] = self.results
+                self.target._cache.store(
+                    cache_key,
+                    self.results,
+                    pinned=not self.is_buffered() or self.isCycleParent(),
+                )
                 self.target._cache.deactivate(cache_key)
+                profiler = self.engine.profiler
+                if profiler is not None and self.target_size is not None:
+                    profiler.complete(self)
                 actions = []
                 if self.is_buffered():
                     actions = results_to_actions(self.results, **vars(self))
@@ -2119,8 +2619,7 @@ class EvalDefine(EvalNode):
 
     def flushBuffer(self, cycle=False):
         def func(res, nodes):
-            cache_key = self.call
-            #            cache_key = (self.node.functor, res)
+            cache_key = self.call_key
             if not self.no_cache and cache_key in self.target._cache:
                 stored_result = self.target._cache[cache_key]
                 if len(stored_result) == 1:
@@ -2151,8 +2650,8 @@ class EvalDefine(EvalNode):
                         new_nodes.append(node)
                     nodes = new_nodes
                 node = self.target.add_or(nodes, readonly=(not cycle), name=name)
-                if not self.no_cache and is_ground(*res) and is_ground(*self.call[1]):
-                    self.target._cache[cache_key] = {res: node}
+                if not self.no_cache and is_ground(*res) and self.is_ground:
+                    self.target._cache.store(cache_key, {res: node}, pinned=cycle)
 
             return node
 
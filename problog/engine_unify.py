@@ -90,7 +90,10 @@ def unify_value(value1, value2, source_values):
     # Variables are negative numbers or None
     # Naive implementation (no occurs check)
 
-    if is_variable(value1) and is_variable(value2):
+    if value1 is value2:
+        # Same variable or same term (e.g. interned ground terms)
+        return value1
+    elif is_variable(value1) and is_variable(value2):
         if value1 == value2:
             return value1
         elif value1 is None:
@@ -199,6 +202,9 @@ def unify_value_dc(value1, value2, source_values, target_values):
             pass
         else:
             unify_value_dc(value1, sv2, source_values, target_values)
+    elif value1 is value2 and value1.is_ground():
+        # Same ground term (e.g. interned): nothing to bind
+        pass
     elif value1.signature == value2.signature:  # Assume Term
         for a1, a2 in zip(value1.args, value2.args):
             unify_value_dc(a1, a2, source_values, target_values)
@@ -352,6 +358,104 @@ def _unify_call_head_single(source_value, target_value, target_context, source_v
                 raise UnifyError()
 
 
+# Instructions of a compiled clause head (see compile_head).
+# Each instruction is a tuple (opcode, argument position, head argument, signature).
+GET_VARIABLE = 0  # first occurrence of a clause variable: bind it to the call argument
+GET_VALUE = 1  # next occurrence of a clause variable: unify it with the call argument
+GET_CONSTANT = 2  # constant or atom: compare it with the call argument
+GET_STRUCTURE = 3  # compound term: unify it recursively with the call argument
+
+
+def compile_head(head_args):
+    """Compile the arguments of a clause head into a sequence of unification instructions.
+
+    :param head_args: arguments of the head (variables are numbers >= 0)
+    :return: instructions to be executed by :func:`unify_head`
+    :rtype: tuple
+    """
+    code = []
+    seen = set()
+    for i, arg in enumerate(head_args):
+        if type(arg) == int:
+            if arg in seen:
+                code.append((GET_VALUE, i, arg, None))
+            else:
+                seen.add(arg)
+                code.append((GET_VARIABLE, i, arg, None))
+        elif arg is not None and arg.arity == 0 and not arg.is_var():
+            code.append((GET_CONSTANT, i, arg, arg.signature))
+        else:
+            if arg is not None:
+                seen.update(v for v in arg.variables() if type(v) == int)
+            code.append((GET_STRUCTURE, i, arg, None))
+    return tuple(code)
+
+
+def unify_head(code, call_args, target_context):
+    """Unify the arguments of a call with a compiled clause head.
+
+    This is equivalent to :func:`unify_call_head` with the arguments of the head, \
+    except that it does not compute the substituted context.
+
+    :param code: compiled head (see :func:`compile_head`)
+    :param call_args: arguments of the call
+    :param target_context: values of the variables in the clause (initially all None). \
+    Output argument.
+    :raise UnifyError: unification failed
+    """
+    source_values = {}
+    for op, i, arg, signature in code:
+        value = call_args[i]
+        if op == GET_VARIABLE:
+            target_context[arg] = value
+        elif op == GET_CONSTANT:
+            if value is None or value is arg:
+                pass
+            elif type(value) == int:
+                bound = source_values.get(value)
+                if bound is None:
+                    source_values[value] = arg
+                else:
+                    source_values[value] = unify_value(bound, arg, source_values)
+            elif value.signature != signature:
+                raise UnifyError()
+        elif op == GET_VALUE:
+            target_context[arg] = unify_value(
+                value, target_context[arg], source_values
+            )
+        elif value is not arg:
+            _unify_call_head_single(value, arg, target_context, source_values)
+
+
+def unify_fact(call_args, fact_args):
+    """Unify the arguments of a call with the (ground) arguments of a fact.
+
+    :param call_args: arguments of the call
+    :param fact_args: arguments of the fact
+    :raise UnifyError: unification failed
+    """
+    source_values = None
+    for value, arg in zip(call_args, fact_args):
+        if value is None or value is arg:
+            pass
+        elif type(value) == int:
+            if source_values is None:
+                source_values = {value: arg}
+            else:
+                bound = source_values.get(value)
+                if bound is None:
+                    source_values[value] = arg
+                else:
+                    source_values[value] = unify_value(bound, arg, source_values)
+        elif arg.arity == 0 or value.arity == 0:
+            if value.signature != arg.signature:
+                raise UnifyError()
+        else:
+            if source_values is None:
+                source_values = {}
+            _unify_call_head_single(value, arg, None, source_values)
+
+
 class _VarTranslateWrapper(object):
     def __init__(self, var_translate, min_var):
         self.base = var_translate
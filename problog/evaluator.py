@@ -24,15 +24,18 @@ Provides common interface for evaluation of weighted logic formulas.
 from __future__ import print_function
 
 import math
+import multiprocessing
 
 from .core import ProbLogObject, transform_allow_subclass
 from .errors import InconsistentEvidenceError, InvalidValue, ProbLogError, InstallError
 
 try:
+    import numpy as np
     from numpy import polynomial
 
     pn = polynomial.polynomial
 except ImportError:
+    np = None
     pn = None
 
 
@@ -135,6 +138,14 @@ class Semiring(object):
         """Indicates whether this semiring requires solving a neutral sum problem."""
         return False
 
+    def is_commutative(self):
+        """Indicates whether the multiplication of this semiring is commutative.
+
+        This allows computing the weights of all literals with a single derivative pass over \
+        a circuit.
+        """
+        return False
+
     def in_domain(self, a):
         """Checks whether the given (internal) value is valid."""
         return True
@@ -220,6 +231,9 @@ class SemiringProbability(Semiring):
         """Indicates whether this semiring requires solving a disjoint sum problem."""
         return True
 
+    def is_commutative(self):
+        return True
+
     def in_domain(self, a):
         return 0.0 - 1e-9 <= a <= 1.0 + 1e-9
 
@@ -501,6 +515,28 @@ class SemiringSymbolic(Semiring):
 
 
 class Evaluatable(ProbLogObject):
+
+    # Indicates whether the evaluator of this formula can be shared with worker processes, \
+    # i.e. the compiled circuit is immutable and does not depend on external (C) state.
+    supports_parallel = False
+
+    @classmethod
+    def create_from(cls, obj, cache=None, **kwdargs):
+        """Transform the given object into an object of the current class using transformations.
+
+        :param obj: obj to transform
+        :param cache: compilation cache to reuse previously compiled formulae from
+        :type cache: problog.cache.CompilationCache
+        :param kwdargs: additional options
+        :return: object of current class
+        """
+        if cache is not None and cache.supports_class(cls):
+            from .formula import LogicDAG
+
+            dag = LogicDAG.create_from(obj, **kwdargs)
+            return cache.compile(dag, cls, **kwdargs)
+        return super(Evaluatable, cls).create_from(obj, **kwdargs)
+
     def evidence_all(self):
         raise NotImplementedError()
 
@@ -563,7 +599,13 @@ class Evaluatable(ProbLogObject):
         return evaluator
 
     def evaluate(
-        self, index=None, semiring=None, evidence=None, weights=None, **kwargs
+        self,
+        index=None,
+        semiring=None,
+        evidence=None,
+        weights=None,
+        parallel=None,
+        **kwargs
     ):
         """Evaluate a set of nodes.
 
@@ -571,23 +613,132 @@ class Evaluatable(ProbLogObject):
         :param semiring: use the given semiring
         :param evidence: use the given evidence values (overrides formula)
         :param weights: use the given weights (overrides formula)
+        :param parallel: number of worker processes used for evaluating all queries \
+         (only used if the formula ``supports_parallel``, default: evaluate sequentially)
         :return: The result of the evaluation expressed as an external value of the semiring. \
          If index is ``None`` (all queries) then the result is a dictionary of name to value.
         """
-        evaluator = self.get_evaluator(semiring, evidence, weights, **kwargs)
-
         if index is None:
-            result = {}
-            # Probability of query given evidence
-
-            # interrupted = False
-            for name, node, label in evaluator.formula.labeled():
-                w = evaluator.evaluate(node)
-                result[name] = w
-            return result
+            return dict(
+                self.evaluate_iter(
+                    semiring, evidence, weights, parallel=parallel, **kwargs
+                )
+            )
         else:
+            evaluator = self.get_evaluator(semiring, evidence, weights, **kwargs)
             return evaluator.evaluate(index)
 
+    def evaluate_iter(
+        self, semiring=None, evidence=None, weights=None, parallel=None, **kwargs
+    ):
+        """Evaluate all queries lazily.
+
+        The result of each query is generated as soon as it is computed, in the order of \
+        ``labeled()``.
+        The arguments are the same as for :meth:`evaluate`.
+
+        :return: generator of pairs (name, value)
+        """
+        evaluator = self.get_evaluator(semiring, evidence, weights, **kwargs)
+
+        if parallel is not None and parallel > 1 and self.supports_parallel:
+            queries = list(evaluator.formula.labeled())
+            # Queries that are answered by a shared pass are evaluated here.
+            separate = evaluator.prepare_queries([node for _, node, _ in queries])
+            if len(separate) > 1:
+                values = _evaluate_parallel(evaluator, separate, parallel)
+                separate = set(separate)
+                for name, node, _ in queries:
+                    if node in separate:
+                        yield name, next(values)
+                    else:
+                        yield name, evaluator.evaluate(node)
+                return
+
+        for name, node, label in evaluator.formula.labeled():
+            yield name, evaluator.evaluate(node)
+
+    def get_weight_columns(self):
+        """Get the mapping of columns of a weight matrix onto the atoms of this formula.
+
+        :return: dictionary of column index to atom key
+        :rtype: dict[int, int]
+        """
+        return {key: key for key in self.get_weights()}
+
+    def _get_batch_evaluator(self, evaluator, semiring, evidence, weights, **kwargs):
+        """Get an evaluator for the next weight assignment of a batch.
+
+        :param evaluator: evaluator used for the previous weight assignment (or None)
+        :param semiring: semiring to use
+        :param evidence: evidence values (override values defined in formula)
+        :param weights: weights of the current assignment
+        :return: evaluator
+        """
+        return self.get_evaluator(semiring, evidence, weights, **kwargs)
+
+    def _get_batch_rows(self, weights):
+        """Convert the rows of a weight matrix into weight dictionaries (see \
+        :meth:`evaluate_batch`).
+
+        :param weights: weight matrix of N rows
+        :return: list of N dictionaries {atom key: external weight}
+        :rtype: list[dict]
+        """
+        columns = self.get_weight_columns()
+        rows = []
+        for row in weights:
+            row_weights = {}
+            for c, w in enumerate(row):
+                key = columns.get(c)
+                if key is not None and w is not None:
+                    row_weights[key] = w
+            rows.append(row_weights)
+        return rows
+
+    @staticmethod
+    def _get_batch_result(results, queries):
+        """Create the result matrix of :meth:`evaluate_batch`.
+
+        :param results: N lists of Q results
+        :param queries: number of queries Q
+        :return: N x Q matrix of results (a NumPy array if NumPy is available)
+        """
+        if np is not None:
+            return np.array(results).reshape((len(results), queries))
+        return results
+
+    def evaluate_batch(
+        self, weights, index=None, semiring=None, evidence=None, **kwargs
+    ):
+        """Evaluate a set of nodes for a batch of weight assignments.
+
+        Each row of the weight matrix is a weight assignment, column ``c`` of that row holds the \
+        (external) weight of the atom ``get_weight_columns()[c]``.
+        Columns that do not correspond to an atom and values that are ``None`` are ignored; the \
+        weights defined in the formula are used for those atoms.
+
+        By default, the nodes are evaluated row by row.
+        Formulae that can be flattened (d-DNNF, NNF and BDD) evaluate all rows of the batch in \
+        vectorized passes over the flattened circuit for the (log) probability semirings.
+
+        :param weights: weight matrix of N rows (e.g. a NumPy array)
+        :param index: list of Q nodes to evaluate (default: all queries in the order of ``labeled()``)
+        :param semiring: use the given semiring
+        :param evidence: use the given evidence values (overrides formula)
+        :return: N x Q matrix of results (a NumPy array if NumPy is available)
+        """
+        evaluator = None
+        results = []
+        for row_weights in self._get_batch_rows(weights):
+            evaluator = self._get_batch_evaluator(
+                evaluator, semiring, evidence, row_weights, **kwargs
+            )
+            if index is None:
+                index = [node for name, node, label in evaluator.formula.labeled()]
+            results.append([evaluator.evaluate(node) for node in index])
+        return self._get_batch_result(results, len(index or ()))
+
 
 @transform_allow_subclass
 class EvaluatableDSP(Evaluatable):
@@ -597,6 +748,46 @@ class EvaluatableDSP(Evaluatable):
         Evaluatable.__init__(self)
 
 
+# Evaluator shared by the queries evaluated in a worker process.
+_parallel_evaluator = None
+
+
+def _init_parallel_worker(evaluator):
+    global _parallel_evaluator
+    _parallel_evaluator = evaluator
+
+
+def _evaluate_parallel_node(node):
+    return _parallel_evaluator.evaluate(node)
+
+
+def _evaluate_parallel(evaluator, nodes, processes):
+    """Evaluate the given nodes with a pool of worker processes.
+
+    The evaluator (including the compiled circuit and the propagated evidence) is transferred \
+    to each worker only once, when the worker starts.
+    On platforms that fork, the workers share the parent's memory (copy-on-write) and no \
+    serialization is needed at all.
+
+    :param evaluator: initialized evaluator
+    :param nodes: list of nodes to evaluate
+    :param processes: number of worker processes
+    :return: generator of the results in the order of the nodes (produced as soon as they are \
+     available)
+    """
+    processes = min(processes, len(nodes))
+    chunksize = max(1, len(nodes) // (4 * processes))
+    pool = multiprocessing.Pool(
+        processes, initializer=_init_parallel_worker, initargs=(evaluator,)
+    )
+    try:
+        for value in pool.imap(_evaluate_parallel_node, nodes, chunksize):
+            yield value
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 class Evaluator(object):
     """Generic evaluator."""
 
@@ -623,6 +814,16 @@ class Evaluator(object):
         """Compute the value of the given node."""
         raise NotImplementedError("abstract method")
 
+    def prepare_queries(self, nodes):
+        """Perform the computations that are shared by the given queries (e.g. before they are \
+        evaluated by worker processes).
+
+        :param nodes: nodes that will be evaluated
+        :return: the nodes that require a separate computation (the others are cheap to evaluate)
+        :rtype: list
+        """
+        return nodes
+
     def evaluate_evidence(self):
         raise NotImplementedError("abstract method")
 
@@ -698,6 +899,16 @@ class FormulaEvaluator(object):
         self._computed_smooth.clear()
         self._fact_weights = weights
 
+    def prepare_queries(self, nodes):
+        """Perform the computations that are shared by the given queries (see \
+        :meth:`Evaluator.prepare_queries`).
+
+        :param nodes: nodes that will be evaluated
+        :return: the nodes that require a separate computation
+        :rtype: list
+        """
+        return nodes
+
     def update_weights(self, weights):
         """Update weights to given known weights.
 
@@ -23,6 +23,7 @@ Data structures for propositional logic.
 """
 from __future__ import print_function
 
+from array import array
 from collections import namedtuple, defaultdict, OrderedDict
 
 from .core import ProbLogObject
@@ -31,10 +32,16 @@ from .errors import InconsistentEvidenceError
 from .util import OrderedSet
 from .logic import Term, Or, Clause, And, is_ground
 
-from .evaluator import Evaluatable, FormulaEvaluator, FormulaEvaluatorNSP
+from .evaluator import (
+    Evaluatable,
+    FormulaEvaluator,
+    FormulaEvaluatorNSP,
+    SemiringLogProbability,
+)
+from .circuit import FlatCircuit, VectorizedFormulaEvaluator, is_vectorizable
 
 from .constraint import ConstraintAD
-from .core import transform
+from .core import transform, transform_create_as
 
 
 class BaseFormula(ProbLogObject):
@@ -214,6 +221,17 @@ class BaseFormula(ProbLogObject):
             label = self.LABEL_NAMED
         self._names[label][name] = key
 
+    def remove_name(self, name, label=None):
+        """Remove a name.
+
+        :param name: name of the node
+        :type name: Term
+        :param label: type of label (one of LABEL_*)
+        """
+        if label is None:
+            label = self.LABEL_NAMED
+        self._names[label].pop(name, None)
+
     def get_node_by_name(self, name):
         """Get node corresponding to the given name.
 
@@ -1696,6 +1714,39 @@ label_all=True)
             q += 1
         return s + "}"
 
+    def save(self, filename):
+        """Write this formula to a file in binary format (see :mod:`problog.formula_binary`).
+
+        :param filename: name of the file, or a file object opened in binary mode
+        """
+        from .formula_binary import save_formula
+
+        if hasattr(filename, "write"):
+            save_formula(self, filename)
+        else:
+            with open(filename, "wb") as f:
+                save_formula(self, f)
+
+    @classmethod
+    def load(cls, filename):
+        """Read a formula from a file in binary format (see :mod:`problog.formula_binary`).
+
+        :param filename: name of the file, or a file object opened in binary mode
+        :return: formula of the class that was stored, or of this class if it is a base class \
+         of the stored class
+        :rtype: LogicFormula
+        """
+        from .formula_binary import load_formula
+
+        if hasattr(filename, "read"):
+            formula = load_formula(filename)
+        else:
+            with open(filename, "rb") as f:
+                formula = load_formula(f)
+        if not isinstance(formula, cls):
+            formula = cls.create_from(formula)
+        return formula
+
     def clone(self, destination):
         destination._auto_compact = False
         source = self
@@ -1733,15 +1784,62 @@ class LogicDAG(LogicFormula):
 class LogicNNF(LogicDAG, Evaluatable):
     """A propositional formula in NNF form (i.e. only negation on facts)."""
 
+    supports_parallel = True
+
     def __init__(self, auto_compact=True, **kwdargs):
         LogicDAG.__init__(self, auto_compact, **kwdargs)
 
-    def _create_evaluator(self, semiring, weights, **kwargs):
+    def _create_evaluator(self, semiring, weights, vectorize=False, **kwargs):
         if semiring.is_nsp():
             return FormulaEvaluatorNSP(self, semiring, weights)
+        elif vectorize and is_vectorizable(semiring):
+            return VectorizedFormulaEvaluator(self, semiring, weights)
         else:
             return FormulaEvaluator(self, semiring, weights)
 
+    def evaluate_batch(
+        self, weights, index=None, semiring=None, evidence=None, **kwargs
+    ):
+        """Evaluate a set of nodes for each row of a weight matrix.
+
+        For the (log) probability semirings, all rows are evaluated at once on the flattened \
+        circuit, with one column per row.
+        See :meth:`Evaluatable.evaluate_batch` for the arguments.
+        """
+        if semiring is None:
+            semiring = SemiringLogProbability()
+        if not is_vectorizable(semiring) or len(self) == 0:
+            return Evaluatable.evaluate_batch(
+                self, weights, index, semiring, evidence, **kwargs
+            )
+        if index is None:
+            index = [node for name, node, label in self.labeled()]
+
+        rows = [
+            self.extract_weights(semiring, given)
+            for given in self._get_batch_rows(weights)
+        ]
+        circuit = FlatCircuit(self)
+        block = circuit.block_size(len(rows))
+        results = []
+        for start in range(0, len(rows), block):
+            batch = rows[start : start + block]
+            values = circuit.evaluate(circuit.batch_values(batch, semiring), semiring)
+            for r in range(len(batch)):
+                result = []
+                for node in index:
+                    if (
+                        node is not None
+                        and node < 0
+                        and type(self.get_node(-node)).__name__ != "atom"
+                    ):
+                        value = semiring.negate(float(values[circuit.slot(-node), r]))
+                    else:
+                        value = float(values[circuit.slot(node), r])
+                    result.append(semiring.result(value, self))
+                results.append(result)
+        return self._get_batch_result(results, len(index))
+
     def copy_node_from(self, source, index, translate=None):
         """Copy a node with transformation to Negation Normal Form (only negation on facts)."""
         if translate is None:
@@ -1802,6 +1900,278 @@ class DeterministicLogicFormula(LogicFormula):
         return self.TRUE
 
 
+class CompactLogicFormula(LogicFormula):
+    """A logic formula that stores its nodes in parallel typed arrays.
+
+    It behaves exactly like a :class:`LogicFormula`, but it uses far less memory for large \
+    ground programs: nodes are not stored as individual tuples (see :class:`CompactNodeList`) \
+    and the lookup indices for conjunctions and disjunctions are keyed by the hash of the \
+    children instead of the children themselves.
+    Nodes are reconstructed on access, which makes node access somewhat slower.
+    """
+
+    def __init__(self, **kwdargs):
+        LogicFormula.__init__(self, **kwdargs)
+        use_compact_storage(self)
+
+
+def use_compact_storage(formula):
+    """Store the nodes of the given formula in parallel typed arrays.
+
+    :param formula: empty formula
+    :type formula: LogicFormula
+    :raise ValueError: the formula is not empty
+    """
+    if len(formula) > 0:
+        raise ValueError("Can only change the node storage of an empty formula.")
+    formula._nodes = CompactNodeList()
+    formula._index_conj = _ChildrenIndex(formula._nodes, "conj")
+    formula._index_disj = _ChildrenIndex(formula._nodes, "disj")
+
+
+transform_create_as(CompactLogicFormula, LogicFormula)
+
+
+class CompactNodeList(object):
+    """List of formula nodes (atom, conj, disj) stored in parallel typed arrays.
+
+    It supports the list operations used by :class:`LogicFormula` (append, indexing, \
+    assignment, iteration).
+
+    For each node it stores its type (byte), the offset and the number of its children in a \
+    shared children array and a reference into the atom tables.
+    The fields of atoms are stored in side tables, names are stored in a sparse dictionary.
+    When the children of a node are replaced (e.g. by :meth:`LogicFormula.add_disjunct`), they \
+    are extended in place if they are at the end of the children array, and appended otherwise.
+    The children array is compacted when more than half of it is unused.
+    """
+
+    TYPE_ATOM = 0
+    TYPE_CONJ = 1
+    TYPE_DISJ = 2
+
+    # Encoding of a child that is None (i.e. FALSE).
+    CHILD_NONE = -(2 ** 31)
+
+    def __init__(self):
+        self._types = array("b")
+        self._offsets = array("q")
+        self._counts = array("i")
+        self._refs = array("i")
+        self._children = array("i")
+        self._garbage = 0
+        self._names = {}
+        # Side tables for the atoms
+        self._identifiers = []
+        self._probabilities = []
+        self._groups = []
+        self._sources = []
+
+    def __len__(self):
+        return len(self._types)
+
+    def append(self, node):
+        self._types.append(self.TYPE_ATOM)
+        self._offsets.append(0)
+        self._counts.append(0)
+        self._refs.append(-1)
+        self._store(len(self._types) - 1, node)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._types)
+        ntype = self._types[index]
+        name = self._names.get(index)
+        if ntype == self.TYPE_ATOM:
+            ref = self._refs[index]
+            return atom(
+                self._identifiers[ref],
+                self._probabilities[ref],
+                self._groups[ref],
+                name,
+                self._sources[ref],
+            )
+        elif ntype == self.TYPE_CONJ:
+            return conj(self.get_children(index), name)
+        else:
+            return disj(self.get_children(index), name)
+
+    def __setitem__(self, index, node):
+        if index < 0:
+            index += len(self._types)
+        self._store(index, node)
+
+    def __iter__(self):
+        for i in range(len(self._types)):
+            yield self[i]
+
+    def __reversed__(self):
+        for i in range(len(self._types) - 1, -1, -1):
+            yield self[i]
+
+    def get_type(self, index):
+        """Get the type of the node at the given position.
+
+        :param index: position of the node (0-based)
+        :return: node type (``atom``, ``conj`` or ``disj``)
+        """
+        return ("atom", "conj", "disj")[self._types[index]]
+
+    def get_children(self, index):
+        """Get the children of the node at the given position.
+
+        :param index: position of the node (0-based)
+        :return: tuple of children (empty for atoms)
+        """
+        offset = self._offsets[index]
+        children = tuple(self._children[offset : offset + self._counts[index]])
+        if self.CHILD_NONE in children:
+            children = tuple(None if c == self.CHILD_NONE else c for c in children)
+        return children
+
+    def _store(self, index, node):
+        ntype = type(node).__name__
+        if ntype == "atom":
+            self._release_children(index)
+            ref = self._refs[index]
+            if ref < 0:
+                self._refs[index] = len(self._identifiers)
+                self._identifiers.append(node.identifier)
+                self._probabilities.append(node.probability)
+                self._groups.append(node.group)
+                self._sources.append(node.source)
+            else:
+                self._identifiers[ref] = node.identifier
+                self._probabilities[ref] = node.probability
+                self._groups[ref] = node.group
+                self._sources[ref] = node.source
+            self._types[index] = self.TYPE_ATOM
+        elif ntype in ("conj", "disj"):
+            children = array(
+                "i", (self.CHILD_NONE if c is None else c for c in node.children)
+            )
+            offset = self._offsets[index]
+            if (
+                self._types[index] != self.TYPE_ATOM
+                and offset + self._counts[index] == len(self._children)
+            ):
+                # Children are at the end of the array: replace them in place.
+                del self._children[offset:]
+            else:
+                self._release_children(index)
+                offset = len(self._children)
+            self._children.extend(children)
+            self._offsets[index] = offset
+            self._counts[index] = len(children)
+            self._types[index] = self.TYPE_CONJ if ntype == "conj" else self.TYPE_DISJ
+            if self._garbage > 1024 and 2 * self._garbage > len(self._children):
+                self._compact()
+        else:
+            raise TypeError("Unexpected node type: '%s'." % ntype)
+
+        if node.name is None:
+            self._names.pop(index, None)
+        else:
+            self._names[index] = node.name
+
+    def _release_children(self, index):
+        if self._types[index] != self.TYPE_ATOM:
+            self._garbage += self._counts[index]
+            self._counts[index] = 0
+
+    def _compact(self):
+        """Remove unused entries from the children array."""
+        children = array("i")
+        offsets = self._offsets
+        for i, ntype in enumerate(self._types):
+            if ntype != self.TYPE_ATOM:
+                offset = offsets[i]
+                offsets[i] = len(children)
+                children.extend(self._children[offset : offset + self._counts[i]])
+        self._children = children
+        self._garbage = 0
+
+
+class _ChildrenIndex(object):
+    """Lookup index of compound nodes by their children.
+
+    The index is an open addressing hash table stored in two arrays (hash and node key).
+    Matches are verified against the node list.
+
+    :param nodes: node list
+    :type nodes: CompactNodeList
+    :param ntype: type of the indexed nodes (``conj`` or ``disj``)
+    """
+
+    def __init__(self, nodes, ntype):
+        self._nodes = nodes
+        self._ntype = ntype
+        self._size = 0
+        self._hashes = array("q", [0]) * 8
+        self._keys = array("i", [0]) * 8
+
+    def _find(self, key):
+        """Find the slot of the given key.
+
+        :param key: children of the node
+        :return: tuple (slot, node key) where node key is 0 if the node is not in the index
+        """
+        h = hash(key)
+        mask = len(self._keys) - 1
+        slot = h & mask
+        while True:
+            index = self._keys[slot]
+            if index == 0:
+                return slot, 0
+            elif (
+                self._hashes[slot] == h
+                and self._nodes.get_type(index - 1) == self._ntype
+                and self._nodes.get_children(index - 1) == key
+            ):
+                return slot, index
+            slot = (slot + 1) & mask
+
+    def __contains__(self, key):
+        return self._find(key)[1] != 0
+
+    def __getitem__(self, key):
+        index = self._find(key)[1]
+        if index == 0:
+            raise KeyError(key)
+        return index
+
+    def get(self, key, default=None):
+        index = self._find(key)[1]
+        if index == 0:
+            return default
+        return index
+
+    def __setitem__(self, key, index):
+        slot, current = self._find(key)
+        self._hashes[slot] = hash(key)
+        self._keys[slot] = index
+        if current == 0:
+            self._size += 1
+            if 2 * self._size > len(self._keys):
+                self._resize(2 * len(self._keys))
+
+    def _resize(self, capacity):
+        hashes, keys = self._hashes, self._keys
+        self._hashes = array("q", [0]) * capacity
+        self._keys = array("i", [0]) * capacity
+        mask = capacity - 1
+        for h, index in zip(hashes, keys):
+            if index != 0:
+                slot = h & mask
+                while self._keys[slot] != 0:
+                    slot = (slot + 1) & mask
+                self._hashes[slot] = h
+                self._keys[slot] = index
+
+    def __len__(self):
+        return self._size
+
+
 @transform(LogicDAG, LogicNNF)
 def dag_to_nnf(source, target=None, **kwargs):
     if target is None:
@@ -0,0 +1,488 @@
+"""
+problog.formula_binary - Binary format for ground programs
+----------------------------------------------------------
+
+Binary serialization of :class:`LogicFormula` (and its subclasses such as :class:`LogicDAG`).
+
+Layout of a file (all integers little-endian):
+
+    * magic ``PLGB`` (4 bytes), format version (uint32), number of sections (uint32)
+    * section table: for each section its offset and size in bytes (2 x uint64)
+    * sections, each aligned on 8 bytes:
+
+        1. node types (int8, one per node: 0 = atom, 1 = conj, 2 = disj)
+        2. child offsets (int64, number of nodes + 1, CSR format)
+        3. children (int32, ``None`` is encoded as -2^31)
+        4. object table (JSON, UTF-8): class of the formula, atom fields, node names, labels, \
+        constraints, weights and evidence values
+
+The node structure is stored as raw arrays at fixed offsets, such that it can be memory-mapped \
+(e.g. with ``numpy.memmap``) without parsing the file.
+
+The object table is a flat list of values, in which each value only refers to values that \
+precede it (e.g. ``["T", 3, [4, 5], null]`` is the term with the functor stored at position 3 \
+and the arguments stored at positions 4 and 5).
+It only contains plain data: loading a file creates terms, constraints and formulae of a fixed \
+set of classes and never executes code stored in the file.
+
+..
+    Part of the ProbLog distribution.
+
+    Copyright 2015 KU Leuven, DTAI Research Group
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+from __future__ import print_function
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from importlib import import_module
+
+from .constraint import ConstraintAD, ClauseConstraint, TrueConstraint
+from .engine_stack import FixedContext, State
+from .errors import ProbLogError
+from .logic import (
+    Term,
+    AggTerm,
+    Var,
+    Constant,
+    Clause,
+    AnnotatedDisjunction,
+    Or,
+    And,
+    Not,
+)
+
+MAGIC = b"PLGB"
+VERSION = 2
+
+NODE_TYPES = ("atom", "conj", "disj")
+CHILD_NONE = -(2 ** 31)
+
+_HEADER = struct.Struct("<4sII")
+_SECTION = struct.Struct("<QQ")
+_SECTIONS = 4
+
+# Attributes of the formula that determine how new nodes are added.
+_SETTINGS = (
+    "_auto_compact",
+    "_avoid_name_clash",
+    "_keep_order",
+    "keep_all",
+    "_keep_builtins",
+    "_keep_duplicates",
+    "_max_arity",
+    "_use_string_names",
+)
+
+# Classes of formulae that can be stored (name: module).
+_CLASSES = {
+    "LogicFormula": "problog.formula",
+    "LogicDAG": "problog.formula",
+    "LogicNNF": "problog.formula",
+    "CompactLogicFormula": "problog.formula",
+    "DDNNF": "problog.ddnnf_formula",
+}
+
+# Tags of the terms in the object table.
+_TERMS = {
+    Term: "T",
+    AggTerm: "G",
+    Constant: "C",
+    Var: "V",
+    Not: "N",
+    And: "A",
+    Or: "O",
+    Clause: "R",
+    AnnotatedDisjunction: "D",
+}
+
+
+def _is_scalar(value):
+    """Checks whether the given value is stored as is in the object table."""
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+class FormulaFormatError(ProbLogError):
+    """Error raised when a file is not a valid binary ground program."""
+
+    def __init__(self, message):
+        ProbLogError.__init__(self, message)
+
+
+def is_binary_formula(filename):
+    """Checks whether the given file contains a binary ground program.
+
+    :param filename: name of the file
+    :return: True if the file starts with the magic number of the binary format
+    """
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+def _to_bytes(data):
+    """Get the little-endian bytes of the given array."""
+    if sys.byteorder != "little" and data.itemsize > 1:
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def _from_bytes(typecode, data):
+    """Create an array from the given little-endian bytes."""
+    result = array(typecode)
+    result.frombytes(data)
+    if sys.byteorder != "little" and result.itemsize > 1:
+        result.byteswap()
+    return result
+
+
+def _get_class_name(formula):
+    """Get the name of the most specific class of the given formula that can be stored."""
+    for cls in type(formula).__mro__:
+        if _CLASSES.get(cls.__name__) == cls.__module__:
+            return cls.__name__
+    raise FormulaFormatError(
+        "Cannot store a formula of type '%s' in binary format." % type(formula).__name__
+    )
+
+
+def _get_class(name):
+    """Get the formula class with the given name (see :data:`_CLASSES`)."""
+    module = _CLASSES.get(name)
+    if module is None:
+        raise FormulaFormatError("Unsupported class of formula: '%s'." % name)
+    return getattr(import_module(module), name)
+
+
+def _children(value):
+    """Get the values that are referred to by the given value in the object table."""
+    tp = type(value)
+    if _is_scalar(value):
+        return ()
+    elif tp in _TERMS:
+        if tp == Not:
+            return value.functor, value.args[0]
+        return (value.functor, value.probability) + tuple(value.args)
+    elif tp in (tuple, list, set, frozenset, FixedContext):
+        children = list(value)
+        if tp == FixedContext:
+            children.append(value.state)
+        return children
+    elif tp in (dict, OrderedDict, State):
+        return [v for item in value.items() for v in item]
+    elif tp == ConstraintAD:
+        return (value.group, value.location)
+    elif tp in (ClauseConstraint, TrueConstraint):
+        return ()
+    raise FormulaFormatError(
+        "Cannot store a value of type '%s' in binary format." % tp.__name__
+    )
+
+
+def _encode_value(value, index):
+    """Encode the given value as a row of the object table.
+
+    :param value: value to encode
+    :param index: positions of the values in the table (by id)
+    :return: row of the object table
+    :rtype: list
+    """
+    tp = type(value)
+    if _is_scalar(value):
+        return value
+    elif tp in _TERMS:
+        if tp == Not:
+            return ["N", index[id(value.functor)], index[id(value.args[0])]]
+        return [
+            _TERMS[tp],
+            index[id(value.functor)],
+            [index[id(a)] for a in value.args],
+            index[id(value.probability)],
+        ]
+    elif tp == tuple:
+        return ["t", [index[id(v)] for v in value]]
+    elif tp == list:
+        return ["l", [index[id(v)] for v in value]]
+    elif tp in (set, frozenset):
+        return ["s", [index[id(v)] for v in value]]
+    elif tp == FixedContext:
+        return ["x", [index[id(v)] for v in value], index[id(value.state)]]
+    elif tp in (dict, OrderedDict, State):
+        return [
+            "S" if tp == State else "d",
+            [[index[id(k)], index[id(v)]] for k, v in value.items()],
+        ]
+    elif tp == ConstraintAD:
+        return [
+            "ad",
+            index[id(value.group)],
+            sorted(value.nodes),
+            value.extra_node,
+            index[id(value.location)],
+        ]
+    elif tp == ClauseConstraint:
+        return ["cc", list(value.nodes)]
+    else:
+        return ["tc", value.node]
+
+
+def _encode(root):
+    """Encode the given value as an object table.
+
+    The values are stored in post-order (children first) without recursion, such that deeply \
+    nested terms (e.g. long lists) can be stored.
+    Values that are shared are stored once.
+
+    :param root: value to encode
+    :return: object table (the root is the last value)
+    :rtype: list
+    """
+    table = []
+    index = {}
+    stack = [root]
+    while stack:
+        value = stack[-1]
+        if id(value) in index:
+            stack.pop()
+            continue
+        pending = [c for c in _children(value) if id(c) not in index]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        table.append(_encode_value(value, index))
+        index[id(value)] = len(table) - 1
+    return table
+
+
+def _decode(table):
+    """Decode an object table created by :func:`_encode`.
+
+    :param table: object table
+    :return: the root value
+    :raise FormulaFormatError: the table is not valid
+    """
+    values = []
+    try:
+        for row in table:
+            if type(row) != list:
+                value = row
+            else:
+                tag = row[0]
+                if tag == "N":
+                    value = Not(values[row[1]], values[row[2]])
+                elif tag == "C":
+                    value = Constant(values[row[1]], p=values[row[3]])
+                elif tag == "V":
+                    value = Var(values[row[1]], p=values[row[3]])
+                elif tag in ("A", "O", "R", "D"):
+                    args = [values[a] for a in row[2]]
+                    cls = {"A": And, "O": Or, "R": Clause, "D": AnnotatedDisjunction}[tag]
+                    value = cls(*args, p=values[row[3]])
+                elif tag in ("T", "G"):
+                    cls = Term if tag == "T" else AggTerm
+                    args = [values[a] for a in row[2]]
+                    value = cls(values[row[1]], *args, p=values[row[3]])
+                elif tag == "t":
+                    value = tuple(values[v] for v in row[1])
+                elif tag == "l":
+                    value = [values[v] for v in row[1]]
+                elif tag == "s":
+                    value = set(values[v] for v in row[1])
+                elif tag == "x":
+                    value = FixedContext(values[v] for v in row[1])
+                    value.state = values[row[2]]
+                elif tag in ("d", "S"):
+                    value = (dict if tag == "d" else State)(
+                        (values[k], values[v]) for k, v in row[1]
+                    )
+                elif tag == "ad":
+                    value = ConstraintAD(values[row[1]])
+                    value.nodes = set(row[2])
+                    value.extra_node = row[3]
+                    value.location = values[row[4]]
+                elif tag == "cc":
+                    value = ClauseConstraint(list(row[1]))
+                elif tag == "tc":
+                    value = TrueConstraint(row[1])
+                else:
+                    raise FormulaFormatError("Unknown value in binary ground program.")
+            values.append(value)
+        return values[-1]
+    except (IndexError, KeyError, TypeError, ValueError):
+        raise FormulaFormatError("Invalid object table in binary ground program.")
+
+
+def save_formula(formula, f):
+    """Write the given formula in binary format.
+
+    :param formula: ground program
+    :type formula: LogicFormula
+    :param f: file object opened in binary mode
+    """
+    types = array("b")
+    offsets = array("q", [0])
+    children = array("i")
+    atoms = []
+    names = {}
+    for i, n, t in formula:
+        types.append(NODE_TYPES.index(t))
+        if t == "atom":
+            atoms.append((n.identifier, n.probability, n.group, n.source))
+        else:
+            children.extend(CHILD_NONE if c is None else c for c in n.children)
+        offsets.append(len(children))
+        if n.name is not None:
+            names[i] = n.name
+
+    objects = {
+        "class": _get_class_name(formula),
+        "settings": dict((k, getattr(formula, k)) for k in _SETTINGS),
+        "atoms": atoms,
+        "names": names,
+        "labels": list(formula.get_names_with_label()),
+        "constraints_me": formula._constraints_me,
+        "constraints": formula._constraints,
+        "weights": formula.get_weights(),
+        "evidence_values": getattr(formula, "lookup_evidence", None),
+    }
+    sections = [
+        _to_bytes(types),
+        _to_bytes(offsets),
+        _to_bytes(children),
+        json.dumps(_encode(objects), separators=(",", ":")).encode("utf-8"),
+    ]
+
+    position = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for data in sections:
+        position += -position % 8
+        table.append((position, len(data)))
+        position += len(data)
+
+    f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+    for entry in table:
+        f.write(_SECTION.pack(*entry))
+    position = _HEADER.size + _SECTION.size * len(sections)
+    for (offset, size), data in zip(table, sections):
+        f.write(b"\0" * (offset - position))
+        f.write(data)
+        position = offset + size
+
+
+def read_sections(buffer):
+    """Get the sections of a binary ground program.
+
+    :param buffer: content of the file (bytes or memory map)
+    :return: list of memoryviews, one for each section
+    :raise FormulaFormatError: the buffer does not contain a supported binary ground program
+    """
+    if len(buffer) < _HEADER.size:
+        raise FormulaFormatError("Not a binary ground program.")
+    magic, version, count = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise FormulaFormatError("Not a binary ground program.")
+    if version != VERSION or count != _SECTIONS:
+        raise FormulaFormatError(
+            "Unsupported version of the binary ground program format: %s." % version
+        )
+    view = memoryview(buffer)
+    sections = []
+    for i in range(count):
+        offset, size = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+        if offset + size > len(buffer):
+            raise FormulaFormatError("Truncated binary ground program.")
+        sections.append(view[offset : offset + size])
+    return sections
+
+
+def load_formula(f, target=None):
+    """Read a formula in binary format.
+
+    :param f: file object opened in binary mode
+    :param target: formula to load the nodes into (default: new formula of the stored class)
+    :type target: LogicFormula
+    :return: the ground program
+    :rtype: LogicFormula
+    """
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, IOError, OSError, ValueError):
+        # Not a regular file (e.g. a pipe or an in-memory stream).
+        buffer = f.read()
+    sections = []
+    try:
+        sections = read_sections(buffer)
+        types = _from_bytes("b", sections[0])
+        offsets = _from_bytes("q", sections[1])
+        children = _from_bytes("i", sections[2])
+        objects = _decode(json.loads(bytes(sections[3]).decode("utf-8")))
+    finally:
+        for section in sections:
+            section.release()
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    if target is None:
+        target = _get_class(objects["class"])()
+        for k, v in objects["settings"].items():
+            if k in _SETTINGS:
+                setattr(target, k, v)
+    elif len(target) > 0:
+        raise ValueError("Can only load a ground program into an empty formula.")
+
+    names = objects["names"]
+    atoms = iter(objects["atoms"])
+    for i, t in enumerate(types):
+        name = names.get(i + 1)
+        if t == 0:
+            identifier, probability, group, source = next(atoms)
+            target._add(
+                target._create_atom(identifier, probability, group, name, source),
+                reuse=False,
+            )
+            target._atomcount += 1
+            if identifier not in target._index_atom:
+                target._index_atom[identifier] = i + 1
+            if type(identifier) == int and identifier >= target._index_next:
+                target._index_next = identifier + 1
+        else:
+            content = tuple(
+                None if c == CHILD_NONE else c
+                for c in children[offsets[i] : offsets[i + 1]]
+            )
+            if t == 1:
+                target._add(target._create_conj(content, name), reuse=False)
+                collection = target._index_conj
+            else:
+                target._add(target._create_disj(content, name), reuse=False)
+                collection = target._index_disj
+            if content not in collection:
+                collection[content] = i + 1
+
+    for name, key, label in objects["labels"]:
+        target._names[label][name] = key
+    target._constraints_me = objects["constraints_me"]
+    target._constraints = objects["constraints"]
+    target.set_weights(objects["weights"])
+    if objects["evidence_values"] is not None:
+        target.lookup_evidence = objects["evidence_values"]
+    return target
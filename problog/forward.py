@@ -27,14 +27,22 @@ from .dd_formula import DD
 from .sdd_formula import SDD
 from .bdd_formula import BDD
 from .core import transform
-from .evaluator import Evaluator, EvaluatableDSP, InconsistentEvidenceError
+from .evaluator import (
+    Evaluator,
+    EvaluatableDSP,
+    InconsistentEvidenceError,
+    SemiringProbability,
+    SemiringLogProbability,
+)
 
 from .dd_formula import build_dd
 
+import sys
 import warnings
 import time
 import logging
 import copy
+import mmap
 import signal
 
 from .core import transform_create_as
@@ -45,13 +53,58 @@ import random
 
 from collections import defaultdict
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 def timeout_handler(signum, frame):
     raise SystemError("Process timeout (Python) [%s]" % signum)
 
 
+def _memory_usage():
+    """Get the memory usage of this process in MB (None if not available).
+
+    This is the current resident set size where ``/proc/self/statm`` is available, and the \
+    peak resident set size (as reported by ``resource``) on other platforms.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE / (1024.0 * 1024.0)
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return usage / (1024.0 * 1024.0)  # bytes
+    else:
+        return usage / 1024.0  # kilobytes
+
+
 class ForwardInference(DD):
-    def __init__(self, compile_timeout=None, **kwdargs):
+    """Anytime bottom-up compilation of a (possibly cyclic) formula.
+
+    Compilation can be interrupted by a time or memory budget (or by the user).
+    The internal nodes computed so far are lower bounds of the nodes they represent, \
+    see :meth:`lower_inode` and :meth:`upper_inode`.
+
+    :param compile_timeout: time budget for compilation in seconds
+    :type compile_timeout: float
+    :param compile_memory: memory budget for compilation in MB (increase of the memory usage \
+     of the process since the start of the compilation, see :func:`_memory_usage`)
+    :type compile_memory: float
+    :param bound_depth: number of levels of incomplete nodes expanded for computing upper bounds
+    :type bound_depth: int
+    """
+
+    # Number of node updates between two checks of the memory budget.
+    memory_check_interval = 64
+
+    def __init__(
+        self, compile_timeout=None, compile_memory=None, bound_depth=20, **kwdargs
+    ):
         super(ForwardInference, self).__init__(auto_compact=False, **kwdargs)
 
         self._inodes_prev = None
@@ -62,6 +115,11 @@ class ForwardInference(DD):
         self._completed = None
 
         self.timeout = compile_timeout
+        self.memory_limit = compile_memory
+        self.bound_depth = bound_depth
+        self._updates = 0
+        self._memory_start = None
+        self.inodes = None
 
         self._update_listeners = []
 
@@ -76,7 +134,7 @@ class ForwardInference(DD):
 
     def is_complete(self, node):
         node = abs(node)
-        return self._completed[node - 1]
+        return self._completed is not None and self._completed[node - 1]
 
     def set_complete(self, node):
         self._completed[node - 1] = True
@@ -110,13 +168,25 @@ class ForwardInference(DD):
                     for atom in node.children:
                         self._atoms_in_rules[abs(atom)].add(index)
         self.build_constraint_dd()
-        self.inodes = [None] * len(self)
         self._inodes_prev = [None] * len(self)
         self._inodes_old = [None] * len(self)
         self._inodes_neg = [None] * len(self)
+        # Set last: the build has started once the internal nodes exist.
+        self.inodes = [None] * len(self)
         self._compute_minmax_depths()
 
+    def is_build_started(self):
+        """Checks whether the compilation got past its initialization (see :meth:`init_build`).
+
+        When the compilation is interrupted before, nothing is known about the compound nodes \
+        and the evidence.
+        """
+        return self.inodes is not None
+
     def _propagate_complete(self, interrupted=False):
+        if self._completed is None:
+            # Interrupted before the build started.
+            return
         if not interrupted:
             for i, c in enumerate(self._completed):
                 if not c:
@@ -248,6 +318,7 @@ class ForwardInference(DD):
         # nodes_to_recompute should be an updateable heap without duplicates
         while to_recompute:
             key, node = to_recompute.pop_with_key()
+            self._check_budget()
             if self.update_inode(node):  # The node has changed
                 # Find rules that may be affected
                 for rule in self._atoms_in_rules[node]:
@@ -259,6 +330,23 @@ class ForwardInference(DD):
                 # if self.is_complete(node):
                 #     self._update_minmax_depths(node)
 
+    def _check_budget(self):
+        """Interrupt the compilation when the memory budget is exceeded.
+
+        :raise SystemError: the memory budget is exceeded
+        """
+        if self.memory_limit:
+            self._updates += 1
+            if self._updates % self.memory_check_interval == 0:
+                usage = _memory_usage()
+                if usage is not None and self._memory_start is not None:
+                    usage -= self._memory_start
+                    if usage > self.memory_limit:
+                        raise SystemError(
+                            "Memory budget exceeded (%.1f MB > %s MB)"
+                            % (usage, self.memory_limit)
+                        )
+
     def build_iteration_levelwise(self, updated_nodes):
         while updated_nodes:
             next_updates = OrderedSet()
@@ -298,24 +386,33 @@ class ForwardInference(DD):
 
         return updated_nodes
 
-    def build_dd(self):
+    def build_dd(self, progress=None):
+        """Build the internal representation of the formula.
+
+        :param progress: callback called as ``progress(done, total)`` after each stratum, \
+        with the number of completed nodes
+        :type progress: callable
+        """
         required_nodes = set(
             [abs(n) for q, n, l in self.labeled() if self.is_probabilistic(n)]
         )
         required_nodes |= set(
             [abs(n) for q, n, v in self.evidence_all() if self.is_probabilistic(n)]
         )
-        if self.timeout:
-            # signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(self.timeout)
-            signal.signal(signal.SIGALRM, timeout_handler)
-            logging.getLogger("problog").info("Set timeout:", self.timeout)
+        if self.memory_limit:
+            self._memory_start = _memory_usage()
         try:
+            if self.timeout:
+                signal.signal(signal.SIGALRM, timeout_handler)
+                signal.setitimer(signal.ITIMER_REAL, self.timeout)
+                logging.getLogger("problog").info("Set timeout: %s", self.timeout)
             self.init_build()
             updated_nodes = OrderedSet(self._facts)
             while updated_nodes:
                 # TODO only check nodes that are actually used in negation
                 updated_nodes = self.build_stratum(updated_nodes)
+                if progress is not None:
+                    progress(sum(self._completed), len(self))
             self._propagate_complete(False)
         except SystemError as err:
             self._propagate_complete(True)
@@ -323,8 +420,9 @@ class ForwardInference(DD):
         except KeyboardInterrupt as err:
             self._propagate_complete(True)
             logging.getLogger("problog").warning(err)
-
-        signal.alarm(0)
+        finally:
+            if self.timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
         self.build_constraint_dd()
 
     def current(self):
@@ -426,6 +524,9 @@ class ForwardInference(DD):
         """
         assert self.is_probabilistic(index)
         node = self.get_node(abs(index))
+        if type(node).__name__ != "atom" and not self.is_build_started():
+            # The compilation was interrupted before it started.
+            return None
         if type(node).__name__ == "atom":
             av = self.atom2var.get(abs(index))
             if av is None:
@@ -460,6 +561,101 @@ class ForwardInference(DD):
         assert index > 0
         self.inodes[index - 1] = node
 
+    def lower_inode(self, index):
+        """Get an internal node that implies the given node in the current state of the compilation.
+
+        For complete nodes this is the exact internal node.
+        The result is referenced and should be dereferenced by the caller.
+
+        :param index: index of the node
+        :return: internal node
+        """
+        mgr = self.get_manager()
+        if self.is_true(index):
+            result = mgr.true()
+        elif self.is_false(index):
+            result = mgr.false()
+        elif index < 0:
+            upper = self.upper_inode(-index)
+            result = mgr.negate(upper)
+            mgr.deref(upper)
+            return result
+        else:
+            result = self.get_inode(index, final=True)
+            if result is None:
+                result = mgr.false()
+        mgr.ref(result)
+        return result
+
+    def upper_inode(self, index, max_depth=None):
+        """Get an internal node that is implied by the given node in the current state of the \
+        compilation.
+
+        Incomplete nodes are expanded up to the given depth (using the lower bounds of negated \
+        children), deeper incomplete nodes and nodes on a cycle are assumed to be true.
+        For complete nodes this is the exact internal node.
+        The result is referenced and should be dereferenced by the caller.
+
+        :param index: index of the node
+        :param max_depth: maximal depth of expanded incomplete nodes (default: bound_depth)
+        :return: internal node
+        """
+        mgr = self.get_manager()
+        if self.is_true(index) or self.is_false(index):
+            return self.lower_inode(index)
+        elif index < 0:
+            lower = self.lower_inode(-index)
+            result = mgr.negate(lower)
+            mgr.deref(lower)
+            return result
+        if max_depth is None:
+            max_depth = self.bound_depth
+        cache = {}
+        result = self._upper_inode(index, max_depth, cache, set())
+        mgr.ref(result)
+        mgr.deref(*cache.values())
+        return result
+
+    def _upper_inode(self, index, depth, cache, active):
+        result = cache.get(index)
+        if result is not None:
+            return result
+        elif index in active:
+            return self.get_manager().true()
+
+        mgr = self.get_manager()
+        node = self.get_node(index)
+        if type(node).__name__ == "atom" or self.is_complete(index):
+            result = self.lower_inode(index)
+        elif depth <= 0:
+            result = mgr.true()
+            mgr.ref(result)
+        else:
+            active.add(index)
+            children = []
+            negated = []
+            for c in node.children:
+                if self.is_true(c):
+                    children.append(mgr.true())
+                elif self.is_false(c):
+                    children.append(mgr.false())
+                elif c > 0:
+                    children.append(self._upper_inode(c, depth - 1, cache, active))
+                else:
+                    lower = self.lower_inode(-c)
+                    children.append(mgr.negate(lower))
+                    negated.append(children[-1])
+                    mgr.deref(lower)
+            if type(node).__name__ == "conj":
+                result = mgr.conjoin(*children)
+            else:
+                result = mgr.disjoin(*children)
+            if negated:
+                mgr.deref(*negated)
+            active.discard(index)
+        cache[index] = result
+        return result
+
     def add_constraint(self, c):
         LogicFormula.add_constraint(self, c)
 
@@ -528,6 +724,8 @@ class _ForwardBDD(BDD, ForwardInference):
     def __init__(self, **kwdargs):
         BDD.__init__(self, **kwdargs)
         ForwardInference.__init__(self, **kwdargs)
+        # Number of variables the manager is created with (as for SDDs, unused by BDDs).
+        self.init_varcount = -1
 
     @classmethod
     def is_available(cls):
@@ -669,6 +867,10 @@ class ForwardEvaluator(Evaluator):
                 self.fsdd.init_varcount = self.formula.atomcount
             build_dd(self.formula, self.fsdd)
 
+        if not self.fsdd.is_build_started():
+            # Compilation was interrupted before it started: only the trivial bounds are known.
+            return
+
         # Update weights with constraints and evidence
         enode = self.fsdd.get_manager().conjoin(
             self.fsdd.get_evidence_inode(), self.fsdd.get_constraint_inode()
@@ -693,6 +895,9 @@ class ForwardEvaluator(Evaluator):
         for name, node, label in self.fsdd.labeled():
             if self.fsdd.is_probabilistic(node):
                 inode = self.fsdd.get_inode(node)
+                if inode is None:
+                    # Compilation was interrupted before reaching this node.
+                    continue
                 qnode = self.fsdd.get_manager().conjoin(inode, enode)
                 tvalue = self.fsdd.get_manager().wmc(enode, weights, self.semiring)
                 value = self.fsdd.get_manager().wmc(qnode, weights, self.semiring)
@@ -706,6 +911,60 @@ class ForwardEvaluator(Evaluator):
     def propagate(self):
         self.initialize()
 
+    def _get_inode_weights(self):
+        weights = {}
+        for atom, weight in self.weights.items():
+            av = self.fsdd.atom2var.get(atom)
+            if av is not None:
+                weights[av] = weight
+            elif atom == 0:
+                weights[0] = weight
+        return weights
+
+    def bounds(self, index):
+        """Compute bounds on the probability of the given node given the evidence, based on the \
+        current state of the compilation.
+
+        With lower and upper internal nodes L and U (see :meth:`ForwardInference.lower_inode`), \
+        the bounds are P(Lq, Le) / (P(Lq, Le) + P(-Lq, Ue)) and \
+        P(Uq, Ue) / (P(Uq, Ue) + P(-Uq, Le)).
+        The bounds coincide when the node and the evidence are complete.
+
+        :param index: index of the node
+        :return: tuple of lower and upper bound (in the semiring)
+        """
+        source = self.fsdd
+        mgr = source.get_manager()
+        weights = self._get_inode_weights()
+        semiring = self.semiring
+
+        constraint = source.get_constraint_inode()
+        ev_lower = source.lower_inode(source.evidence_node)
+        ev_upper = source.upper_inode(source.evidence_node)
+        q_lower = source.lower_inode(index)
+        q_upper = source.upper_inode(index)
+        nq_upper = mgr.negate(q_lower)
+        nq_lower = mgr.negate(q_upper)
+
+        values = []
+        for parts in (
+            (q_lower, ev_lower),
+            (nq_upper, ev_upper),
+            (q_upper, ev_upper),
+            (nq_lower, ev_lower),
+        ):
+            inode = mgr.conjoin(constraint, *parts)
+            values.append(mgr.wmc(inode, weights, semiring))
+            mgr.deref(inode)
+        mgr.deref(ev_lower, ev_upper, q_lower, q_upper, nq_upper, nq_lower)
+
+        a, b, c, d = values
+        total = semiring.plus(a, b)
+        lower = semiring.zero() if semiring.is_zero(total) else semiring.normalize(a, total)
+        total = semiring.plus(c, d)
+        upper = semiring.one() if semiring.is_zero(total) else semiring.normalize(c, total)
+        return lower, upper
+
     def evaluate(self, index):
         """Compute the value of the given node."""
         # We should get results from cache here.
@@ -730,6 +989,12 @@ class ForwardEvaluator(Evaluator):
                 tvalue = self.fsdd.get_manager().wmc(enode, weights, self.semiring)
                 result = self.semiring.normalize(tvalue, tvalue)
                 return self.semiring.result(result, self.formula)
+        elif not self.fsdd.is_build_started():
+            # Not even the evidence was compiled.
+            return (
+                self.semiring.result(self.semiring.zero()),
+                self.semiring.result(self.semiring.one()),
+            )
         else:
             n = self.formula.get_node(abs(index))
             nt = type(n).__name__
@@ -741,8 +1006,15 @@ class ForwardEvaluator(Evaluator):
                     return self.semiring.result(wp, self.formula)
                 else:
                     return self.semiring.result(wp, self.formula)
+            elif not self.fsdd.is_complete(index) and isinstance(
+                self.semiring, (SemiringProbability, SemiringLogProbability)
+            ):
+                lower, upper = self.bounds(index)
+                return (
+                    self.semiring.result(lower, self.formula),
+                    self.semiring.result(upper, self.formula),
+                )
             else:
-                # TODO report correct bounds in case of evidence
                 if index < 0:
                     if -index in self._results:
                         if -index in self._complete:
@@ -84,7 +84,7 @@ except ImportError:
 
 from collections import defaultdict
 from itertools import chain
-from problog.util import init_logger
+from problog.util import init_logger, Timer
 from logging import getLogger
 from problog.engine import DefaultEngine, ground
 from problog.evaluator import SemiringLogProbability, SemiringDensity, DensityValue
@@ -992,8 +992,9 @@ class LFIProblem(LogicProgram):
     def step(self):
         self.iteration += 1
         getLogger("problog_lfi").info("\nIteration " + str(self.iteration))
-        results = self._evaluate_examples()
-        return self._update(results)
+        with Timer("Iteration", logger="problog_lfi"):
+            results = self._evaluate_examples()
+            return self._update(results)
 
     def get_model(self):
         self.output_mode = True
@@ -0,0 +1,47 @@
+from __future__ import print_function
+
+from problog.extern import problog_export_nondet
+from problog.logic import term2list, is_ground
+from problog.engine_builtin import check_mode
+from collections import OrderedDict
+
+
+@problog_export_nondet("+term", "-term", "-list")
+def aggregate_groups(solutions):
+    """Group the values of the solutions of an aggregate in a single pass.
+
+    :param solutions: list of solutions [Group, Body, Value]
+    :return: pairs of groups (in order of first occurrence) and their values
+    """
+    grouped = OrderedDict()
+    for solution in term2list(solutions, False):
+        group, _, value = term2list(solution, False)
+        grouped.setdefault(group, []).append(value)
+    return list(grouped.items())
+
+
+def _extreme(terms, functor, better, engine=None, **kwdargs):
+    check_mode((terms,), ["L"], functor=functor, **kwdargs)
+    if not is_ground(terms):
+        check_mode((terms,), ["g"], functor=functor, **kwdargs)
+    elements = term2list(terms, False)
+    if len(elements) < 2:
+        return elements
+    values = [e.compute_value(engine.functions) for e in elements]
+    if None in values:
+        return []
+    best, best_value = elements[0], values[0]
+    for e, v in zip(elements[1:], values[1:]):
+        if better(v, best_value):
+            best, best_value = e, v
+    return [best]
+
+
+@problog_export_nondet("+term", "-term", functor="min")
+def min_value(terms, **kwdargs):
+    return _extreme(terms, "min", lambda v, best: v < best, **kwdargs)
+
+
+@problog_export_nondet("+term", "-term", functor="max")
+def max_value(terms, **kwdargs):
+    return _extreme(terms, "max", lambda v, best: v >= best, **kwdargs)
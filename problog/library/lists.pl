@@ -94,30 +94,7 @@ sw(ID,PW,[W|WT],[X|XT],Y,[X|RT]) :-
     PW1 is PW-W,
     sw(ID,PW1,WT,XT,Y,RT).
 
-% S is sum of elements of list L
-sum_list(L,S) :- sum_list(L,0,S).
-sum_list([],S,S).
-sum_list([X|T],A,S) :-
-    B is A+X,
-    sum_list(T,B,S).
-    
-max_list([X|L],S) :- max_list(L,X,S).
-max_list([],S,S).
-max_list([X|L],M,S) :-
-    M > X,
-    max_list(L,M,S).
-max_list([X|L],M,S) :-
-    M =< X,
-    max_list(L,X,S).
-
-min_list([X|L],S) :- min_list(L,X,S).
-min_list([],S,S).
-min_list([X|L],M,S) :-
-    M < X,
-    min_list(L,M,S).
-min_list([X|L],M,S) :-
-    M >= X,
-    min_list(L,X,S).
+% sum_list(L,S), max_list(L,S) and min_list(L,S) are defined in lists.py.
 
 max_member([X|L],S) :- max_member(L,X,S).
 max_member([],S,S).
@@ -137,11 +114,7 @@ min_member([X|L],M,S) :-
     M @>= X,
     min_member(L,M,S).
 
-numlist(Low, Low, [Low]).
-numlist(Low, High, [Low|Rest]) :-
-    Low < High,
-    Low1 is Low + 1,
-    numlist(Low1, High, Rest).
+% numlist(Low, High, L) is defined in lists.py.
 
     
 unzip([],[],[]).
@@ -180,14 +153,30 @@ selectchk(X,[X1|XList],Y,[Y1|YList]) :-
     selectchk(X,XList,Y,YList).
 
 
-nth0(0,[X|L],X,L).
-nth0(I,[Y|L],X,[Y|R]) :-
+% nth0(I,L,X,R)
+%  Lookups in a ground list are done by nth0_ground/3,4 (defined in lists.py).
+nth0(I,L,X,R) :-
+    integer(I),
+    ground(L),
+    nth0_ground(I,L,X,R).
+nth0(I,L,X,R) :-
+    \+ (integer(I), ground(L)),
+    nth0_search(I,L,X,R).
+
+nth0_search(0,[X|L],X,L).
+nth0_search(I,[Y|L],X,[Y|R]) :-
     length(L, Len),
     between(1, Len, I),
     J is I - 1,
     nth0(J,L,X,R).
 
-nth0(I, L, X) :- nth0(I, L, X,_).
+nth0(I,L,X) :-
+    integer(I),
+    ground(L),
+    nth0_ground(I,L,X).
+nth0(I,L,X) :-
+    \+ (integer(I), ground(L)),
+    nth0_search(I,L,X,_).
 nth1(I, L, X) :- nth1(I, L, X,_).
     
 nth1(I,L,X,R) :-
@@ -1,10 +1,25 @@
 from __future__ import print_function
 
 from problog.extern import problog_export_nondet
-from problog.logic import term2list, list2term
+from problog.logic import term2list, list2term, is_ground, Constant
+from problog.engine_builtin import check_mode
 from collections import defaultdict
 
 
+def _ground_elements(terms, functor, **kwdargs):
+    """Extract the elements of a fixed list of ground terms.
+
+    :param terms: Prolog list
+    :param functor: name of the predicate (used for error messages)
+    :return: elements of the list
+    :rtype: list[Term]
+    """
+    check_mode((terms,), ["L"], functor=functor, **kwdargs)
+    if not is_ground(terms):
+        check_mode((terms,), ["g"], functor=functor, **kwdargs)
+    return term2list(terms, False)
+
+
 @problog_export_nondet("+term", "-term", "-list")
 def enum_groups(group_values):
     group_values_l = term2list(group_values, False)
@@ -26,3 +41,84 @@ def enum_groups(groups, values):
     for g, v in zip(groups_l, values_l):
         grouped[g].append(v)
     return list(grouped.items())
+
+
+@problog_export_nondet("+term", "-term")
+def sum_list(terms, engine=None, **kwdargs):
+    total = 0
+    for e in _ground_elements(terms, "sum_list", **kwdargs):
+        value = e.compute_value(engine.functions)
+        if value is None:
+            return []
+        total += value
+    return [Constant(total)]
+
+
+@problog_export_nondet("+term", "-term")
+def max_list(terms, engine=None, **kwdargs):
+    elements = _ground_elements(terms, "max_list", **kwdargs)
+    if len(elements) < 2:
+        return elements
+    values = [e.compute_value(engine.functions) for e in elements]
+    if None in values:
+        return []
+    best, best_value = elements[0], values[0]
+    for e, v in zip(elements[1:], values[1:]):
+        if best_value <= v:
+            best, best_value = e, v
+    return [best]
+
+
+@problog_export_nondet("+term", "-term")
+def min_list(terms, engine=None, **kwdargs):
+    elements = _ground_elements(terms, "min_list", **kwdargs)
+    if len(elements) < 2:
+        return elements
+    values = [e.compute_value(engine.functions) for e in elements]
+    if None in values:
+        return []
+    best, best_value = elements[0], values[0]
+    for e, v in zip(elements[1:], values[1:]):
+        if best_value >= v:
+            best, best_value = e, v
+    return [best]
+
+
+@problog_export_nondet("+term", "+term", "-list")
+def numlist(low, high, engine=None, **kwdargs):
+    check_mode((low, high), ["gg"], functor="numlist", **kwdargs)
+    result = []
+    current = low
+    high_value = high.compute_value(engine.functions)
+    while current != high:
+        value = current.compute_value(engine.functions)
+        if value is None or high_value is None or not value < high_value:
+            return []
+        result.append(current)
+        current = Constant(value + 1)
+    result.append(current)
+    return [result]
+
+
+@problog_export_nondet("+int", "+term", "-term", functor="nth0_ground")
+def nth0_ground3(index, terms):
+    try:
+        elements = term2list(terms, False)
+    except ValueError:
+        return []
+    if 0 <= index < len(elements):
+        return [elements[index]]
+    else:
+        return []
+
+
+@problog_export_nondet("+int", "+term", "-term", "-list", functor="nth0_ground")
+def nth0_ground4(index, terms):
+    try:
+        elements = term2list(terms, False)
+    except ValueError:
+        return []
+    if 0 <= index < len(elements):
+        return [(elements[index], elements[:index] + elements[index + 1 :])]
+    else:
+        return []
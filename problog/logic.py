@@ -83,6 +83,7 @@ import functools
 import math
 import sys
 import re
+import weakref
 
 
 from .util import OrderedSet
@@ -192,6 +193,26 @@ class Term(object):
     (character position in input)
     """
 
+    __slots__ = (
+        "__functor",
+        "__args",
+        "__arity",
+        "probability",
+        "location",
+        "loc",
+        "op_priority",
+        "op_spec",
+        "__signature",
+        "__hash",
+        "_cache_is_ground",
+        "_cache_list_length",
+        "_cache_variables",
+        "_interned",
+        "repr",
+        "reprhash",
+        "__weakref__",
+    )
+
     def __init__(self, functor, *args, **kwdargs):
         self.__functor = functor
         self.__args = args
@@ -205,6 +226,7 @@ class Term(object):
         self._cache_is_ground = None
         self._cache_list_length = None
         self._cache_variables = None
+        self._interned = False
         self.repr = None
         self.reprhash = None
 
@@ -219,6 +241,8 @@ class Term(object):
 
         :param value: new value
         """
+        if self._interned:
+            raise TypeError("Cannot modify the interned term '%s'." % self)
         self.__functor = value
         self.__signature = None
         self.__hash = None
@@ -660,7 +684,9 @@ class Term(object):
         return elements, current
 
     def __eq__(self, other):
-        if not isinstance(other, Term):
+        if self is other:
+            return True
+        elif not isinstance(other, Term):
             return False
         # Non-recursive version of equality check.
         l1 = deque([self])
@@ -727,6 +753,18 @@ class Term(object):
             )
         return self.__hash
 
+    def __setstate__(self, state):
+        # Copies of interned terms (e.g. after pickling) are not interned themselves.
+        if isinstance(state, tuple):
+            dict_state, slot_state = state
+        else:
+            dict_state, slot_state = state, None
+        for values in (dict_state, slot_state):
+            if values:
+                for name, value in values.items():
+                    setattr(self, name, value)
+        self._interned = False
+
     def __lshift__(self, body):
         return Clause(self, body)
 
@@ -773,6 +811,8 @@ class Term(object):
 
 
 class AggTerm(Term):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         Term.__init__(self, *args, **kwargs)
 
@@ -785,6 +825,8 @@ class Var(Term):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, name, location=None, **kwdargs):
         Term.__init__(self, name, location=location, **kwdargs)
 
@@ -819,6 +861,8 @@ class Constant(Term):
 
     """
 
+    __slots__ = ()
+
     FLOAT_PRECISION = 15
 
     def __init__(self, value, location=None, **kwdargs):
@@ -863,7 +907,7 @@ class Constant(Term):
         return type(self.value) == int
 
     def __eq__(self, other):
-        return str(self) == str(other)
+        return self is other or str(self) == str(other)
 
 
 class Object(Term):
@@ -873,6 +917,8 @@ class Object(Term):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, value, location=None, **kwdargs):
         Term.__init__(self, value, location=location, **kwdargs)
 
@@ -920,6 +966,8 @@ class Object(Term):
 class Clause(Term):
     """A clause."""
 
+    __slots__ = ("head", "body")
+
     def __init__(self, head, body, **kwdargs):
         Term.__init__(self, ":-", head, body, **kwdargs)
         self.head = head
@@ -941,6 +989,8 @@ class Clause(Term):
 class AnnotatedDisjunction(Term):
     """An annotated disjunction."""
 
+    __slots__ = ("heads", "body")
+
     def __init__(self, heads, body, **kwdargs):
         Term.__init__(self, ":-", heads, body, **kwdargs)
         self.heads = heads
@@ -962,6 +1012,8 @@ class AnnotatedDisjunction(Term):
 class Or(Term):
     """Or"""
 
+    __slots__ = ("op1", "op2")
+
     def __init__(self, op1, op2, **kwdargs):
         Term.__init__(self, ";", op1, op2, **kwdargs)
         self.op1 = op1
@@ -1021,6 +1073,8 @@ class Or(Term):
 class And(Term):
     """And"""
 
+    __slots__ = ("op1", "op2")
+
     def __init__(self, op1, op2, location=None, **kwdargs):
         Term.__init__(self, ",", op1, op2, location=location, **kwdargs)
         self.op1 = op1
@@ -1081,6 +1135,8 @@ class And(Term):
 class Not(Term):
     """Not"""
 
+    __slots__ = ("child",)
+
     def __init__(self, functor, child, location=None, **kwdargs):
         Term.__init__(self, functor, child, location=location)
         self.child = child
@@ -1183,6 +1239,64 @@ _arithmetic_functions[("pi", 0)] = lambda: math.pi
 _arithmetic_functions[("e", 0)] = lambda: math.e
 
 
+# Interned ground terms: structural key => canonical term.
+_interned_terms = weakref.WeakValueDictionary()
+
+
+def intern_term(term):
+    """Get the canonical instance of the given ground term.
+
+    Equal ground terms that are interned are the same object, which saves memory and makes \
+    equality checks between them trivial.
+    Hashes remain structural, so interned terms can be mixed with other terms.
+    The table only keeps the terms that are still in use.
+
+    Only plain ground terms (:class:`Term` and :class:`Constant`) without probability are \
+    interned; other terms are returned unchanged.
+    An interned term keeps the location of the first instance and can not be modified.
+
+    :param term: term to intern
+    :type term: Term
+    :return: canonical instance of the term
+    :rtype: Term
+    """
+    if type(term) not in (Term, Constant) or term._interned:
+        return term
+    elif term.probability is not None or not term.is_ground():
+        return term
+
+    interned = {}  # id(term) => canonical instance
+    stack = [(term, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if id(current) in interned:
+            continue
+        if current._interned or current.probability is not None:
+            interned[id(current)] = current
+            continue
+        elif type(current) is Constant:
+            key = (Constant, type(current.functor), current.functor)
+            new = current
+        elif type(current) is not Term:
+            interned[id(current)] = current
+            continue
+        elif not expanded:
+            stack.append((current, True))
+            stack.extend((arg, False) for arg in current.args)
+            continue
+        else:
+            args = [interned[id(arg)] for arg in current.args]
+            key = (Term, current.functor, tuple(map(id, args)))
+            new = current.with_args(*args)
+        canonical = _interned_terms.get(key)
+        if canonical is None:
+            canonical = new
+            canonical._interned = True
+            _interned_terms[key] = canonical
+        interned[id(current)] = canonical
+    return interned[id(term)]
+
+
 def unquote(s):
     """Strip single quotes from the string.
 
@@ -31,6 +31,8 @@ from .dd_formula import DD, build_dd, DDManager, DDEvaluator
 from .evaluator import FormulaEvaluatorNSP, SemiringLogProbability, SemiringProbability
 
 from .util import mktempfile
+from .variable_order import variable_order, ORDER_HEURISTICS
+import logging
 import os
 
 # noinspection PyBroadException
@@ -58,7 +60,14 @@ class SDD(DD):
     transform_preference = 10
 
     def __init__(
-        self, sdd_auto_gc=False, var_constraint=None, init_varcount=-1, **kwdargs
+        self,
+        sdd_auto_gc=False,
+        var_constraint=None,
+        init_varcount=-1,
+        sdd_vtree="balanced",
+        sdd_minimize=None,
+        sdd_vtree_file=None,
+        **kwdargs
     ):
         """
         Create an SDD
@@ -67,6 +76,16 @@ class SDD(DD):
         :param var_constraint: A variable ordering constraint. Currently only x_constrained namedtuple are allowed.
         :type var_constraint: x_constrained
         :param init_varcount: The amount of variables to initialize the manager with.
+        :param sdd_vtree: Strategy for the initial vtree: 'balanced' (balanced vtree in the order of the atoms), \
+            'right' (right-linear vtree in the order of the atoms), or 'minfill', 'mindegree' or 'force' \
+            (right-linear vtree in the variable order given by the heuristic, see :mod:`problog.variable_order`). \
+            Ignored when var_constraint is given.
+        :param sdd_minimize: Time limit (in seconds) of the vtree search performed after each batch of nodes \
+            during compilation (default: no minimization).
+        :type sdd_minimize: float
+        :param sdd_vtree_file: File from which the initial vtree is read (if it exists and matches the number \
+            of variables) and to which the final vtree is written after compilation.
+        :type sdd_vtree_file: str
         :param kwdargs:
         :raise InstallError: When the SDD library is not available.
         """
@@ -74,9 +93,15 @@ class SDD(DD):
             raise InstallError(
                 "The SDD library is not available. Please install the PySDD package."
             )
+        if sdd_vtree not in VTREE_STRATEGIES:
+            raise ValueError("Unknown vtree strategy '%s'." % sdd_vtree)
         self.auto_gc = sdd_auto_gc
         self._var_constraint = var_constraint
         self._init_varcount = init_varcount
+        self.vtree_strategy = sdd_vtree
+        self.minimize_time = sdd_minimize
+        self.vtree_file = sdd_vtree_file
+        self.var_order = None
         DD.__init__(self, auto_compact=False, **kwdargs)
 
     @property
@@ -107,8 +132,15 @@ class SDD(DD):
             auto_gc=self.auto_gc,
             var_constraint=self.var_constraint,
             varcount=self.init_varcount,
+            var_order=self.var_order,
+            vtree_type="balanced" if self.vtree_strategy == "balanced" else "right",
+            vtree_file=self.vtree_file,
         )
 
+    def _compile_step(self, done, total):
+        if self.minimize_time:
+            self.get_manager().minimize(self.minimize_time)
+
     def _create_evaluator(self, semiring, weights, **kwargs):
         return SDDEvaluator(self, semiring, weights, **kwargs)
 
@@ -224,7 +256,15 @@ class SDDManager(DDManager):
     It wraps around the SDD library and offers some additional methods.
     """
 
-    def __init__(self, varcount=0, auto_gc=False, var_constraint=None):
+    def __init__(
+        self,
+        varcount=0,
+        auto_gc=False,
+        var_constraint=None,
+        var_order=None,
+        vtree_type="balanced",
+        vtree_file=None,
+    ):
         """Create a new SDD manager.
 
         :param varcount: number of initial variables
@@ -233,6 +273,13 @@ class SDDManager(DDManager):
         :type auto_gc: bool
         :param var_constraint: A variable ordering constraint. Currently only x_constrained namedtuple are allowed.
         :type var_constraint: x_constrained
+        :param var_order: left-to-right order of the variables in the vtree
+        :type var_order: list[int]
+        :param vtree_type: type of the vtree when var_order is given ('balanced', 'right', 'left', ...)
+        :type vtree_type: str
+        :param vtree_file: file containing the vtree to use (ignored if it does not exist or if its number \
+            of variables differs from varcount)
+        :type vtree_file: str
         """
         DDManager.__init__(self)
         if varcount is None or varcount <= 0:
@@ -243,6 +290,19 @@ class SDDManager(DDManager):
             vtree = Vtree.new_with_X_constrained(
                 var_count=varcount, is_X_var=x_constraint, vtree_type="balanced"
             )
+        elif vtree_file is not None and os.path.exists(vtree_file):
+            vtree = Vtree.from_file(vtree_file.encode())
+            if vtree.var_count() != varcount:
+                logging.getLogger("problog").warning(
+                    "Ignoring vtree in '%s': expected %s variables, found %s."
+                    % (vtree_file, varcount, vtree.var_count())
+                )
+                vtree = None
+        if vtree is None and (var_order is not None or vtree_type != "balanced"):
+            var_order = [v for v in var_order or () if v <= varcount]
+            present = set(var_order)
+            var_order += [v for v in range(1, varcount + 1) if v not in present]
+            vtree = Vtree.new_with_var_order(varcount, var_order, vtree_type)
 
         self.__manager = sdd.SddManager(
             var_count=varcount, auto_gc_and_minimize=auto_gc, vtree=vtree
@@ -319,6 +379,42 @@ class SDDManager(DDManager):
     def is_auto_gc_and_minimize_on(self):
         return self.__manager.is_auto_gc_and_minimize_on()
 
+    def minimize(self, time_limit=None):
+        """Search for a vtree that reduces the size of the referenced SDDs.
+
+        Referenced nodes remain valid, unreferenced nodes are garbage collected.
+
+        :param time_limit: time limit of the vtree search in seconds (default: no limit)
+        :type time_limit: float
+        """
+        if time_limit is None:
+            self.__manager.minimize()
+        else:
+            self.__manager.set_vtree_search_time_limit(time_limit)
+            self.__manager.minimize_limited()
+
+    def statistics(self):
+        """Get the size of the diagrams stored in the manager.
+
+        :return: number of stored internal nodes, the size and number of all SDD nodes, \
+         and the size and number of live (referenced) SDD nodes
+        :rtype: dict
+        """
+        result = DDManager.statistics(self)
+        result["sdd_size"] = self.__manager.size()
+        result["sdd_count"] = self.__manager.count()
+        result["sdd_live_size"] = self.__manager.live_size()
+        result["sdd_live_count"] = self.__manager.live_count()
+        return result
+
+    def save_vtree(self, filename):
+        """Write the current vtree of the manager to the given file.
+
+        :param filename: name of the file
+        :type filename: str
+        """
+        self.__manager.vtree().save(filename.encode())
+
     def disjoin2(self, a, b):
         assert a is not None
         assert b is not None
@@ -875,6 +971,8 @@ class SDDManager(DDManager):
         return
 
 
+VTREE_STRATEGIES = ("balanced", "right") + ORDER_HEURISTICS
+
 x_constrained = namedtuple(
     "x_constrained", "X"
 )  # X = list of literalIDs that have to appear before the rest
@@ -921,11 +1019,7 @@ class SDDEvaluator(DDEvaluator):
 
     def _evaluate_evidence(self, recompute=False):
         if self._evidence_weight is None or recompute:
-            constraint_inode = self.formula.get_constraint_inode()
-            evidence_nodes = [self.formula.get_inode(ev) for ev in self.evidence()]
-            self.evidence_inode = self._get_manager().conjoin(
-                constraint_inode, *evidence_nodes
-            )
+            self._get_evidence_inode()
 
             pr_semiring = isinstance(
                 self.semiring, (SemiringProbability, SemiringLogProbability)
@@ -965,4 +1059,17 @@ def build_sdd(source, destination, **kwdargs):
     destination.init_varcount = (
         init_varcount if init_varcount != -1 else source.atomcount
     )
-    return build_dd(source, destination, **kwdargs)
+    if (
+        destination.vtree_strategy in ORDER_HEURISTICS
+        and destination.var_constraint is None
+        and destination.init_varcount == source.atomcount
+    ):
+        # Variables are created in the order of the atoms in the source.
+        atoms = [i for i, n, t in source if t == "atom"]
+        var_of_atom = dict((k, v) for v, k in enumerate(atoms, 1))
+        order = variable_order(source, destination.vtree_strategy)
+        destination.var_order = [var_of_atom[k] for k in order]
+    build_dd(source, destination, **kwdargs)
+    if destination.vtree_file is not None:
+        destination.get_manager().save_vtree(destination.vtree_file)
+    return destination
@@ -318,7 +318,7 @@ def build_explicit_from_logicdag(source, destination, **kwdargs):
     destination.init_varcount = init_varcount
 
     # build
-    with Timer("Compiling %s" % destination.__class__.__name__):
+    with Timer("Compiling %s" % destination.__class__.__name__) as timer:
         identifier = 0
         line_map = (
             dict()
@@ -448,6 +448,10 @@ def build_explicit_from_logicdag(source, destination, **kwdargs):
 
         destination.build_dd(root_key)
         # destination.cleanup_inodes()
+        if timer.recording:
+            timer.count(
+                nodes=len(destination), **destination.get_manager().statistics()
+            )
     return destination
 
 
@@ -463,7 +467,7 @@ def build_explicit_from_forwardsdd(source, destination, **kwdargs):
     :return: destination
     :rtype: SDDExplicit
     """
-    with Timer("Compiling %s" % destination.__class__.__name__):
+    with Timer("Compiling %s" % destination.__class__.__name__) as timer:
         ForwardInference.build_dd(source)
 
         # Make sure all atoms exist in atom2var.
@@ -515,4 +519,8 @@ def build_explicit_from_forwardsdd(source, destination, **kwdargs):
         # evidence_nodes = destination.evidence()
 
         destination.build_dd(root_key)
+        if timer.recording:
+            timer.count(
+                nodes=len(destination), **destination.get_manager().statistics()
+            )
     return destination
@@ -57,7 +57,39 @@ def run_task(argv):
     else:
         task = problog_default_task
         args = argv
-    return load_task(task).main(args)
+    args, stats_file = _extract_stats_option(args)
+    if stats_file is None:
+        return load_task(task).main(args)
+    else:
+        from problog.util import PipelineStats
+
+        stats = PipelineStats(task)
+        try:
+            with stats:
+                return load_task(task).main(args)
+        finally:
+            stats.write_json(stats_file)
+
+
+def _extract_stats_option(argv):
+    """Remove the option ``--stats-json FILE`` (available for all tasks) from the arguments.
+
+    :param argv: list of arguments for the task
+    :return: remaining arguments and the name of the statistics file (None if not given)
+    """
+    args = []
+    stats_file = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--stats-json" and i + 1 < len(argv):
+            stats_file = argv[i + 1]
+            i += 1
+        elif argv[i].startswith("--stats-json="):
+            stats_file = argv[i][len("--stats-json=") :]
+        else:
+            args.append(argv[i])
+        i += 1
+    return args, stats_file
 
 
 def load_task(name):
@@ -39,7 +39,7 @@ def main(argv, result_handler=None):
     )
     parser.add_argument(
         "--format",
-        choices=("dot", "pl", "cnf", "svg", "internal"),
+        choices=("dot", "pl", "cnf", "svg", "internal", "bin"),
         default=None,
         help="output format",
     )
@@ -93,9 +93,9 @@ def main(argv, result_handler=None):
     outformat = args.format
     outfile = sys.stdout
     if args.output:
-        outfile = open(args.output, "w")
         if outformat is None:
             outformat = os.path.splitext(args.output)[1][1:]
+        outfile = open(args.output, "wb" if outformat == "bin" else "w")
 
     if outformat == "cnf" and not args.break_cycles:
         print(
@@ -154,6 +154,11 @@ def main(argv, result_handler=None):
             )
         elif outformat == "internal":
             rc = print_result((True, str(gp)), output=outfile)
+        elif outformat == "bin":
+            if args.web:
+                raise ValueError("Binary output is not supported in web mode.")
+            gp.save(getattr(outfile, "buffer", outfile))
+            rc = 0
         else:
             rc = print_result((True, gp.to_prolog()), output=outfile)
     except Exception as err:
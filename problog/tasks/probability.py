@@ -24,6 +24,7 @@ import os
 import traceback
 
 from ..program import PrologFile, SimpleProgram
+from ..formula import LogicFormula
 from ..engine import DefaultEngine
 from ..evaluator import SemiringLogProbability, SemiringProbability, SemiringSymbolic
 from .. import get_evaluatable, get_evaluatables, library_paths
@@ -37,6 +38,7 @@ from ..util import (
     format_value,
 )
 from ..errors import process_error
+from ..cache import CompilationCache
 
 
 def print_result(d, output, debug=False, precision=8):
@@ -93,6 +95,70 @@ def print_result_json(d, output, precision=8):
     return 0
 
 
+def print_result_stream(d, output, debug=False, precision=8):
+    """Print results as JSON lines, as soon as they are computed.
+
+    Each line is an object with the keys ``query`` and ``probability``.
+    An error is reported as an object with the key ``error``.
+
+    :param d: result from run_problog (with lazily computed results)
+    :param output: output file
+    :param precision: not used (probabilities are printed in full)
+    :return: 0 on success, 1 on error
+    """
+    import json
+
+    success, d = d
+    if success:
+        try:
+            for n, p in d:
+                print(
+                    json.dumps({"query": str(n), "probability": p}, default=str),
+                    file=output,
+                )
+                output.flush()
+        except KeyboardInterrupt as err:
+            err.trace = traceback.format_exc()
+            success, d = False, err
+        except Exception as err:
+            err.trace = traceback.format_exc()
+            success, d = False, err
+    if success:
+        return 0
+    else:
+        print(json.dumps({"error": str(process_error(d, debug=debug))}), file=output)
+        output.flush()
+        return 1
+
+
+def _timed_evaluation(results):
+    """Time the evaluation of the queries as one stage.
+
+    :param results: pairs (name, value) that are computed lazily
+    :return: generator of the same pairs
+    """
+    with Timer("Evaluation") as timer:
+        queries = 0
+        for n, p in results:
+            queries += 1
+            yield n, p
+        timer.count(queries=queries)
+
+
+def _update_locations(results, model):
+    """Update location information on result terms.
+
+    :param results: pairs (name, value)
+    :param model: program the results were computed from (None for a ground program)
+    :return: generator of the same pairs
+    """
+    for n, p in results:
+        if model is not None and (not n.location or not n.location[0]):
+            # Only get location for primary file (other file information is not available).
+            n.loc = model.lineno(n.location)
+        yield n, p
+
+
 def execute(
     filename,
     knowledge=None,
@@ -100,6 +166,13 @@ def execute(
     combine=False,
     profile=False,
     trace=False,
+    compile_cache=None,
+    compile_cache_size=0,
+    stream=False,
+    profile_json=None,
+    profile_stacks=None,
+    profile_interval=0.001,
+    input_format="pl",
     **kwdargs
 ):
     """Run ProbLog.
@@ -109,13 +182,30 @@ def execute(
     :param semiring: semiring to use
     :param parse_class: prolog parser to use
     :param engine_debug: enable engine debugging output
+    :param compile_cache: directory of the compilation cache (default: no cache)
+    :param compile_cache_size: maximal size of the compilation cache in MB (0: unbounded)
+    :param stream: return a generator that computes the results of the queries one by one \
+     instead of a dictionary (errors during evaluation are raised by the generator)
+    :param profile_json: write per-predicate grounding statistics to this file (JSON)
+    :param profile_stacks: write sampled call stacks of the grounding to this file \
+     (folded format, as used by flame graph tools)
+    :param profile_interval: sampling interval of the grounding profiler (in seconds)
+    :param input_format: format of the input file: 'pl' (ProbLog program) or 'bin' (ground \
+     program written by ``problog ground --format bin``)
     :param kwdargs: additional arguments
     :return: tuple where first value indicates success, and second value contains result details
     """
 
     try:
         with Timer("Total time"):
-            if combine:
+            if input_format == "bin":
+                if kwdargs.get("web"):
+                    raise ValueError("Binary input is not supported in web mode.")
+                if combine:
+                    raise ValueError("Binary input files can not be combined.")
+                # Ground program stored with 'problog ground --format bin'
+                model = None
+            elif combine:
                 model = SimpleProgram()
                 for i, fn in enumerate(filename):
                     filemodel = PrologFile(fn)
@@ -133,21 +223,45 @@ def execute(
             else:
                 profiler = None
 
-            engine = DefaultEngine(**kwdargs)
-            db = engine.prepare(model)
-            db_semiring = db.get_data("semiring")
-            if db_semiring is not None:
-                semiring = db_semiring
+            if model is None:
+                engine = None
+                db = LogicFormula.load(filename)
+            else:
+                engine = DefaultEngine(**kwdargs)
+                db = engine.prepare(model)
+                db_semiring = db.get_data("semiring")
+                if db_semiring is not None:
+                    semiring = db_semiring
             if knowledge is None or type(knowledge) == str:
                 knowledge = get_evaluatable(knowledge, semiring=semiring)
-            formula = knowledge.create_from(db, engine=engine, database=db, **kwdargs)
-            result = formula.evaluate(semiring=semiring, **kwdargs)
-
-            # Update location information on result terms
-            for n, p in result.items():
-                if not n.location or not n.location[0]:
-                    # Only get location for primary file (other file information is not available).
-                    n.loc = model.lineno(n.location)
+            if compile_cache:
+                cache = CompilationCache(
+                    compile_cache, max_size=compile_cache_size * 1024 * 1024
+                )
+            else:
+                cache = None
+            if engine is not None and (profile_json or profile_stacks):
+                from problog.debug import EngineProfiler
+
+                with EngineProfiler(engine, profile_interval) as engine_profiler:
+                    formula = knowledge.create_from(
+                        db, engine=engine, database=db, cache=cache, **kwdargs
+                    )
+                if profile_json:
+                    engine_profiler.write_json(profile_json)
+                if profile_stacks:
+                    engine_profiler.write_stacks(profile_stacks)
+            else:
+                formula = knowledge.create_from(
+                    db, engine=engine, database=db, cache=cache, **kwdargs
+                )
+            results = _timed_evaluation(
+                formula.evaluate_iter(semiring=semiring, **kwdargs)
+            )
+            if stream:
+                result = _update_locations(results, model)
+            else:
+                result = dict(_update_locations(results, model))
             if profiler is not None:
                 if trace:
                     print(profiler.show_trace())
@@ -262,10 +376,56 @@ def argparser():
     )
     parser.add_argument(
         "--compile-timeout",
-        type=int,
+        type=float,
         default=0,
         help="Set timeout for compilation (in seconds, default=off).",
     )
+    parser.add_argument(
+        "--compile-memory",
+        type=float,
+        metavar="MB",
+        default=argparse.SUPPRESS,
+        help="Set memory limit for compilation: increase of the resident memory of the "
+        "process since compilation started (in MB, default=off).",
+    )
+    parser.add_argument(
+        "--anytime",
+        action="store_true",
+        help="Use anytime compilation (fsdd or fbdd) and report bounds for the queries "
+        "that are not completely compiled within the compilation limits.",
+    )
+    parser.add_argument(
+        "--compile-cache",
+        metavar="DIR",
+        default=None,
+        help="Reuse compiled formulae stored in this directory (default=off).",
+    )
+    parser.add_argument(
+        "--compile-cache-size",
+        metavar="MB",
+        type=int,
+        default=1024,
+        help="Maximal size of the compilation cache in MB (default=1024, 0=unbounded).",
+    )
+    parser.add_argument(
+        "--vectorize",
+        action="store_true",
+        help="Evaluate d-DNNF/NNF circuits with vectorized NumPy operations.",
+    )
+    parser.add_argument(
+        "--compact-nnf",
+        action="store_true",
+        help="Store compiled d-DNNF circuits in typed arrays (uses less memory).",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        dest="parallel",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Evaluate the queries of d-DNNF/NNF circuits with N worker processes.",
+    )
     parser.add_argument(
         "--debug",
         "-d",
@@ -284,7 +444,36 @@ def argparser():
     parser.add_argument("--profile", action="store_true", help="output runtime profile")
     parser.add_argument("--trace", action="store_true", help="output runtime trace")
     parser.add_argument("--profile-level", type=int, default=0)
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="write per-predicate grounding statistics (time, calls, cache hits) to FILE",
+    )
+    parser.add_argument(
+        "--profile-stacks",
+        metavar="FILE",
+        help="write sampled call stacks of the grounding to FILE (folded format)",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        metavar="SECONDS",
+        type=float,
+        default=0.001,
+        help="sampling interval of the grounding profiler (default: 0.001)",
+    )
     parser.add_argument("--format", choices=["text", "prolog"])
+    parser.add_argument(
+        "--input-format",
+        choices=["pl", "bin"],
+        default="pl",
+        help="format of the input files: ProbLog program (default) or ground program "
+        "written by 'ground --format bin'",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the result of each query as a JSON line as soon as it is computed.",
+    )
     parser.add_argument(
         "-L", "--library", action="append", help="Add to ProbLog library search path"
     )
@@ -318,6 +507,21 @@ def argparser():
         default=argparse.SUPPRESS,
         help="stop anytime when bounds are within this range",
     )
+    parser.add_argument(
+        "--table-size",
+        metavar="N",
+        type=int,
+        default=argparse.SUPPRESS,
+        help="maximal number of results kept in the tabling cache during grounding; "
+        "the least recently used goals are evicted (default: unbounded)",
+    )
+    parser.add_argument(
+        "--intern-terms",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="share equal ground terms in the results of the grounding "
+        "(uses less memory for programs with many repeated terms)",
+    )
     parser.add_argument(
         "--unbuffered",
         "-u",
@@ -359,6 +563,28 @@ def argparser():
         help=argparse.SUPPRESS,
     )
 
+    # SDD variable ordering
+    parser.add_argument(
+        "--sdd-vtree",
+        choices=("balanced", "right", "minfill", "mindegree", "force"),
+        default=argparse.SUPPRESS,
+        help="strategy for the initial vtree of the SDD (default: balanced)",
+    )
+    parser.add_argument(
+        "--sdd-minimize",
+        type=float,
+        metavar="SECONDS",
+        default=argparse.SUPPRESS,
+        help="minimize the vtree during SDD compilation "
+        "(time limit per search in seconds)",
+    )
+    parser.add_argument(
+        "--sdd-vtree-file",
+        metavar="FILE",
+        default=argparse.SUPPRESS,
+        help="reuse the vtree stored in this file and store the final vtree in it",
+    )
+
     return parser
 
 
@@ -373,6 +599,8 @@ def main(argv, result_handler=None):
     if result_handler is None:
         if args.web:
             result_handler = print_result_json
+        elif args.stream:
+            result_handler = lambda *a: print_result_stream(*a, debug=args.debug)
         elif args.format == "prolog":
             result_handler = lambda *a: print_result_prolog(*a, debug=args.debug)
         else:
@@ -380,6 +608,16 @@ def main(argv, result_handler=None):
 
     init_logger(args.verbose)
 
+    if args.anytime:
+        if args.koption is None:
+            args.koption = "fsdd"
+        elif args.koption not in ("fsdd", "fbdd"):
+            print(
+                "ERROR: --anytime requires knowledge compilation fsdd or fbdd.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
     if args.output is None:
         output = sys.stdout
     else:
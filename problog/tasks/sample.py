@@ -48,14 +48,22 @@ from problog.engine import DefaultEngine, UnknownClause, UnknownClauseInternal
 from problog.engine_builtin import check_mode, builtin_simple
 from problog.formula import LogicFormula
 from problog.errors import process_error, GroundingError
-from problog.util import start_timer, stop_timer, format_dictionary, init_logger
+from problog.util import (
+    start_timer,
+    stop_timer,
+    format_dictionary,
+    init_logger,
+    Timer,
+)
 from problog.engine_unify import UnifyError, unify_value
 import random
 import math
+import multiprocessing
 import signal
 import time
 import traceback
 import logging
+from collections import defaultdict, deque
 
 try:
     from tqdm import tqdm
@@ -507,6 +515,31 @@ class RateCounter(object):
         self.rate.update(1)
 
 
+def draw_sample(engine, db, evidence, ev_target, distributions=None):
+    """Generate one sample of the queries.
+
+    :param engine: engine initialized with :func:`init_engine`
+    :param db: database prepared with :func:`init_db`
+    :param evidence: evidence facts returned by :func:`init_db`
+    :param ev_target: evidence formula returned by :func:`init_db`
+    :param distributions: additional distributions for the sampled formula
+    :return: tuple of the sampled formula and whether it is consistent with the evidence
+    :rtype: tuple[SampledFormula, bool]
+    """
+    target = SampledFormula()
+    if distributions is not None:
+        target.distributions.update(distributions)
+
+    for ev_fact in evidence:
+        target.add_atom(*ev_fact)
+
+    engine.functions = FunctionStore(target=target, database=db, engine=engine)
+    result = ground(engine, db, target=target)
+    accepted = verify_evidence(engine, db, ev_target, target)
+    engine.previous_result = result
+    return result, accepted
+
+
 def sample(
     model,
     n=1,
@@ -514,8 +547,23 @@ def sample(
     propagate_evidence=False,
     distributions=None,
     progress=False,
+    jobs=None,
+    seed=None,
     **kwdargs
 ):
+    """Generate samples of the queries in the given model.
+
+    :param model: logic program
+    :param n: number of samples (0 for an infinite stream)
+    :param format: output format of the samples (``str`` or ``dict``)
+    :param propagate_evidence: enable evidence propagation
+    :param distributions: additional distributions for the sampled formula
+    :param progress: show progress
+    :param jobs: number of worker processes (default: sample in the current process)
+    :param seed: base seed of the random streams of the worker processes
+    :param kwdargs: additional options
+    :return: generator of samples
+    """
     engine = init_engine(**kwdargs)
     db, evidence, ev_target = init_db(engine, model, propagate_evidence)
     i = 0
@@ -524,34 +572,145 @@ def sample(
     if progress:
         rate = RateCounter()
 
-    try:
-        while i < n or n == 0:
-            target = SampledFormula()
-            if distributions is not None:
-                target.distributions.update(distributions)
-
-            for ev_fact in evidence:
-                target.add_atom(*ev_fact)
-
-            engine.functions = FunctionStore(target=target, database=db, engine=engine)
-            result = ground(engine, db, target=target)
-            if verify_evidence(engine, db, ev_target, target):
-                if format == "str":
-                    yield result.to_string(db, **kwdargs)
+    if jobs is not None and jobs > 1:
+        state = (engine, db, evidence, ev_target, distributions, format, kwdargs)
+        try:
+            for samples, rejected in _run_parallel(
+                _sample_task, state, n, jobs, seed
+            ):
+                r += rejected
+                for s in samples:
+                    yield s
+                    if progress:
+                        rate.update()
+        except KeyboardInterrupt:
+            pass
+    else:
+        try:
+            while i < n or n == 0:
+                result, accepted = draw_sample(
+                    engine, db, evidence, ev_target, distributions
+                )
+                if accepted:
+                    if format == "str":
+                        yield result.to_string(db, **kwdargs)
+                    else:
+                        yield result.to_dict()
+                    i += 1
                 else:
-                    yield result.to_dict()
-                i += 1
-            else:
-                r += 1
-            engine.previous_result = result
-            if progress:
-                rate.update()
-    except KeyboardInterrupt:
-        pass
+                    r += 1
+                if progress:
+                    rate.update()
+        except KeyboardInterrupt:
+            pass
     if r:
         logging.getLogger("problog_sample").info("Rejected samples: %s" % r)
 
 
+# Number of samples generated by one task of a worker process.
+PARALLEL_BATCH_SIZE = 100
+
+# State of the sampler in a worker process.
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+    # Interrupts are handled by the parent process.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _seed_task(seed, task):
+    """Seed the random generators for the given task.
+
+    The random stream only depends on the base seed and the index of the task, such that the \
+    results are reproducible regardless of the number of worker processes.
+    """
+    random.seed("%s:%s" % (seed, task))
+    try:
+        import numpy.random
+
+        numpy.random.seed(random.getrandbits(32))
+    except ImportError:
+        pass
+
+
+def _sample_task(task, seed, size):
+    engine, db, evidence, ev_target, distributions, format, kwdargs = _worker_state
+    _seed_task(seed, task)
+    engine.previous_result = None
+    samples = []
+    rejected = 0
+    while len(samples) < size:
+        result, accepted = draw_sample(engine, db, evidence, ev_target, distributions)
+        if accepted:
+            if format == "str":
+                samples.append(result.to_string(db, **kwdargs))
+            else:
+                samples.append(result.to_dict())
+        else:
+            rejected += 1
+    return samples, rejected
+
+
+def _estimate_task(task, seed, size):
+    engine, db, evidence, ev_target = _worker_state
+    _seed_task(seed, task)
+    engine.previous_result = None
+    estimates = defaultdict(float)
+    counts = 0
+    rejected = 0
+    while counts < size:
+        result, accepted = draw_sample(engine, db, evidence, ev_target)
+        if accepted:
+            for k, v in result.queries():
+                if v == 0:
+                    estimates[k] += 1.0
+            counts += 1
+        else:
+            rejected += 1
+    return dict(estimates), counts, rejected
+
+
+def _run_parallel(func, state, n, jobs, seed):
+    """Distribute the generation of samples over a pool of worker processes.
+
+    The (prepared) database is transferred to each worker only once, when the worker starts.
+    Samples are generated in tasks of :data:`PARALLEL_BATCH_SIZE` samples, each with its own \
+    random stream derived from the base seed.
+    The results of the tasks are returned in order.
+
+    :param func: task function called as ``func(task, seed, size)`` in the worker
+    :param state: state of the sampler passed to the workers
+    :param n: total number of samples (0 for an infinite stream)
+    :param jobs: number of worker processes
+    :param seed: base seed (default: random)
+    :return: generator of the task results
+    """
+    if seed is None:
+        seed = random.random()
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(state,))
+    try:
+        pending = deque()
+        task = 0
+        remaining = n
+        while True:
+            while len(pending) < 2 * jobs and (n == 0 or remaining > 0):
+                size = PARALLEL_BATCH_SIZE
+                if n != 0:
+                    size = min(remaining, size)
+                pending.append(pool.apply_async(func, (task, seed, size)))
+                task += 1
+                remaining -= size
+            if not pending:
+                break
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def verify_evidence(engine, db, ev_target, q_target):
 
     if ev_target is None:
@@ -641,9 +800,7 @@ def verify_evidence(engine, db, ev_target, q_target):
 
 
 # noinspection PyUnusedLocal
-def estimate(model, n=0, propagate_evidence=False, **kwdargs):
-    from collections import defaultdict
-
+def estimate(model, n=0, propagate_evidence=False, jobs=None, seed=None, **kwdargs):
     engine = init_engine(**kwdargs)
     db, evidence, ev_target = init_db(engine, model, propagate_evidence)
 
@@ -652,20 +809,25 @@ def estimate(model, n=0, propagate_evidence=False, **kwdargs):
     counts = 0.0
     r = 0
     try:
-        while n == 0 or counts < n:
-            target = SampledFormula()
-            for ev_fact in evidence:
-                target.add_atom(*ev_fact)
-
-            result = ground(engine, db, target=target)
-            if verify_evidence(engine, db, ev_target, target):
-                for k, v in result.queries():
-                    if v == 0:
-                        estimates[k] += 1.0
-                counts += 1.0
-            else:
-                r += 1
-            engine.previous_result = result
+        if jobs is not None and jobs > 1:
+            state = (engine, db, evidence, ev_target)
+            for task_estimates, task_counts, rejected in _run_parallel(
+                _estimate_task, state, n, jobs, seed
+            ):
+                for k, v in task_estimates.items():
+                    estimates[k] += v
+                counts += task_counts
+                r += rejected
+        else:
+            while n == 0 or counts < n:
+                result, accepted = draw_sample(engine, db, evidence, ev_target)
+                if accepted:
+                    for k, v in result.queries():
+                        if v == 0:
+                            estimates[k] += 1.0
+                    counts += 1.0
+                else:
+                    r += 1
     except KeyboardInterrupt:
         pass
     except SystemExit:
@@ -796,6 +958,14 @@ def main(args, result_handler=None):
         help="Pass additional arguments to the cmd_args builtin.",
     )
     parser.add_argument("--progress", help="show progress", action="store_true")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        metavar="N",
+        default=None,
+        help="Generate samples with N worker processes.",
+    )
 
     args = parser.parse_args(args)
 
@@ -807,6 +977,7 @@ def main(args, result_handler=None):
         seed = random.random()
         logging.getLogger("problog_sample").debug("Seed: %s", seed)
         random.seed(seed)
+        args.seed = seed
 
     pl = PrologFile(args.filename)
 
@@ -831,15 +1002,16 @@ def main(args, result_handler=None):
         outformat = "str"
         result_handler = print_result
     try:
-        if args.estimate:
-            results = estimate(pl, **vars(args))
-            print(format_dictionary(results))
-        else:
-            result_handler(
-                (True, sample(pl, format=outformat, **vars(args))),
-                output=outf,
-                oneline=args.oneline,
-            )
+        with Timer("Sampling"):
+            if args.estimate:
+                results = estimate(pl, **vars(args))
+                print(format_dictionary(results))
+            else:
+                result_handler(
+                    (True, sample(pl, format=outformat, **vars(args))),
+                    output=outf,
+                    oneline=args.oneline,
+                )
     except Exception as err:
         trace = traceback.format_exc()
         err.trace = trace
@@ -114,6 +114,107 @@ class TestEngine(unittest.TestCase):
         r3 = DefaultEngine().query(pl, Term("a", Term("x"), None, Term("g", Term("z"))))
         self.assertCollectionEqual(r3, [])
 
+    def test_clause_index(self):
+        """Clause lookup on bound arguments"""
+
+        program = """
+            edge(1, 2).
+            edge(X, 3) :- edge(1, X).
+            edge(1, 3).
+            edge(2, 3).
+            edge(1, Y) :- edge(Y, 3).
+        """
+        db = DefaultEngine().prepare(PrologString(program))
+        index = db.get_node(db.find(Term("edge", None, None))).children
+        clauses = list(index)
+
+        def find(*arguments):
+            return [clauses.index(c) for c in index.find(arguments)]
+
+        one, two, three, four = Constant(1), Constant(2), Constant(3), Constant(4)
+        self.assertEqual([0, 1, 2, 3, 4], find(None, None))
+        self.assertEqual([0, 1, 2, 4], find(one, None))
+        self.assertEqual([1, 2, 4], find(one, three))
+        self.assertEqual([4], find(one, four))
+        self.assertEqual([], find(four, four))
+
+        # Composite index on both arguments
+        index.composite_threshold = 0
+        self.assertEqual([1, 2, 4], find(one, three))
+        self.assertEqual([1, 3], find(two, three))
+        self.assertEqual([], find(four, four))
+
+        index.erase(index.find((one, three)))
+        self.assertEqual([0], find(one, None))
+        self.assertEqual([3], find(None, three))
+        self.assertEqual([0, 3], find(None, None))
+
+    def test_grounding_session(self):
+        """Incremental grounding of queries and evidence"""
+
+        program = """
+            0.5::edge(1, 2). 0.6::edge(2, 3). 0.7::edge(1, 3). 0.8::edge(3, 4).
+            path(X, Y) :- edge(X, Y).
+            path(X, Y) :- edge(X, Z), path(Z, Y).
+            query(path(1, 4)).
+            query(path(2, 4)).
+            evidence(edge(1, 2), true).
+        """
+        pl = PrologString(program)
+        engine = DefaultEngine()
+        expected = engine.ground_all(pl)
+
+        session = engine.create_session(pl)
+        session.add_query(Term("path", Constant(1), Constant(4)))
+        session.add_evidence(Term("edge", Constant(1), Constant(2)))
+        session.add_query(Term("path", Constant(2), Constant(4)))
+        # Everything is already grounded
+        session.ground_all()
+        result = session.target
+
+        self.assertEqual(len(expected), len(result))
+        self.assertCollectionEqual(
+            [(str(q), n) for q, n in expected.queries()],
+            [(str(q), n) for q, n in result.queries()],
+        )
+        self.assertCollectionEqual(
+            [(str(q), n) for q, n in expected.evidence()],
+            [(str(q), n) for q, n in result.evidence()],
+        )
+        self.assertTrue(
+            session.is_grounded(
+                Term("edge", Constant(1), Constant(2)), result.LABEL_EVIDENCE_POS
+            )
+        )
+
+    def test_grounding_session_update(self):
+        """Incremental grounding after adding and retracting facts"""
+
+        program = """
+            0.5::edge(1, 2). 0.6::edge(2, 3).
+            path(X, Y) :- edge(X, Y).
+            path(X, Y) :- edge(X, Z), path(Z, Y).
+            0.3::q.
+            query(path(1, _)).
+            query(q).
+        """
+        session = DefaultEngine().create_session(PrologString(program))
+        session.ground_all()
+        q_node = session.target.get_node_by_name(Term("q"))
+
+        session.add_clause(Term("edge", Constant(3), Constant(4), p=Constant(0.8)))
+        self.assertCollectionEqual(
+            ["path(1,2)", "path(1,3)", "path(1,4)", "q"],
+            [str(q) for q, n in session.target.queries()],
+        )
+        # Queries that do not depend on edge/2 are not grounded again.
+        self.assertEqual(q_node, session.target.get_node_by_name(Term("q")))
+
+        self.assertEqual(1, session.retract(Term("edge", Constant(2), Constant(3))))
+        self.assertCollectionEqual(
+            ["path(1,2)", "q"], [str(q) for q, n in session.target.queries()]
+        )
+
 
 class TestEngineCycles(unittest.TestCase):
     def setUp(self):
@@ -163,6 +264,155 @@ class TestEngineCycles(unittest.TestCase):
         except AttributeError:
             self.assertCollectionEqual = self.assertCountEqual
 
+    def test_table_size(self):
+        """Grounding with a bounded tabling cache"""
+
+        program = """
+            0.5::edge(1, 2). 0.6::edge(2, 3). 0.7::edge(1, 3). 0.8::edge(3, 4).
+            0.4::edge(4, 1). 0.3::edge(2, 4).
+            path(X, Y) :- edge(X, Y).
+            path(X, Y) :- edge(X, Z), path(Z, Y).
+            reach(X) :- path(1, X).
+            query(path(1, 4)).
+            query(reach(_)).
+        """
+        from problog import get_evaluatable
+
+        engine = DefaultEngine()
+        expected = get_evaluatable("ddnnf").create_from(
+            engine.ground_all(PrologString(program))
+        )
+        expected = expected.evaluate()
+        self.assertEqual(0, engine.table_stats["evictions"])
+        self.assertEqual(engine.table_stats["size"], engine.table_stats["peak"])
+
+        for size in (1, 2, 5):
+            engine = DefaultEngine(table_size=size)
+            result = get_evaluatable("ddnnf").create_from(
+                engine.ground_all(PrologString(program))
+            )
+            result = result.evaluate()
+            self.assertEqual(set(expected), set(result))
+            for q in expected:
+                self.assertAlmostEqual(expected[q], result[q])
+            stats = engine.table_stats
+            self.assertGreater(stats["evictions"], 0)
+            self.assertGreater(stats["hits"] + stats["misses"], 0)
+
+        # Without a bound, the size is tracked without recording the individual entries.
+        from problog.engine_stack import DefineCache
+
+        cache = DefineCache(set())
+        goal = ("p", (None,))
+        cache.store(goal, {(Constant(1),): 1, (Constant(2),): 2})
+        self.assertEqual(4, cache.size)  # p(_) and its two ground results
+        cache.store(goal, {(Constant(1),): 1, (Constant(2),): 2, (Constant(3),): 3})
+        self.assertEqual(6, cache.size)
+        del cache[("p", (Constant(1),))]
+        self.assertEqual(5, cache.size)
+        cache.invalidate([("p", 1)])
+        self.assertEqual(0, cache.size)
+        self.assertEqual(6, cache.stats["peak"])
+
+    def test_call_key(self):
+        """Canonical keys of calls in the tabling cache"""
+        from problog.engine_stack import CallKey, DefineCache
+
+        a, b = Constant("a"), Constant("b")
+        key = CallKey("p", [a, Term("f", 0), None])
+        variant = CallKey("p", [a, Term("f", 3), None])
+        self.assertFalse(key.ground)
+        self.assertEqual(key, variant)
+        self.assertEqual(hash(key), hash(variant))
+        self.assertNotEqual(key, CallKey("p", [b, Term("f", 0), None]))
+        self.assertNotEqual(key, CallKey("q", [a, Term("f", 0), None]))
+        self.assertTrue(CallKey("p", [a, b]).ground)
+
+        cache = DefineCache(set())
+        cache[("p", [a, Term("f", 0), None])] = {(a, Term("f", b), b): 1}
+        self.assertIn(variant, cache)
+        self.assertEqual([((a, Term("f", b), b), 1)], list(cache.get(variant)))
+        # Ground results are also stored separately.
+        ground = [a, Term("f", b), b]
+        self.assertEqual([(ground, 1)], cache[("p", ground)])
+        cache.invalidate([("p", 3)])
+        self.assertNotIn(variant, cache)
+        self.assertEqual(0, cache.size)
+
+    def test_intern_terms(self):
+        """Grounding with interned result terms"""
+
+        program = """
+            0.5::edge(a, f(b)). 0.6::edge(f(b), c). 0.7::edge(a, c). 0.8::edge(c, a).
+            path(X, Y) :- edge(X, Y).
+            path(X, Y) :- edge(X, Z), path(Z, Y).
+            query(path(a, _)).
+        """
+        expected = DefaultEngine().ground_all(PrologString(program))
+        result = DefaultEngine(intern_terms=True).ground_all(PrologString(program))
+        self.assertEqual(str(expected), str(result))
+        queries = dict(result.queries())
+        self.assertEqual(dict(expected.queries()), queries)
+        for q in queries:
+            for arg in q.args:
+                self.assertTrue(arg._interned)
+
+    def test_subquery_cache(self):
+        """Variants of a subquery are grounded and compiled once"""
+
+        program = """
+            0.5::a. 0.4::b(1). 0.7::b(2).
+            item(1). item(2).
+            p(I, P) :- item(I), subquery(a, P).
+            q(I, P) :- item(I), subquery(b(_), P).
+            r(I, P) :- item(I), subquery(a, P, [b(I)]).
+            query(p(_, _)).
+            query(q(_, _)).
+            query(r(_, _)).
+        """
+        engine = DefaultEngine()
+        target = engine.ground_all(PrologString(program))
+        queries = {str(q): n for q, n in target.queries()}
+        self.assertEqual({"p(1,0.5)", "p(2,0.5)"}, {q for q in queries if q[0] == "p"})
+        self.assertIn("q(2,0.7)", queries)
+        self.assertIn("r(2,0.5)", queries)
+        # a, b(_) and a given b(1) and b(2)
+        self.assertEqual(4, len(target._cache.subqueries))
+
+        engine = DefaultEngine(koption="ddnnf")
+        self.assertEqual("ddnnf", engine.subquery_knowledge)
+        result = engine.ground_all(PrologString(program))
+        self.assertEqual(set(queries), {str(q) for q, n in result.queries()})
+
+    def test_profiler(self):
+        """The profiler counts calls, cache hits and solutions per predicate"""
+        from problog.debug import EngineProfiler
+
+        program = """
+            e(1,2). e(2,3). e(1,3).
+            p(X,Y) :- e(X,Y).
+            p(X,Y) :- e(X,Z), p(Z,Y).
+            query(p(1,_)).
+        """
+        engine = DefaultEngine()
+        db = engine.prepare(PrologString(program))
+        with EngineProfiler(engine) as profiler:
+            self.assertIs(profiler, engine.profiler)
+            engine.ground_all(db)
+        self.assertIsNone(engine.profiler)
+
+        stats = profiler.to_dict()["predicates"]
+        # p(1,_), p(2,_) and p(3,_)
+        self.assertEqual(3, stats["p/2"]["instances"])
+        self.assertEqual(3, stats["p/2"]["results"])
+        self.assertEqual(
+            stats["e/2"]["calls"], stats["e/2"]["hits"] + stats["e/2"]["misses"]
+        )
+        self.assertEqual(1, stats["query/1"]["calls"])
+
+        profiler.stacks["query/1;p/2"] += 0.0025
+        self.assertIn("query/1;p/2 2500", profiler.folded_stacks())
+
     def test_cycle_goodcode(self):
         N = 20
         program = self.program_v1[:]
@@ -1,7 +1,9 @@
+import pickle
 import unittest
 
 import problog
-from problog.logic import Clause, Term
+
+from problog.logic import Clause, Term, Constant, Var, intern_term
 
 
 class TestEquality(unittest.TestCase):
@@ -12,3 +14,28 @@ class TestEquality(unittest.TestCase):
         self.assertTrue(c2 == c3)
         self.assertFalse(c1 == c2)
         self.assertFalse(c1 == c3)
+
+    def test_interned_terms(self):
+        t1 = Term("f", Constant(1), Term("g", Constant("a")))
+        t2 = Term("f", Constant(1), Term("g", Constant("a")))
+        i1, i2 = intern_term(t1), intern_term(t2)
+        self.assertIs(i1, i2)
+        self.assertIs(i1.args[1], i2.args[1])
+        self.assertEqual(t2, i1)
+        self.assertEqual(hash(t2), hash(i1))
+        # Constants of different types are different terms.
+        self.assertIsNot(
+            intern_term(Term("f", Constant(1))), intern_term(Term("f", Constant(1.0)))
+        )
+        # Non-ground terms and terms with a probability are not interned.
+        t3 = Term("f", Var("X"))
+        self.assertIs(t3, intern_term(t3))
+        t4 = Term("f", Constant(1), p=Constant(0.5))
+        self.assertIs(t4, intern_term(t4))
+        # Interned terms can not be modified, but their copies are not interned.
+        with self.assertRaises(TypeError):
+            i1.functor = "h"
+        copy = pickle.loads(pickle.dumps(i1))
+        self.assertEqual(i1, copy)
+        self.assertIsNot(i1, copy)
+        copy.functor = "h"
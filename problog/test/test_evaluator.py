@@ -15,13 +15,17 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import itertools
+import tempfile
 import unittest
 
 from problog.program import PrologString
 from problog.formula import LogicFormula
 from problog import get_evaluatable
-from problog.evaluator import SemiringProbability
-from problog.logic import Term
+from problog.evaluator import SemiringProbability, SemiringLogProbability
+from problog.logic import Term, Constant
+from problog.cache import CompilationCache
+from problog.bdd_formula import BDD
 
 # noinspection PyBroadException
 from problog.test.test_system import SemiringProbabilityNSPCopy
@@ -115,6 +119,405 @@ class TestEvaluator(unittest.TestCase):
         )
         self.assertEqual(0.06, results)
 
+    def test_evaluate_batch(self):
+        """
+        Tests evaluate_batch() against evaluate() with custom weights
+        """
+        names = list(evaluatables)
+        if BDD.is_available():
+            names.append("bdd")
+        for eval_name in names:
+            if eval_name == "fsdd":
+                # Forward compilation only reports bounds on re-evaluation.
+                continue
+            for semiring in (SemiringLogProbability(), SemiringProbability()):
+                with self.subTest(eval_name=eval_name, semiring=semiring):
+                    self.evaluate_batch(eval_name, semiring)
+
+    def evaluate_batch(self, eval_name, semiring):
+        program = """
+                    0.3::a. 0.4::b.
+                    0.2::d; 0.3::e.
+                    c :- a.
+                    c :- b, \\+d.
+                    query(c).
+                    query(d).
+                    evidence(e, false).
+                """
+        pl = PrologString(program)
+        kc = get_evaluatable(name=eval_name).create_from(pl)
+        columns = {kc.get_name(key): c for c, key in kc.get_weight_columns().items()}
+        size = max(columns.values()) + 1
+        queries = [name for name, node, label in kc.labeled()]
+
+        batch = []
+        for pa, pd in ((0.3, 0.2), (0.5, 0.1), (0.9, 0.6)):
+            row = [None] * size
+            row[columns[Term("a")]] = pa
+            row[columns[Term("d")]] = pd
+            batch.append(row)
+
+        results = kc.evaluate_batch(batch, semiring=semiring)
+        self.assertEqual(len(batch), len(results))
+        for row, result in zip(batch, results):
+            weights = {Term("a"): row[columns[Term("a")]], Term("d"): row[columns[Term("d")]]}
+            expected = kc.evaluate(semiring=semiring, weights=weights)
+            for q, r in zip(queries, result):
+                self.assertAlmostEqual(expected[q], r)
+
+    def test_compilation_cache(self):
+        """
+        Tests reuse of compiled formulae through the compilation cache
+        """
+        for eval_name in ["ddnnf", "sdd"] if has_sdd else ["ddnnf"]:
+            with self.subTest(eval_name=eval_name):
+                self.compilation_cache(eval_name)
+
+    def compilation_cache(self, eval_name):
+        program = """
+                    %s::a. 0.4::b.
+                    c :- a.
+                    c :- b.
+                    query(c).
+                """
+        kc_class = get_evaluatable(name=eval_name)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompilationCache(directory)
+            for p in (0.5, 0.5, 0.25):
+                pl = PrologString(program % p)
+                results = kc_class.create_from(pl, cache=cache).evaluate()
+                self.assertAlmostEqual(1 - (1 - p) * 0.6, results[Term("c")])
+            self.assertEqual(1, cache.misses)
+            self.assertEqual(2, cache.hits)
+
+    def test_incremental_compilation(self):
+        """
+        Tests updating a compiled SDD after adding and retracting facts
+        """
+        if not has_sdd:
+            return
+        from problog.engine import DefaultEngine
+        from problog.formula import LogicDAG
+        from problog.sdd_formula import SDD
+
+        program = """
+                    0.5::edge(1, 2). 0.6::edge(2, 3). 0.7::edge(1, 3).
+                    path(X, Y) :- edge(X, Y).
+                    path(X, Y) :- edge(X, Z), path(Z, Y).
+                    query(path(1, _)).
+                    evidence(edge(1, 2)).
+                """
+        session = DefaultEngine().create_session(PrologString(program))
+        sdd = SDD.create_from(LogicDAG.create_from(session.ground_all()))
+        manager = sdd.get_manager()
+
+        session.add_clause(Term("edge", Constant(3), Constant(4), p=Constant(0.8)))
+        session.retract(Term("edge", Constant(1), Constant(3)))
+        sdd.update(LogicDAG.create_from(session.target))
+        self.assertIs(manager, sdd.get_manager())
+
+        program = program.replace("0.7::edge(1, 3).", "0.8::edge(3, 4).")
+        expected = SDD.create_from(PrologString(program)).evaluate()
+        results = sdd.evaluate()
+        self.assertEqual(set(expected), set(results))
+        for q in expected:
+            self.assertAlmostEqual(expected[q], results[q])
+
+    def test_compile_deep_formula(self):
+        """
+        Tests compiling a formula that is deeper than the recursion limit into an SDD
+        """
+        if not has_sdd:
+            return
+        import sys
+        from problog.formula import LogicDAG
+        from problog.sdd_formula import SDD
+
+        formula = LogicDAG()
+        a = formula.add_atom(Term("a"), 0.3)
+        b = formula.add_atom(Term("b"), 0.6)
+        node = a
+        for i in range(sys.getrecursionlimit()):
+            node = formula.add_or(
+                [formula.add_and([node, b]), formula.add_and([node, -b])]
+            )
+        formula.add_query(Term("q"), node)
+        formula.add_query(Term("r"), formula.add_and([-node, b]))
+
+        progress = []
+        sdd = SDD.create_from(formula, progress=lambda d, t: progress.append((d, t)))
+        results = sdd.evaluate()
+        self.assertAlmostEqual(0.3, results[Term("q")])
+        self.assertAlmostEqual(0.42, results[Term("r")])
+        self.assertEqual(progress[-1][0], progress[-1][1])
+        # Only the internal nodes of the queries are kept.
+        self.assertEqual(2, sum(n is not None for n in sdd.get_manager().nodes))
+
+    def test_forward_bounds(self):
+        """
+        Tests the bounds reported by forward compilation when it is interrupted by its budget
+        """
+        if not has_sdd:
+            return
+        from problog import forward
+        from problog.forward import ForwardSDD
+        from problog.sdd_formula import SDD
+
+        edges = [(0, 1), (1, 2), (2, 0), (0, 2), (2, 3), (3, 1), (1, 4), (4, 0), (3, 4)]
+        edges += [(4, 5), (5, 3), (5, 6), (6, 2), (6, 4), (0, 6), (3, 6)]
+        program = "".join("0.3::e(%s, %s).\n" % e for e in edges)
+        program += """
+                    p(X, Y) :- e(X, Y).
+                    p(X, Y) :- e(X, Z), p(Z, Y).
+                    q :- \\+p(3, 0).
+                    query(p(0, 5)).
+                    query(q).
+                    evidence(e(0, 1)).
+                """
+        formula = LogicFormula.create_from(PrologString(program))
+        expected = SDD.create_from(formula).evaluate()
+
+        # The memory budget is checked after a fixed number of node updates, against the \
+        # increase of the memory usage since the start of the compilation.
+        usage = forward._memory_usage
+        try:
+            forward._memory_usage = itertools.count(1000).__next__
+            results = ForwardSDD.create_from(formula, compile_memory=0.5).evaluate()
+            self.assertEqual(set(expected), set(results))
+            for q in expected:
+                self.assertIsInstance(results[q], tuple)
+                lower, upper = results[q]
+                self.assertLessEqual(lower, expected[q] + 1e-9)
+                self.assertGreaterEqual(upper, expected[q] - 1e-9)
+
+            # Memory used before the compilation does not count.
+            forward._memory_usage = lambda: 1000.0
+            results = ForwardSDD.create_from(formula, compile_memory=0.5).evaluate()
+            for q in expected:
+                self.assertAlmostEqual(expected[q], results[q])
+        finally:
+            forward._memory_usage = usage
+
+        results = ForwardSDD.create_from(formula).evaluate()
+        for q in expected:
+            self.assertAlmostEqual(expected[q], results[q])
+
+    def test_forward_interrupted_early(self):
+        """
+        Tests forward compilation that is interrupted before it starts, with SDDs and BDDs
+        """
+        from problog.forward import ForwardSDD, ForwardBDD
+
+        program = """
+                    0.3::e(1, 2). 0.4::e(2, 3). 0.5::e(1, 3). 0.6::e(3, 1).
+                    p(X, Y) :- e(X, Y).
+                    p(X, Y) :- e(X, Z), p(Z, Y).
+                    query(p(1, _)).
+                    evidence(e(1, 2)).
+                """
+        formula = LogicFormula.create_from(PrologString(program))
+        classes = []
+        if has_sdd:
+            classes.append(ForwardSDD)
+        if BDD.is_available():
+            classes.append(ForwardBDD)
+        for cls in classes:
+            with self.subTest(cls=cls.__name__):
+                # The timer expires during the initialization of the compilation.
+                results = cls.create_from(formula, compile_timeout=1e-6).evaluate()
+                self.assertEqual(3, len(results))
+                for q in results:
+                    self.assertEqual((0.0, 1.0), results[q])
+
+                results = cls.create_from(formula).evaluate()
+                for q, p in get_evaluatable("ddnnf").create_from(formula).evaluate().items():
+                    self.assertAlmostEqual(p, results[q])
+
+    def test_sdd_vtree_strategies(self):
+        """
+        Tests compiling SDDs with different vtree strategies, minimization and a stored vtree
+        """
+        if not has_sdd:
+            return
+        import os
+        import shutil
+        from problog.formula import LogicDAG
+        from problog.sdd_formula import SDD, VTREE_STRATEGIES
+
+        program = """
+                    0.5::edge(1, 2). 0.6::edge(2, 3). 0.7::edge(1, 3).
+                    0.2::edge(3, 4). 0.9::edge(2, 4). 0.4::edge(4, 5).
+                    path(X, Y) :- edge(X, Y).
+                    path(X, Y) :- edge(X, Z), path(Z, Y).
+                    query(path(1, _)).
+                    evidence(edge(1, 2)).
+                """
+        formula = LogicDAG.create_from(PrologString(program))
+        expected = SDD.create_from(formula).evaluate()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            vtree_file = os.path.join(tmpdir, "model.vtree")
+            settings = [{"sdd_vtree": strategy} for strategy in VTREE_STRATEGIES]
+            settings.append({"sdd_minimize": 1.0, "sdd_vtree_file": vtree_file})
+            settings.append({"sdd_vtree_file": vtree_file})
+            for kwargs in settings:
+                with self.subTest(**kwargs):
+                    results = SDD.create_from(formula, **kwargs).evaluate()
+                    self.assertEqual(set(expected), set(results))
+                    for q in expected:
+                        self.assertAlmostEqual(expected[q], results[q])
+                    if "sdd_vtree_file" in kwargs:
+                        self.assertTrue(os.path.exists(vtree_file))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_evaluate_derivatives(self):
+        """
+        Tests computing all marginals of a d-DNNF with a single derivative pass
+        """
+
+        class SemiringProbabilityNoDerivatives(SemiringProbability):
+            def is_commutative(self):
+                return False
+
+        program = """
+                    0.3::a. 0.4::b. 0.0::x.
+                    0.2::d; 0.3::e.
+                    c :- a.
+                    c :- b, \\+d.
+                    f :- x, a.
+                    query(c).
+                    query(d).
+                    query(\\+b).
+                    query(f).
+                    evidence(e, false).
+                """
+        kc = get_evaluatable(name="ddnnf").create_from(PrologString(program))
+        expected = kc.evaluate(semiring=SemiringProbabilityNoDerivatives())
+        results = kc.evaluate(semiring=SemiringProbability())
+        self.assertEqual(set(expected), set(results))
+        for q in expected:
+            self.assertAlmostEqual(expected[q], results[q])
+
+    def test_evaluate_vectorized(self):
+        """
+        Tests vectorized circuit evaluation against the default evaluator
+        """
+        program = """
+                    0.3::a. 0.4::b.
+                    0.2::d; 0.3::e.
+                    c :- a.
+                    c :- b, \\+d.
+                    query(c).
+                    query(d).
+                    query(a).
+                    evidence(e, false).
+                """
+        kc = get_evaluatable(name="ddnnf").create_from(PrologString(program))
+        for semiring in (SemiringProbability(), SemiringLogProbability()):
+            with self.subTest(semiring=semiring):
+                expected = kc.evaluate(semiring=semiring)
+                results = kc.evaluate(semiring=semiring, vectorize=True)
+                self.assertEqual(set(expected), set(results))
+                for q in expected:
+                    self.assertAlmostEqual(expected[q], results[q])
+
+    def test_bdd_wmc(self):
+        """
+        Tests the flattened weighted model count of BDDs against SDDs
+        """
+        from problog.bdd_formula import BDD
+
+        if not BDD.is_available():
+            self.skipTest("pyeda is not available")
+        program = """
+                    0.3::a. 0.4::b. 0.6::f.
+                    0.2::d; 0.3::e.
+                    c :- a, f.
+                    c :- b, \\+d.
+                    g :- \\+c, f.
+                    query(c).
+                    query(d).
+                    query(g).
+                    evidence(e, false).
+                """
+        expected = get_evaluatable(name="ddnnf").create_from(PrologString(program))
+        bdd = BDD.create_from(PrologString(program))
+        for semiring in (SemiringProbability(), SemiringLogProbability()):
+            with self.subTest(semiring=type(semiring).__name__):
+                results = bdd.evaluate(semiring=semiring)
+                expected_results = expected.evaluate(semiring=semiring)
+                self.assertEqual(set(expected_results), set(results))
+                for q in expected_results:
+                    self.assertAlmostEqual(expected_results[q], results[q])
+
+        # The NumPy sweep and the generic sweep agree.
+        evaluator = bdd.get_evaluator(semiring=SemiringProbability())
+        manager = bdd.get_manager()
+        weights = evaluator.weights
+        semiring = SemiringProbability()
+        for index in bdd.labeled():
+            node = bdd.get_inode(index[1])
+            flat = manager.get_flat(node)
+            self.assertIs(flat, manager.get_flat(node))
+            self.assertAlmostEqual(
+                flat.wmc(weights, semiring), flat._wmc_python(weights, semiring)
+            )
+
+    def test_evaluate_parallel(self):
+        """
+        Tests evaluating the queries with a pool of worker processes
+        """
+        program = """
+                    0.3::a. 0.4::b.
+                    0.2::d; 0.3::e.
+                    c :- a.
+                    c :- b, \\+d.
+                    query(c).
+                    query(d).
+                    query(a).
+                    evidence(e, false).
+                """
+        for name in ("ddnnf", "nnf"):
+            with self.subTest(evaluatable=name):
+                kc = get_evaluatable(name=name).create_from(PrologString(program))
+                expected = kc.evaluate(semiring=SemiringProbability())
+                results = kc.evaluate(semiring=SemiringProbability(), parallel=2)
+                self.assertEqual(set(expected), set(results))
+                for q in expected:
+                    self.assertAlmostEqual(expected[q], results[q])
+
+        # The queries of a d-DNNF are atoms: they are all answered by one derivative pass in
+        # the parent process.
+        kc = get_evaluatable(name="ddnnf").create_from(PrologString(program))
+        evaluator = kc.get_evaluator(semiring=SemiringProbability())
+        nodes = [node for _, node, _ in kc.labeled()]
+        self.assertEqual([], evaluator.prepare_queries(nodes))
+        self.assertIsNotNone(evaluator.cache_derivatives)
+
+    def test_ddnnf_compact_storage(self):
+        """
+        Tests reading the compiled d-DNNF into array-backed node storage
+        """
+        program = """
+                    0.3::a. 0.4::b.
+                    0.2::d; 0.3::e.
+                    c :- a.
+                    c :- b, \\+d.
+                    query(c).
+                    query(d).
+                    evidence(e, false).
+                """
+        kc_class = get_evaluatable(name="ddnnf")
+        expected = kc_class.create_from(PrologString(program))
+        compact = kc_class.create_from(PrologString(program), compact_nnf=True)
+        self.assertEqual(type(compact._nodes).__name__, "CompactNodeList")
+        self.assertEqual(str(expected), str(compact))
+        expected, results = expected.evaluate(), compact.evaluate()
+        self.assertEqual(set(expected), set(results))
+        for q in expected:
+            self.assertAlmostEqual(expected[q], results[q])
+
 
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestEvaluator)
@@ -48,9 +48,70 @@ class TestInterfaces(unittest.TestCase):
     def test_cli_sample(self):
         return self._test_cmd("sample")
 
+    def test_cli_sample_parallel(self):
+        return self._test_cmd(
+            "sample",
+            [root_path("test", "7_probabilistic_graph.pl"), "-N", "10", "-j", "2"],
+        )
+
+    def test_sample_parallel(self):
+        from problog.program import PrologString
+        from problog.tasks.sample import estimate, sample
+
+        model = PrologString("0.3::a. 0.6::b. c :- a. c :- b. query(c). query(a).")
+        with open(os.devnull, "w") as out:
+            stdout, sys.stdout = sys.stdout, out
+            try:
+                results = [
+                    estimate(model, n=250, jobs=jobs, seed=42) for jobs in (2, 3)
+                ]
+            finally:
+                sys.stdout = stdout
+        # Results only depend on the seed, not on the number of processes.
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(list(sample(model, n=250, jobs=2, format="dict"))), 250)
+
     def test_cli_default(self):
         return self._test_cmd(None)
 
+    def test_cli_stream(self):
+        import json
+
+        problogcli = root_path("problog-cli.py")
+        testfile = root_path("test", "7_probabilistic_graph.pl")
+        output = subprocess_check_output(
+            [sys.executable, problogcli, testfile, "--stream"]
+        )
+        lines = [json.loads(line) for line in output.strip().split("\n")]
+        self.assertEqual(2, len(lines))
+        for line in lines:
+            self.assertEqual({"query", "probability"}, set(line))
+
+    def test_cli_stats_json(self):
+        import json
+        import tempfile
+
+        problogcli = root_path("problog-cli.py")
+        testfile = root_path("test", "7_probabilistic_graph.pl")
+        fd, statsfile = tempfile.mkstemp(".json")
+        os.close(fd)
+        try:
+            subprocess_check_output(
+                [sys.executable, problogcli, testfile, "--stats-json", statsfile]
+            )
+            with open(statsfile) as f:
+                stats = json.load(f)
+        finally:
+            os.remove(statsfile)
+        self.assertEqual("prob", stats["task"])
+        stages = {stage["name"]: stage for stage in stats["stages"]}
+        for name in ("Loading", "Grounding", "Evaluation"):
+            self.assertIn(name, stages)
+            self.assertIn(name, stats["totals"])
+        self.assertGreater(stages["Loading"]["counts"]["clauses"], 0)
+        self.assertGreater(stages["Grounding"]["counts"]["nodes"], 0)
+        self.assertEqual(2, stages["Evaluation"]["counts"]["queries"])
+
     # def test_cli_learn(self):
     #     problogcli = root_path('problog-cli.py')
     #
@@ -1,11 +1,17 @@
 from __future__ import print_function
 
+import io
+import os
+import tempfile
 import unittest
 
 from problog.program import PrologString
-from problog.formula import LogicFormula
+from problog.formula import LogicFormula, LogicDAG, CompactLogicFormula
+from problog.formula_binary import FormulaFormatError, is_binary_formula
 from problog import get_evaluatable
 from problog.evaluator import SemiringProbability
+from problog.logic import Term
+from problog.tasks.probability import execute
 
 # noinspection PyBroadException
 try:
@@ -59,6 +65,115 @@ class TestTransformation(unittest.TestCase):
         kc = kc_class.create_from(lf)  # type: LogicFormula
         self.assertEqual(3, kc.atomcount)
 
+    def test_compact_formula(self):
+        """
+        The array-backed formula must behave exactly like the default formula.
+        """
+        program = """
+                    0.3::edge(1,2). 0.4::edge(2,3). 0.5::edge(1,3). 0.6::edge(3,1).
+                    0.2::a ; 0.3::b.
+                    path(X,Y) :- edge(X,Y).
+                    path(X,Y) :- edge(X,Z), path(Z,Y).
+                    q :- path(1,3), \\+a.
+                    query(path(1,_)).
+                    query(q).
+                    evidence(b, false).
+                """
+        pl = PrologString(program)
+        lf = LogicFormula.create_from(pl)
+        cf = CompactLogicFormula.create_from(pl)
+        self.assertEqual(str(lf), str(cf))
+        self.assertEqual(list(lf), list(cf))
+        for eval_name in evaluatables:
+            with self.subTest(eval_name=eval_name):
+                kc_class = get_evaluatable(name=eval_name)
+                expected = kc_class.create_from(lf).evaluate()
+                result = kc_class.create_from(cf).evaluate()
+                self.assertEqual(set(expected), set(result))
+                for q in expected:
+                    self.assertAlmostEqual(expected[q], result[q])
+
+    def test_compact_formula_updates(self):
+        """
+        Modifiable disjunctions that are updated in turn (children array compaction).
+        """
+        formulas = [LogicFormula(), CompactLogicFormula()]
+        for f in formulas:
+            atoms = [f.add_atom(i, 0.5) for i in range(100)]
+            disjs = [f.add_or((), readonly=False, placeholder=True) for _ in range(3)]
+            for a in atoms:
+                for d in disjs:
+                    f.add_disjunct(d, -a if d % 2 else a)
+            self.assertEqual(f.add_and((atoms[0], atoms[1])), len(f))
+            self.assertEqual(f.add_and((atoms[1], atoms[0])), len(f))
+        self.assertEqual(list(formulas[0]), list(formulas[1]))
+
+    def test_binary_format(self):
+        """
+        Ground programs written in binary format must be read back identically.
+        """
+        program = """
+                    0.3::edge(1,2). 0.4::edge(2,3). 0.5::edge(1,3). 0.6::edge(3,1).
+                    0.2::a ; 0.3::b.
+                    path(X,Y) :- edge(X,Y).
+                    path(X,Y) :- edge(X,Z), path(Z,Y).
+                    q :- path(1,3), \\+a.
+                    query(path(1,_)).
+                    query(q).
+                    evidence(b, false).
+                """
+        for cls in (LogicFormula, LogicDAG):
+            with self.subTest(cls=cls.__name__):
+                gp = cls.create_from(PrologString(program))
+                fd, filename = tempfile.mkstemp(".bin")
+                os.close(fd)
+                try:
+                    gp.save(filename)
+                    self.assertTrue(is_binary_formula(filename))
+                    loaded = LogicFormula.load(filename)
+                finally:
+                    os.remove(filename)
+                self.assertEqual(type(gp), type(loaded))
+                self.assertEqual(str(gp), str(loaded))
+                self.assertEqual(gp.get_weights(), loaded.get_weights())
+                self.assertEqual(len(gp.constraints()), len(loaded.constraints()))
+                for eval_name in evaluatables:
+                    if eval_name == "fsdd" and cls != LogicFormula:
+                        continue  # forward compilation requires a LogicFormula
+                    kc_class = get_evaluatable(name=eval_name)
+                    expected = kc_class.create_from(gp).evaluate()
+                    result = kc_class.create_from(loaded).evaluate()
+                    self.assertEqual(set(expected), set(result))
+                    for q in expected:
+                        self.assertAlmostEqual(expected[q], result[q])
+
+        with self.assertRaises(FormulaFormatError):
+            LogicFormula.load(io.BytesIO(b"0.3::a. query(a)."))
+
+        # Only the classes of formulae known to the format can be loaded.
+        data = io.BytesIO()
+        LogicFormula.create_from(PrologString(program)).save(data)
+        data = data.getvalue().replace(b'"LogicFormula"', b'"subprocess.x"')
+        with self.assertRaises(FormulaFormatError):
+            LogicFormula.load(io.BytesIO(data))
+
+    def test_binary_format_input(self):
+        """
+        Binary ground programs are only read when the input format is given explicitly.
+        """
+        gp = LogicFormula.create_from(PrologString("0.3::a. 0.4::b. q :- a, b. query(q)."))
+        fd, filename = tempfile.mkstemp(".bin")
+        os.close(fd)
+        try:
+            gp.save(filename)
+            self.assertFalse(execute(filename)[0])
+            self.assertFalse(execute(filename, input_format="bin", web=True)[0])
+            success, result = execute(filename, input_format="bin")
+        finally:
+            os.remove(filename)
+        self.assertTrue(success)
+        self.assertAlmostEqual(0.12, result[Term("q")])
+
 
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestTransformation)
@@ -27,6 +27,59 @@ class TestUnify(unittest.TestCase):
         except AttributeError:
             self.assertCollectionEqual = self.assertCountEqual
 
+    def test_compiled_head(self):
+        """Compiled clause heads unify like unify_call_head"""
+        from problog.engine_unify import (
+            compile_head,
+            unify_head,
+            unify_fact,
+            unify_call_head,
+            UnifyError,
+            OccursCheck,
+        )
+
+        heads = [
+            (0, 1),
+            (0, 0),
+            (a, 0),
+            (b(0, 1), 1),
+            (0, b(0, c)),
+            (a, b(a, c)),
+        ]
+        calls = [
+            (None, None),
+            (-1, -1),
+            (-1, -2),
+            (a, a),
+            (a, b(a, c)),
+            (b(-1, -2), -2),
+            (b(a, -1), c),
+            (-1, b(-1, -2)),
+            (a, b(-1, -1)),
+        ]
+        for head in heads:
+            code = compile_head(head)
+            ground = problog.logic.is_ground(*head)
+            for call in calls:
+                expected = [None] * 2
+                try:
+                    unify_call_head(call, head, expected)
+                except (UnifyError, OccursCheck) as err:
+                    expected = type(err).__name__
+                result = [None] * 2
+                try:
+                    unify_head(code, call, result)
+                except (UnifyError, OccursCheck) as err:
+                    result = type(err).__name__
+                self.assertEqual(expected, result, (head, call))
+                if ground:
+                    try:
+                        unify_fact(call, head)
+                        result = expected
+                    except (UnifyError, OccursCheck) as err:
+                        result = type(err).__name__
+                    self.assertEqual(expected, result, (head, call))
+
 
 tests = [
     (a(-1, a, -2, -2), a(-1, -3, -1, -2), {-1: -1, -2: -1}),
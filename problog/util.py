@@ -34,6 +34,12 @@ import distutils.spawn
 import tempfile
 import imp
 import collections
+import json
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 class ProbLogLogFormatter(logging.Formatter):
@@ -88,6 +94,9 @@ class Timer(object):
     """Report timing information for a block of code.
     To be used as a ``with`` block.
 
+    When pipeline statistics are collected (see :class:`PipelineStats`), the block is also \
+    recorded as a stage of the pipeline.
+
     :param msg: message to print
     :type msg: str
     :param output: file object to write to (default: write to logger ``problog``)
@@ -99,12 +108,21 @@ class Timer(object):
         self.start_time = None
         self.output = output
         self.logger = logger
+        self._stats = None
+        self._stage = None
 
     def __enter__(self):
         self.start_time = time.time()
+        self._stats = PipelineStats.current
+        if self._stats is not None:
+            self._stage = self._stats.start_stage(self.message)
+        return self
 
     # noinspection PyUnusedLocal
     def __exit__(self, *args):
+        if self._stats is not None:
+            self._stats.end_stage(self._stage, error=args[0])
+            self._stats = None
         if self.output is None:
             logger = logging.getLogger(self.logger)
             logger.info("%s: %.4fs" % (self.message, time.time() - self.start_time))
@@ -114,6 +132,149 @@ class Timer(object):
                 file=self.output,
             )
 
+    @property
+    def recording(self):
+        """Whether the block is recorded as a stage of a pipeline (see :meth:`count`)."""
+        return self._stats is not None
+
+    def count(self, **counts):
+        """Record the size of the objects produced by this block (e.g. number of nodes).
+        The counts are ignored when no pipeline statistics are collected.
+
+        :param counts: counts by name
+        """
+        if self._stats is not None:
+            self._stage["counts"].update(counts)
+
+
+def peak_memory():
+    """Get the peak memory usage (resident set size) of the current process.
+
+    :return: peak memory usage in bytes (None if not supported on this platform)
+    :rtype: int
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return usage  # reported in bytes
+    else:
+        return usage * 1024  # reported in kilobytes
+
+
+class PipelineStats(object):
+    """Collect the wall time, CPU time, peak memory usage and object counts of the stages of \
+    a pipeline.
+    To be used as a ``with`` block: while it is active, each block timed with :class:`Timer` \
+    is recorded as a stage (nested blocks are recorded with a larger depth).
+
+    Usage::
+
+        with PipelineStats("prob") as stats:
+            ...
+        stats.write_json("stats.json")
+
+    :param task: name of the task
+    :type task: str
+    """
+
+    # Statistics that are currently being collected (used by Timer).
+    current = None
+
+    def __init__(self, task=None):
+        self.task = task
+        self.stages = []
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_memory = None
+        self._open = []
+        self._previous = None
+        self._start = None
+
+    def __enter__(self):
+        self._previous = PipelineStats.current
+        PipelineStats.current = self
+        self._start = (time.time(), time.process_time())
+        return self
+
+    def __exit__(self, *args):
+        self.wall_time = time.time() - self._start[0]
+        self.cpu_time = time.process_time() - self._start[1]
+        self.peak_memory = peak_memory()
+        PipelineStats.current = self._previous
+
+    def start_stage(self, name):
+        """Start a new stage.
+
+        :param name: name of the stage
+        :type name: str
+        :return: the record of the stage
+        :rtype: dict
+        """
+        stage = {
+            "name": name,
+            "depth": len(self._open),
+            "counts": {},
+            "_start": (time.time(), time.process_time()),
+        }
+        self.stages.append(stage)
+        self._open.append(stage)
+        return stage
+
+    def end_stage(self, stage, error=None):
+        """Complete a stage.
+
+        :param stage: record of the stage (as returned by :meth:`start_stage`)
+        :type stage: dict
+        :param error: type of the exception that interrupted the stage
+        """
+        wall, cpu = stage.pop("_start")
+        stage["wall_time"] = time.time() - wall
+        stage["cpu_time"] = time.process_time() - cpu
+        stage["peak_memory"] = peak_memory()
+        if error is not None:
+            stage["error"] = error.__name__
+        if stage in self._open:
+            self._open.remove(stage)
+
+    def to_dict(self):
+        """Get the collected statistics.
+
+        :return: dictionary with the totals of the pipeline, the stages (in the order in which \
+         they were started) and the totals per stage name
+        :rtype: dict
+        """
+        totals = collections.OrderedDict()
+        for stage in self.stages:
+            if "_start" in stage:
+                continue  # still running
+            total = totals.get(stage["name"])
+            if total is None:
+                total = totals[stage["name"]] = {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                }
+            total["calls"] += 1
+            total["wall_time"] += stage["wall_time"]
+            total["cpu_time"] += stage["cpu_time"]
+        return {
+            "task": self.task,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_memory": self.peak_memory,
+            "stages": [s for s in self.stages if "_start" not in s],
+            "totals": totals,
+        }
+
+    def write_json(self, filename):
+        """Write the collected statistics to a JSON file (see :meth:`to_dict`).
+
+        :param filename: output file
+        """
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
 
 # noinspection PyUnusedLocal
 def _raise_timeout(*args):
@@ -0,0 +1,188 @@
+"""
+problog.variable_order - Variable ordering
+------------------------------------------
+
+Heuristics for ordering the variables of a propositional formula before compiling it \
+into a decision diagram.
+
+The orders are derived from the structure of the formula: the interaction graph connects \
+each conjunction or disjunction with its children (and the literals of each constraint clause).
+Available heuristics:
+
+    * ``minfill`` and ``mindegree``: greedy elimination of the nodes of the interaction graph; \
+    atoms that are eliminated first are placed last (as in a bucket elimination order)
+    * ``force``: the FORCE heuristic (Aloul et al., 2003), which starts from the order of the \
+    formula and repeatedly moves each node to the center of gravity of the nodes it interacts with
+
+All orders are projected onto the atoms of the formula.
+
+..
+    Part of the ProbLog distribution.
+
+    Copyright 2015 KU Leuven, DTAI Research Group
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import print_function
+
+import heapq
+import math
+
+ORDER_HEURISTICS = ("minfill", "mindegree", "force")
+
+
+def interaction_graph(formula):
+    """Build the interaction graph of the given formula.
+
+    :param formula: formula without cycles
+    :type formula: LogicDAG
+    :return: adjacency sets indexed by node key (index 0 is unused)
+    :rtype: list[set[int]]
+    """
+    graph = [set() for _ in range(len(formula) + 1)]
+
+    def _connect(a, b):
+        if a != b:
+            graph[a].add(b)
+            graph[b].add(a)
+
+    for i, n, t in formula:
+        if t != "atom":
+            for c in n.children:
+                if not formula.is_false(c) and not formula.is_true(c):
+                    _connect(i, abs(c))
+    for c in formula.constraints():
+        for rule in c.as_clauses():
+            rule = [abs(r) for r in rule if formula.is_probabilistic(r)]
+            for r in rule[1:]:
+                _connect(rule[0], r)
+    return graph
+
+
+def elimination_order(graph, heuristic="minfill"):
+    """Compute a greedy elimination order of the given graph.
+
+    Scores are updated lazily: after eliminating a node, only the scores of its neighbours \
+    are recomputed.
+
+    :param graph: adjacency sets (modified in place)
+    :type graph: list[set[int]]
+    :param heuristic: 'minfill' (fewest fill-in edges) or 'mindegree' (fewest neighbours)
+    :return: nodes in the order in which they are eliminated
+    :rtype: list[int]
+    """
+    if heuristic == "minfill":
+
+        def _score(v):
+            neighbours = graph[v]
+            missing = 0
+            for u in neighbours:
+                missing += len(neighbours) - 1 - len(neighbours & graph[u])
+            return missing // 2, len(neighbours)
+
+    elif heuristic == "mindegree":
+
+        def _score(v):
+            return len(graph[v]), 0
+
+    else:
+        raise ValueError(
+            "Unknown variable ordering heuristic '%s', expected one of %s."
+            % (heuristic, ", ".join(ORDER_HEURISTICS))
+        )
+
+    eliminated = [False] * len(graph)
+    eliminated[0] = True
+    scores = [None] * len(graph)
+    queue = []
+    for v in range(1, len(graph)):
+        scores[v] = _score(v)
+        queue.append((scores[v], v))
+    heapq.heapify(queue)
+
+    order = []
+    while queue:
+        score, v = heapq.heappop(queue)
+        if eliminated[v] or score != scores[v]:
+            continue
+        eliminated[v] = True
+        order.append(v)
+        neighbours = graph[v]
+        for u in neighbours:
+            graph[u].discard(v)
+            graph[u] |= neighbours
+            graph[u].discard(u)
+        graph[v] = set()
+        for u in neighbours:
+            scores[u] = _score(u)
+            heapq.heappush(queue, (scores[u], u))
+    return order
+
+
+def force_order(formula, iterations=None):
+    """Compute an order of the nodes of the given formula with the FORCE heuristic.
+
+    :param formula: formula without cycles
+    :type formula: LogicDAG
+    :param iterations: number of iterations (default: 2 log2(size of the formula))
+    :return: all node keys in their new order
+    :rtype: list[int]
+    """
+    edges = []
+    for i, n, t in formula:
+        if t != "atom":
+            edge = [i] + [abs(c) for c in n.children if formula.is_probabilistic(c)]
+            if len(edge) > 1:
+                edges.append(edge)
+    for c in formula.constraints():
+        for rule in c.as_clauses():
+            edge = [abs(r) for r in rule if formula.is_probabilistic(r)]
+            if len(edge) > 1:
+                edges.append(edge)
+
+    size = len(formula)
+    if iterations is None:
+        iterations = 2 * max(int(math.log(size + 1, 2)), 1)
+    position = list(range(size + 1))
+    order = list(range(1, size + 1))
+    for _ in range(iterations):
+        total = [0.0] * (size + 1)
+        count = [0] * (size + 1)
+        for edge in edges:
+            center = sum(position[v] for v in edge) / float(len(edge))
+            for v in edge:
+                total[v] += center
+                count[v] += 1
+        order.sort(
+            key=lambda v: (total[v] / count[v] if count[v] else position[v], position[v])
+        )
+        for p, v in enumerate(order, 1):
+            position[v] = p
+    return order
+
+
+def variable_order(formula, heuristic="minfill"):
+    """Compute an order of the atoms of the given formula.
+
+    :param formula: formula without cycles
+    :type formula: LogicDAG
+    :param heuristic: 'minfill', 'mindegree' or 'force'
+    :return: keys of the atoms, in the order in which they should appear in the vtree (left-to-right)
+    :rtype: list[int]
+    """
+    if heuristic == "force":
+        order = force_order(formula)
+    else:
+        order = elimination_order(interaction_graph(formula), heuristic)[::-1]
+    return [i for i in order if type(formula.get_node(i)).__name__ == "atom"]
@@ -0,0 +1,36 @@
+%Expected outcome:
+% total(a,4) 1
+% total(b,7) 1
+% total(c,4) 1
+% highest(a,3) 1
+% highest(b,5) 1
+% highest(c,4) 1
+% mean(a,20.0) 0.5
+% mean(a,30.0) 0.5
+% mean(b,20.0) 0.4
+% size(a,2) 1
+% size(b,2) 1
+% size(c,1) 1
+% min_value(1.0) 1
+% max_value(1.0) 1
+
+:- use_module(library(aggregate)).
+
+v(a,1). v(b,2). v(a,3). v(c,4). v(b,5).
+0.5::w(a,10). 0.4::w(b,20). w(a,30).
+
+count(L, N) :- length(L, N).
+
+total(G, S) :- aggregate(sum, V, G, v(G,V), (G,S)).
+highest(G, S) :- aggregate(max, V, G, v(G,V), (G,S)).
+mean(G, S) :- aggregate(avg, V, G, w(G,V), (G,S)).
+size(G, S) :- aggregate(count, V, G, v(G,V), (G,S)).
+min_value(S) :- min([2, 1.0, 1], S).
+max_value(S) :- max([1, 1.0, 0], S).
+
+query(total(_,_)).
+query(highest(_,_)).
+query(mean(_,_)).
+query(size(_,_)).
+query(min_value(_)).
+query(max_value(_)).
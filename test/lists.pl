@@ -0,0 +1,45 @@
+%Expected outcome:
+% sum([1, 2, 3.5, 1+1],8.5) 1
+% sum([],0) 1
+% max([1, 3+1, 2, 4],4) 1
+% max([1, 1.0],1.0) 1
+% min([3, 1+0, 2, 1],1) 1
+% min([1.0, 1],1) 1
+% num(1,5,[1, 2, 3, 4, 5]) 1
+% num(3,3,[3]) 1
+% num(1.0,3.0,[1.0, 2.0, 3.0]) 1
+% nth(2,[a, b, c, d],c) 1
+% nth(1,[a, [b, c], d],[b, c]) 1
+% nonground(z) 1
+% sum([1, 2],4) 0
+% rest(1,[a, b, c],(b, [a, c])) 1
+% enum([a, b, c],(0, a)) 1
+% enum([a, b, c],(1, b)) 1
+% enum([a, b, c],(2, c)) 1
+
+:- use_module(library(lists)).
+
+sum(L, S) :- sum_list(L, S).
+max(L, S) :- max_list(L, S).
+min(L, S) :- min_list(L, S).
+num(L, H, S) :- numlist(L, H, S).
+nth(I, L, X) :- nth0(I, L, X).
+rest(I, L, (X, R)) :- nth0(I, L, X, R).
+enum(L, (I, X)) :- nth0(I, L, X).
+nonground(Y) :- nth0(1, [a, f(Y), c], f(z)).
+
+query(sum([1, 2, 3.5, 1+1], _)).
+query(sum([], _)).
+query(sum([1, 2], 4)).
+query(max([1, 3+1, 2, 4], _)).
+query(max([1, 1.0], _)).
+query(min([3, 1+0, 2, 1], _)).
+query(min([1.0, 1], _)).
+query(num(1, 5, _)).
+query(num(3, 3, _)).
+query(num(1.0, 3.0, _)).
+query(nth(2, [a, b, c, d], _)).
+query(nth(1, [a, [b, c], d], _)).
+query(nonground(_)).
+query(rest(1, [a, b, c], _)).
+query(enum([a, b, c], _)).